@@ -1,7 +1,15 @@
 import os
 from flask import Flask
 from .config import config
-from .extensions import db, migrate, login_manager
+from .extensions import db, login_manager, init_migrate
+from .utils.archive import configure_archive, init_archive
+from .utils.catalog import configure_catalog, init_catalog
+from .utils.compression import init_compression
+from .utils.events import init_events
+from .utils.history import init_history
+from .utils.instrumentation import init_instrumentation
+from .utils.profiler import init_profiler
+from .utils.templating import init_templates
 
 
 def create_app(config_name='development'):
@@ -12,9 +20,17 @@ def create_app(config_name='development'):
     os.makedirs(app.instance_path, exist_ok=True)
 
     # Initialize extensions
+    configure_catalog(app)
+    configure_archive(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_migrate(app)
     login_manager.init_app(app)
+    init_events(app)
+    init_history(app)
+    init_templates(app)
+    init_profiler(app)
+    init_instrumentation(app)
+    init_compression(app)
 
     # Import models so they are registered with SQLAlchemy
     from . import models  # noqa: F401
@@ -23,4 +39,7 @@ def create_app(config_name='development'):
     from .routes import register_blueprints
     register_blueprints(app)
 
+    init_catalog(app)
+    init_archive(app)
+
     return app
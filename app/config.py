@@ -8,6 +8,63 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_RECORD_QUERIES = False
 
+    # Reference catalog (platforms, benchmarks, sections, checks) lives in its own
+    # SQLite file, opened read-only and immutable. Defaults to <audit db>_catalog.db.
+    CATALOG_DATABASE_PATH = os.environ.get('CATALOG_DATABASE')
+    CATALOG_MMAP_SIZE = int(os.environ.get('CATALOG_MMAP_SIZE', 256 * 1024 * 1024))
+
+    # Archive of completed sessions moved out by archive.py; default: <audit db>_archive.db
+    ARCHIVE_DATABASE_PATH = os.environ.get('ARCHIVE_DATABASE')
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))  # since completion
+
+    # Seconds a resolved user or API token is reused without a database lookup
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 60))
+
+    # Users allowed to use the pages under /admin (comma-separated usernames). These
+    # names cannot be registered; create the accounts with seed.py.
+    ADMIN_USERNAMES = frozenset(
+        name.strip() for name in os.environ.get('ADMIN_USERNAMES', 'admin').split(',') if name.strip()
+    )
+
+    # Sampling profiler armed from /admin/profiler; default directory: <instance>/profiles
+    PROFILER_DIR = os.environ.get('PROFILER_DIR')
+    PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 5))  # between stack samples
+    PROFILER_POLL_INTERVAL = float(os.environ.get('PROFILER_POLL_INTERVAL', 1.0))  # seconds between arming checks
+    PROFILER_MAX_REQUESTS = int(os.environ.get('PROFILER_MAX_REQUESTS', 50))  # per arming
+    PROFILER_MAX_SECONDS = int(os.environ.get('PROFILER_MAX_SECONDS', 900))  # per arming
+
+    # Compiled templates, shared by all workers; default: <instance>/jinja_cache
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+
+    # Response compression (gzip, or brotli when installed)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # bytes
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_CACHE_SIZE = int(os.environ.get('COMPRESS_CACHE_SIZE', 512))  # compressed reference pages
+    COMPRESS_CACHE_TTL = int(os.environ.get('COMPRESS_CACHE_TTL', 3600))  # seconds
+
+    # Processes building workbooks for checklist bundles, per gunicorn worker; 0 means one per CPU
+    EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 0))
+
+    # Result history is written behind the request, in batches
+    RESULT_LOG_BATCH_SIZE = int(os.environ.get('RESULT_LOG_BATCH_SIZE', 500))
+    RESULT_LOG_MAX_PENDING = int(os.environ.get('RESULT_LOG_MAX_PENDING', 5000))  # flushed inline beyond
+    RESULT_LOG_FLUSH_INTERVAL = float(os.environ.get('RESULT_LOG_FLUSH_INTERVAL', 1.0))  # seconds
+
+    # Live session updates (server-sent events)
+    EVENTS_SOCKET_DIR = os.environ.get('EVENTS_SOCKET_DIR')  # default: <instance>/events
+    SSE_QUEUE_SIZE = int(os.environ.get('SSE_QUEUE_SIZE', 64))  # notifications buffered per stream
+    SSE_HEARTBEAT = int(os.environ.get('SSE_HEARTBEAT', 15))  # seconds between keep-alives
+    SSE_STREAM_SECONDS = int(os.environ.get('SSE_STREAM_SECONDS', 300))  # browsers reconnect after
+    # Open streams per process; each holds a gthread worker thread, so by default
+    # half of GUNICORN_THREADS. Further pages retry after 30 s. 0 means no limit,
+    # e.g. with gevent workers.
+    SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', int(os.environ.get('GUNICORN_THREADS', 4)) // 2))
+
+    # Local evidence collector (collect.py)
+    COLLECTOR_CONCURRENCY = int(os.environ.get('COLLECTOR_CONCURRENCY', 8))
+    COLLECTOR_TIMEOUT = int(os.environ.get('COLLECTOR_TIMEOUT', 15))  # seconds per command
+    COLLECTOR_MAX_OUTPUT = int(os.environ.get('COLLECTOR_MAX_OUTPUT', 64 * 1024))  # bytes per stream
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
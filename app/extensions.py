@@ -1,10 +1,21 @@
+import click
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 
 db = SQLAlchemy()
-migrate = Migrate()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager.login_message = 'Please log in to access this page.'
 login_manager.login_message_category = 'info'
+
+
+def init_migrate(app):
+    """Register Flask-Migrate when the app is loaded by the ``flask`` CLI.
+
+    Flask-Migrate imports alembic, which is the slowest import of the app;
+    web workers and the standalone scripts never run migrations.
+    """
+    if click.get_current_context(silent=True) is None:
+        return
+    from flask_migrate import Migrate
+    Migrate(app, db)
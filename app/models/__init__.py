@@ -1,15 +1,35 @@
 from .user import User
+from .token import ApiToken, TOKEN_SCOPES
 from .platform import Platform
 from .benchmark import Benchmark, BenchmarkSection
 from .check import Check
-from .audit import AuditSession, AuditResult
+from .related import RelatedCheck, CheckGroup
+from .audit import AuditSession, AuditResult, AuditResultEvent
+from .evidence import AuditEvidence
+from .archive import ArchivedSession
+from .stats import PlatformStats, BenchmarkStats, UserStats, SessionStats, SectionRollup
+from .analytics import BenchmarkPeriodStats, CheckPeriodStats
 
 __all__ = [
     'User',
+    'ApiToken',
+    'TOKEN_SCOPES',
     'Platform',
     'Benchmark',
     'BenchmarkSection',
     'Check',
+    'RelatedCheck',
+    'CheckGroup',
     'AuditSession',
     'AuditResult',
+    'AuditResultEvent',
+    'AuditEvidence',
+    'ArchivedSession',
+    'PlatformStats',
+    'BenchmarkStats',
+    'UserStats',
+    'SessionStats',
+    'SectionRollup',
+    'BenchmarkPeriodStats',
+    'CheckPeriodStats',
 ]
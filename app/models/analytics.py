@@ -0,0 +1,52 @@
+from ..extensions import db
+
+
+class BenchmarkPeriodStats(db.Model):
+    """Per-benchmark outcome totals for one reporting period (``YYYY-Qn``)."""
+    __tablename__ = 'benchmark_period_stats'
+
+    benchmark_id = db.Column(db.Integer, primary_key=True)  # catalog database
+    period = db.Column(db.String(7), primary_key=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    checked = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    not_applicable = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def compliance(self):
+        if not self.checked:
+            return 0
+        return int((self.passed / self.checked) * 100)
+
+    def __repr__(self):
+        return f'<BenchmarkPeriodStats {self.benchmark_id} {self.period}>'
+
+
+class CheckPeriodStats(db.Model):
+    """Per-check outcome totals for one reporting period (``YYYY-Qn``)."""
+    __tablename__ = 'check_period_stats'
+
+    check_id = db.Column(db.Integer, primary_key=True)  # catalog database
+    period = db.Column(db.String(7), primary_key=True)
+    benchmark_id = db.Column(db.Integer, nullable=False)  # catalog database
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    not_applicable = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_check_period_stats_benchmark_period', 'benchmark_id', 'period'),
+    )
+
+    @property
+    def checked(self):
+        return self.passed + self.failed + self.not_applicable
+
+    @property
+    def failure_rate(self):
+        if not self.checked:
+            return 0
+        return int((self.failed / self.checked) * 100)
+
+    def __repr__(self):
+        return f'<CheckPeriodStats {self.check_id} {self.period}>'
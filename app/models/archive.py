@@ -0,0 +1,32 @@
+from ..extensions import db
+
+
+class ArchivedSession(db.Model):
+    """A completed session's results, evidence and history, moved out of the audit database.
+
+    Lives in the ``archive`` database. The session row and its counters stay
+    in the audit database with status ``archived``; each blob is zlib-compressed
+    JSON written and read by ``app/utils/archive.py``.
+    """
+    __tablename__ = 'archived_sessions'
+    __bind_key__ = 'archive'
+
+    session_id = db.Column(db.Integer, primary_key=True)  # audit database
+    user_id = db.Column(db.Integer, nullable=False)  # audit database
+    benchmark_id = db.Column(db.Integer, nullable=False)  # catalog database
+    target_name = db.Column(db.String(200))
+    completed_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+    format = db.Column(db.Integer, nullable=False, default=1)
+    result_count = db.Column(db.Integer, nullable=False, default=0)
+    raw_size = db.Column(db.Integer, nullable=False, default=0)  # bytes before compression
+    results = db.Column(db.LargeBinary, nullable=False)
+    evidence = db.Column(db.LargeBinary, nullable=False)
+    history = db.Column(db.LargeBinary, nullable=False)
+
+    @property
+    def stored_size(self):
+        return len(self.results) + len(self.evidence) + len(self.history)
+
+    def __repr__(self):
+        return f'<ArchivedSession {self.session_id} {self.result_count} results>'
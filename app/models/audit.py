@@ -7,12 +7,12 @@ class AuditSession(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    benchmark_id = db.Column(db.Integer, db.ForeignKey('benchmarks.id'), nullable=False)
+    benchmark_id = db.Column(db.Integer, nullable=False)  # catalog database
     target_name = db.Column(db.String(200))
     target_ip = db.Column(db.String(45))
     started_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     completed_at = db.Column(db.DateTime, nullable=True)
-    status = db.Column(db.String(20), default='in_progress')  # in_progress, completed
+    status = db.Column(db.String(20), default='in_progress')  # in_progress, completed, archived
     notes = db.Column(db.Text)
 
     # Relationships
@@ -48,14 +48,43 @@ class AuditResult(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('audit_sessions.id'), nullable=False)
-    check_id = db.Column(db.Integer, db.ForeignKey('checks.id'), nullable=False)
+    check_id = db.Column(db.Integer, nullable=False)  # catalog database
     status = db.Column(db.String(20), default='not_checked')  # pass, fail, not_applicable, not_checked
     finding = db.Column(db.Text)
     checked_at = db.Column(db.DateTime, nullable=True)
 
     __table_args__ = (
         db.UniqueConstraint('session_id', 'check_id', name='uq_session_check'),
+        db.Index('ix_audit_results_checked', 'checked_at', 'id'),
     )
 
     def __repr__(self):
         return f'<AuditResult {self.session_id}:{self.check_id} {self.status}>'
+
+
+class AuditResultEvent(db.Model):
+    """Append-only log of result changes: who set which status, and when.
+
+    Written in batches by ``app/utils/history.py`` after the change commits;
+    rows are never updated or deleted.
+    """
+    __tablename__ = 'audit_result_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('audit_sessions.id'), nullable=False)
+    check_id = db.Column(db.Integer, nullable=False)  # catalog database
+    status = db.Column(db.String(20), nullable=False)
+    finding = db.Column(db.Text)
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    source = db.Column(db.String(20), nullable=False)  # web, api, import, collector, bundle, sync
+    changed_at = db.Column(db.DateTime, nullable=False)
+
+    actor = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('ix_audit_result_events_session_check_time', 'session_id', 'check_id', 'changed_at'),
+        db.Index('ix_audit_result_events_session_time', 'session_id', 'changed_at'),
+    )
+
+    def __repr__(self):
+        return f'<AuditResultEvent {self.session_id}:{self.check_id} {self.status} {self.changed_at}>'
@@ -3,6 +3,7 @@ from ..extensions import db
 
 class Benchmark(db.Model):
     __tablename__ = 'benchmarks'
+    __bind_key__ = 'catalog'
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -14,7 +15,13 @@ class Benchmark(db.Model):
 
     # Relationships
     sections = db.relationship('BenchmarkSection', backref='benchmark', lazy='dynamic')
-    audit_sessions = db.relationship('AuditSession', backref='benchmark', lazy='dynamic')
+    # Audit sessions live in the audit database, so the join has no foreign key
+    audit_sessions = db.relationship(
+        'AuditSession',
+        primaryjoin='Benchmark.id == foreign(AuditSession.benchmark_id)',
+        backref='benchmark',
+        lazy='dynamic'
+    )
 
     @property
     def total_checks(self):
@@ -29,6 +36,7 @@ class Benchmark(db.Model):
 
 class BenchmarkSection(db.Model):
     __tablename__ = 'benchmark_sections'
+    __bind_key__ = 'catalog'
 
     id = db.Column(db.Integer, primary_key=True)
     benchmark_id = db.Column(db.Integer, db.ForeignKey('benchmarks.id'), nullable=False)
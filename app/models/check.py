@@ -3,6 +3,7 @@ from ..extensions import db
 
 class Check(db.Model):
     __tablename__ = 'checks'
+    __bind_key__ = 'catalog'
 
     id = db.Column(db.Integer, primary_key=True)
     section_id = db.Column(db.Integer, db.ForeignKey('benchmark_sections.id'), nullable=False)
@@ -20,7 +21,13 @@ class Check(db.Model):
     sort_order = db.Column(db.Integer, default=0)
 
     # Relationships
-    audit_results = db.relationship('AuditResult', backref='check', lazy='dynamic')
+    # Results live in the audit database, so the join has no foreign key
+    audit_results = db.relationship(
+        'AuditResult',
+        primaryjoin='Check.id == foreign(AuditResult.check_id)',
+        backref='check',
+        lazy='dynamic'
+    )
 
     @property
     def level_display(self):
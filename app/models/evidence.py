@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from ..extensions import db
+
+
+class AuditEvidence(db.Model):
+    """Command output captured for one check of a session by the collector."""
+    __tablename__ = 'audit_evidence'
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('audit_sessions.id'), nullable=False)
+    check_id = db.Column(db.Integer, nullable=False)  # catalog database
+    command = db.Column(db.Text)
+    stdout = db.Column(db.Text)
+    stderr = db.Column(db.Text)
+    exit_code = db.Column(db.Integer, nullable=True)
+    timed_out = db.Column(db.Boolean, nullable=False, default=False)
+    truncated = db.Column(db.Boolean, nullable=False, default=False)
+    duration_ms = db.Column(db.Integer)
+    proposed_status = db.Column(db.String(20))  # pass, fail, or None when undecided
+    collected_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'check_id', name='uq_evidence_session_check'),
+    )
+
+    def __repr__(self):
+        return f'<AuditEvidence {self.session_id}:{self.check_id} {self.proposed_status}>'
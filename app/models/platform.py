@@ -3,6 +3,7 @@ from ..extensions import db
 
 class Platform(db.Model):
     __tablename__ = 'platforms'
+    __bind_key__ = 'catalog'
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
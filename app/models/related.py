@@ -0,0 +1,33 @@
+from ..extensions import db
+
+
+class RelatedCheck(db.Model):
+    """A near-duplicate of a check on another platform, found when the catalog is seeded."""
+    __tablename__ = 'related_checks'
+    __bind_key__ = 'catalog'
+
+    check_id = db.Column(db.Integer, db.ForeignKey('checks.id'), primary_key=True)
+    related_id = db.Column(db.Integer, db.ForeignKey('checks.id'), primary_key=True)
+    similarity = db.Column(db.Float, nullable=False)  # Jaccard similarity of the check text
+
+    related = db.relationship('Check', foreign_keys=[related_id])
+
+    def __repr__(self):
+        return f'<RelatedCheck {self.check_id} ~ {self.related_id} {self.similarity:.2f}>'
+
+
+class CheckGroup(db.Model):
+    """Cluster of related checks (the same control across platforms).
+
+    Only checks with at least one related check have a row; ``group_id`` is
+    the lowest check id in the cluster.
+    """
+    __tablename__ = 'check_groups'
+    __bind_key__ = 'catalog'
+
+    check_id = db.Column(db.Integer, db.ForeignKey('checks.id'), primary_key=True)
+    group_id = db.Column(db.Integer, nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<CheckGroup {self.check_id} in {self.group_id}>'
@@ -0,0 +1,146 @@
+from datetime import datetime, timezone
+from ..extensions import db
+
+
+class PlatformStats(db.Model):
+    """Per-platform catalog rollup, rebuilt whenever the catalog is seeded."""
+    __tablename__ = 'platform_stats'
+    __bind_key__ = 'catalog'
+
+    platform_id = db.Column(db.Integer, db.ForeignKey('platforms.id'), primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(50), nullable=False)
+    os_family = db.Column(db.String(30), nullable=False)
+    benchmark_count = db.Column(db.Integer, nullable=False, default=0)
+    check_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<PlatformStats {self.slug} {self.check_count}>'
+
+
+class BenchmarkStats(db.Model):
+    """Per-benchmark catalog rollup, rebuilt whenever the catalog is seeded."""
+    __tablename__ = 'benchmark_stats'
+    __bind_key__ = 'catalog'
+
+    benchmark_id = db.Column(db.Integer, db.ForeignKey('benchmarks.id'), primary_key=True)
+    platform_id = db.Column(db.Integer, db.ForeignKey('platforms.id'), nullable=False)
+    section_count = db.Column(db.Integer, nullable=False, default=0)
+    check_count = db.Column(db.Integer, nullable=False, default=0)
+    scored_count = db.Column(db.Integer, nullable=False, default=0)
+    level2_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<BenchmarkStats {self.benchmark_id} {self.check_count}>'
+
+
+class UserStats(db.Model):
+    """Per-user audit rollup, maintained on session creation, result update and completion."""
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    open_sessions = db.Column(db.Integer, nullable=False, default=0)
+    completed_sessions = db.Column(db.Integer, nullable=False, default=0)
+    recent_passed = db.Column(db.Integer, nullable=False, default=0)
+    recent_checked = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    @property
+    def total_sessions(self):
+        return self.open_sessions + self.completed_sessions
+
+    @property
+    def recent_compliance(self):
+        """Pass rate over the checked results of the user's most recent sessions."""
+        if not self.recent_checked:
+            return 0
+        return int((self.recent_passed / self.recent_checked) * 100)
+
+    def __repr__(self):
+        return f'<UserStats {self.user_id} open={self.open_sessions}>'
+
+
+class SessionStats(db.Model):
+    """Per-session result counters, so listings never count audit_results rows."""
+    __tablename__ = 'session_stats'
+
+    session_id = db.Column(db.Integer, db.ForeignKey('audit_sessions.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    benchmark_id = db.Column(db.Integer, nullable=False)  # catalog database
+    benchmark_name = db.Column(db.String(200))
+    target_name = db.Column(db.String(200))
+    target_ip = db.Column(db.String(45))
+    status = db.Column(db.String(20), default='in_progress')
+    started_at = db.Column(db.DateTime)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    checked = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    not_applicable = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_session_stats_user_started', 'user_id', 'started_at'),
+        db.Index('ix_session_stats_target_started', 'target_name', 'target_ip', 'started_at'),
+    )
+
+    @property
+    def progress(self):
+        if not self.total:
+            return 0
+        return int((self.checked / self.total) * 100)
+
+    @property
+    def compliance(self):
+        if not self.checked:
+            return 0
+        return int((self.passed / self.checked) * 100)
+
+    def __repr__(self):
+        return f'<SessionStats {self.session_id} {self.checked}/{self.total}>'
+
+
+class SectionRollup(db.Model):
+    """Per-session result counters of one section, including its subsections.
+
+    Maintained by ``app/utils/section_rollups.py``. The ``weight_*`` counters
+    weigh each result by its check's level and scoring.
+    """
+    __tablename__ = 'section_rollups'
+
+    session_id = db.Column(db.Integer, db.ForeignKey('audit_sessions.id'), primary_key=True)
+    section_id = db.Column(db.Integer, primary_key=True)  # catalog database
+    parent_id = db.Column(db.Integer)  # catalog database; NULL for top-level sections
+    number = db.Column(db.String(20), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    depth = db.Column(db.Integer, nullable=False, default=0)
+    position = db.Column(db.Integer, nullable=False, default=0)  # depth-first order in the benchmark
+    total = db.Column(db.Integer, nullable=False, default=0)
+    checked = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    not_applicable = db.Column(db.Integer, nullable=False, default=0)
+    weight_total = db.Column(db.Integer, nullable=False, default=0)
+    weight_checked = db.Column(db.Integer, nullable=False, default=0)
+    weight_passed = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def progress(self):
+        if not self.total:
+            return 0
+        return int((self.checked / self.total) * 100)
+
+    @property
+    def compliance(self):
+        if not self.checked:
+            return 0
+        return int((self.passed / self.checked) * 100)
+
+    @property
+    def score(self):
+        """Compliance weighted by check level and scoring."""
+        if not self.weight_checked:
+            return 0
+        return int((self.weight_passed / self.weight_checked) * 100)
+
+    def __repr__(self):
+        return f'<SectionRollup {self.session_id}:{self.number} {self.checked}/{self.total}>'
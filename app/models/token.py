@@ -0,0 +1,96 @@
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timezone
+from flask import current_app, g
+from ..extensions import db, login_manager
+from ..utils.cache import TTLCache
+from .user import load_user
+
+TOKEN_SCOPES = ('read', 'write')
+
+# sha256(token) -> (token_id, user_id, scope); only valid tokens are cached
+_token_cache = TTLCache(maxsize=4096)
+
+
+class ApiToken(db.Model):
+    """Bearer token for automation clients of the JSON API.
+
+    Only a SHA-256 digest of the token is stored; the random ``prefix`` makes
+    lookups an index hit before the constant-time digest comparison.
+    """
+    __tablename__ = 'api_tokens'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    prefix = db.Column(db.String(16), unique=True, nullable=False, index=True)
+    token_hash = db.Column(db.String(64), nullable=False)
+    scope = db.Column(db.String(10), nullable=False, default='read')  # read | write
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    user = db.relationship('User', backref=db.backref('api_tokens', lazy='dynamic'))
+
+    @classmethod
+    def issue(cls, user_id, name, scope='read'):
+        """Create a token; returns ``(api_token, plaintext)``. The plaintext is shown once."""
+        prefix = secrets.token_hex(4)
+        plaintext = f'kb_{prefix}_{secrets.token_urlsafe(32)}'
+        token = cls(user_id=user_id, name=name, prefix=prefix,
+                    token_hash=hash_token(plaintext), scope=scope)
+        db.session.add(token)
+        return token, plaintext
+
+    def revoke(self):
+        db.session.delete(self)
+        _token_cache.pop(self.token_hash)
+
+    def __repr__(self):
+        return f'<ApiToken kb_{self.prefix} {self.scope}>'
+
+
+def hash_token(plaintext):
+    return hashlib.sha256(plaintext.encode()).hexdigest()
+
+
+def resolve_token(plaintext):
+    """Return ``(user_id, scope)`` for a valid token, or None.
+
+    A cached token is still looked up by id on every use, so a token revoked
+    in another worker stops working at once rather than when the entry expires.
+    """
+    digest = hash_token(plaintext)
+    cached = _token_cache.get(digest)
+    if cached is not None:
+        token_id, user_id, scope = cached
+        if db.session.query(ApiToken.id).filter_by(id=token_id).first() is None:
+            _token_cache.pop(digest)
+            return None
+        return user_id, scope
+
+    parts = plaintext.split('_', 2)
+    if len(parts) != 3 or parts[0] != 'kb':
+        return None
+    token = db.session.query(
+        ApiToken.id, ApiToken.user_id, ApiToken.scope, ApiToken.token_hash
+    ).filter_by(prefix=parts[1]).first()
+    if token is None or not hmac.compare_digest(token.token_hash, digest):
+        return None
+    _token_cache.set(digest, (token.id, token.user_id, token.scope), current_app.config['IDENTITY_CACHE_TTL'])
+    return token.user_id, token.scope
+
+
+@login_manager.request_loader
+def load_user_from_request(request):
+    """Authenticate JSON API requests carrying ``Authorization: Bearer <token>``."""
+    if request.blueprint != 'api':
+        return None
+    scheme, _sep, plaintext = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not plaintext:
+        return None
+    identity = resolve_token(plaintext.strip())
+    if identity is None:
+        return None
+    user_id, scope = identity
+    g.api_token_scope = scope
+    return load_user(user_id)
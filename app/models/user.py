@@ -1,7 +1,13 @@
 from datetime import datetime, timezone
+from flask import current_app
 from flask_login import UserMixin
+from sqlalchemy.orm import make_transient_to_detached
 from werkzeug.security import generate_password_hash, check_password_hash
 from ..extensions import db, login_manager
+from ..utils.cache import TTLCache
+
+# user_id -> column values of recently loaded users
+_user_cache = TTLCache(maxsize=1024)
 
 
 class User(UserMixin, db.Model):
@@ -16,6 +22,11 @@ class User(UserMixin, db.Model):
     # Relationships
     audit_sessions = db.relationship('AuditSession', backref='auditor', lazy='dynamic')
 
+    @property
+    def is_admin(self):
+        """Admins (``ADMIN_USERNAMES``) may use the pages under ``/admin``."""
+        return self.username in current_app.config['ADMIN_USERNAMES']
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
 
@@ -28,4 +39,19 @@ class User(UserMixin, db.Model):
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    """Load the session user, reusing a cached copy for IDENTITY_CACHE_TTL seconds."""
+    user_id = int(user_id)
+    state = _user_cache.get(user_id)
+    if state is not None:
+        user = User(**state)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        _user_cache.set(
+            user_id,
+            {column.key: getattr(user, column.key) for column in User.__table__.columns},
+            current_app.config['IDENTITY_CACHE_TTL'],
+        )
+    return user
@@ -6,6 +6,9 @@ def register_blueprints(app):
     from .checks import checks_bp
     from .audits import audits_bp
     from .export import export_bp
+    from .analytics import analytics_bp
+    from .api import api_bp
+    from .admin import admin_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
@@ -14,3 +17,6 @@ def register_blueprints(app):
     app.register_blueprint(checks_bp)
     app.register_blueprint(audits_bp)
     app.register_blueprint(export_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(admin_bp)
@@ -0,0 +1,67 @@
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, abort, send_from_directory
+from flask_login import current_user, login_required
+from ..utils.profiler import PROFILE_FORMATS, profiler
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+@admin_bp.before_request
+@login_required
+def require_admin():
+    if not current_user.is_admin:
+        abort(403)
+
+
+@admin_bp.route('/profiler', methods=['GET', 'POST'])
+def profiler_status():
+    endpoints = sorted(
+        rule.endpoint for rule in current_app.url_map.iter_rules()
+        if rule.endpoint != 'static' and not rule.endpoint.startswith('admin.')
+    )
+
+    if request.method == 'POST':
+        endpoint = request.form.get('endpoint', '')
+        requests = request.form.get('requests', type=int)
+        minutes = request.form.get('minutes', type=int)
+        if endpoint not in endpoints:
+            flash('Choose an endpoint to profile.', 'error')
+        else:
+            try:
+                arming = profiler.arm(
+                    endpoint, requests=requests, seconds=minutes * 60 if minutes else None,
+                    format=request.form.get('format', 'collapsed'), armed_by=current_user.username,
+                )
+            except ValueError as exc:
+                flash(str(exc), 'error')
+            else:
+                flash(f'Profiling the next {arming.requests} requests to {endpoint}.', 'success')
+                return redirect(url_for('admin.profiler_status'))
+
+    arming = profiler.current()
+    return render_template('admin/profiler.html',
+                           arming=arming,
+                           claimed=profiler.claimed(arming) if arming else 0,
+                           endpoints=endpoints,
+                           formats=PROFILE_FORMATS,
+                           profiles=profiler.profiles())
+
+
+@admin_bp.route('/profiler/disarm', methods=['POST'])
+def disarm_profiler():
+    profiler.disarm()
+    flash('Profiler disarmed.', 'info')
+    return redirect(url_for('admin.profiler_status'))
+
+
+@admin_bp.route('/profiler/profiles/<name>')
+def download_profile(name):
+    if name not in {entry[0] for entry in profiler.profiles()}:
+        abort(404)
+    return send_from_directory(profiler.directory, name, as_attachment=True)
+
+
+@admin_bp.route('/profiler/profiles/delete', methods=['POST'])
+def delete_profiles():
+    profiler.delete_profiles()
+    flash('Profiles deleted.', 'info')
+    return redirect(url_for('admin.profiler_status'))
@@ -0,0 +1,63 @@
+from flask import Blueprint, render_template, request, abort
+from flask_login import current_user, login_required
+from ..extensions import db
+from ..models import Benchmark, Check
+from ..utils import analytics
+
+analytics_bp = Blueprint('analytics', __name__, url_prefix='/analytics')
+
+
+def _owner_id():
+    """User whose sessions target data is limited to; None for admins."""
+    return None if current_user.is_admin else current_user.id
+
+
+@analytics_bp.route('/')
+@login_required
+def overview():
+    benchmarks = Benchmark.query.order_by(Benchmark.name).all()
+    benchmark_id = request.args.get('benchmark_id', type=int)
+    period = request.args.get('period', '').strip() or None
+
+    # The period aggregates cover every user's sessions, so only admins see them
+    trend, top_failed = [], []
+    if current_user.is_admin:
+        if benchmark_id:
+            trend = analytics.benchmark_trend(benchmark_id)
+        top_failed = analytics.top_failed_checks(benchmark_id=benchmark_id, period=period)
+    targets = analytics.targets(benchmark_id=benchmark_id, user_id=_owner_id())
+
+    return render_template('analytics/overview.html',
+                           benchmarks=benchmarks,
+                           selected_benchmark=benchmark_id,
+                           period=period or '',
+                           trend=trend,
+                           top_failed=top_failed,
+                           targets=targets)
+
+
+@analytics_bp.route('/target')
+@login_required
+def target():
+    target_name = request.args.get('name', '').strip()
+    target_ip = request.args.get('ip', '').strip()
+    if not target_name:
+        abort(404)
+
+    history = analytics.target_history(target_name, target_ip or None, user_id=_owner_id())
+    return render_template('analytics/target.html',
+                           target_name=target_name,
+                           target_ip=target_ip,
+                           history=history)
+
+
+@analytics_bp.route('/check/<int:check_id>')
+@login_required
+def check(check_id):
+    if not current_user.is_admin:
+        abort(403)
+    check = db.session.get(Check, check_id) or abort(404)
+    trend = analytics.check_trend(check_id)
+    return render_template('analytics/check.html',
+                           check=check,
+                           trend=trend)
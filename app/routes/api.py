@@ -0,0 +1,325 @@
+import os
+from datetime import datetime
+from functools import wraps
+from flask import Blueprint, Response, jsonify, request, abort, g, stream_with_context
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+from ..extensions import db
+from ..models import (
+    Platform, Benchmark, BenchmarkSection, Check, AuditSession, AuditResult, SessionStats,
+)
+from ..utils.archive import load_archive
+from ..utils.audit_sessions import create_session, apply_result_updates
+from ..utils.instrumentation import template_timings
+from ..utils.offline import parse_timestamp, sync_results
+from ..utils.streaming import keyset_rows, ndjson_lines, csv_lines
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+CHECK_FIELDS = [
+    'id', 'benchmark_id', 'section_id', 'check_number', 'title', 'level', 'scored',
+    'description', 'rationale', 'audit_command', 'audit_steps', 'expected_output',
+    'remediation', 'references', 'cursor',
+]
+
+RESULT_FIELDS = [
+    'id', 'session_id', 'benchmark_id', 'target_name', 'target_ip', 'check_id',
+    'check_number', 'status', 'finding', 'checked_at', 'cursor',
+]
+
+
+@api_bp.before_request
+def require_login():
+    if not current_user.is_authenticated:
+        return jsonify(error='Authentication required.'), 401
+
+
+@api_bp.errorhandler(HTTPException)
+def json_error(exc):
+    return jsonify(error=exc.description), exc.code
+
+
+def write_access(view):
+    """Reject requests authenticated with a read-only API token."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if g.get('api_token_scope', 'write') != 'write':
+            abort(403, description='This token is read-only.')
+        return view(*args, **kwargs)
+    return wrapped
+
+
+# --- Catalog -------------------------------------------------------------------
+
+@api_bp.route('/platforms')
+def platforms():
+    return jsonify(items=[
+        {
+            'id': p.id, 'name': p.name, 'slug': p.slug,
+            'os_family': p.os_family, 'description': p.description,
+        }
+        for p in Platform.query.order_by(Platform.id)
+    ])
+
+
+@api_bp.route('/benchmarks')
+def benchmarks():
+    query = Benchmark.query
+    platform_id = request.args.get('platform', type=int)
+    if platform_id:
+        query = query.filter_by(platform_id=platform_id)
+    return jsonify(items=[
+        {
+            'id': b.id, 'name': b.name, 'version': b.version, 'platform_id': b.platform_id,
+            'release_date': b.release_date.isoformat() if b.release_date else None,
+            'url': b.url,
+        }
+        for b in query.order_by(Benchmark.id)
+    ])
+
+
+@api_bp.route('/benchmarks/<int:benchmark_id>/sections')
+def sections(benchmark_id):
+    Benchmark.query.get_or_404(benchmark_id)
+    return jsonify(items=[
+        {
+            'id': s.id, 'parent_id': s.parent_id, 'number': s.number,
+            'title': s.title, 'sort_order': s.sort_order,
+        }
+        for s in BenchmarkSection.query.filter_by(
+            benchmark_id=benchmark_id
+        ).order_by(BenchmarkSection.sort_order, BenchmarkSection.id)
+    ])
+
+
+@api_bp.route('/checks')
+def checks():
+    """Stream checks ordered by id; ``since`` is the last ``cursor`` seen."""
+    after = _id_cursor(request.args.get('since'))
+    query = db.session.query(
+        Check.id, BenchmarkSection.benchmark_id, Check.section_id, Check.check_number,
+        Check.title, Check.level, Check.scored, Check.description, Check.rationale,
+        Check.audit_command, Check.audit_steps, Check.expected_output,
+        Check.remediation, Check.references,
+    ).join(BenchmarkSection, Check.section_id == BenchmarkSection.id)
+
+    benchmark_id = request.args.get('benchmark', type=int)
+    if benchmark_id:
+        query = query.filter(BenchmarkSection.benchmark_id == benchmark_id)
+    level = request.args.get('level', type=int)
+    if level:
+        query = query.filter(Check.level == level)
+
+    records = (
+        dict(row._mapping, cursor=str(row.id))
+        for row in keyset_rows(query, (Check.id,), after)
+    )
+    return _stream(records, CHECK_FIELDS, 'checks')
+
+
+# --- Audits --------------------------------------------------------------------
+
+@api_bp.route('/audits')
+def audits():
+    return jsonify(items=[
+        {
+            'id': s.session_id, 'benchmark_id': s.benchmark_id, 'benchmark_name': s.benchmark_name,
+            'target_name': s.target_name, 'target_ip': s.target_ip, 'status': s.status,
+            'started_at': s.started_at.isoformat() if s.started_at else None,
+            'total': s.total, 'checked': s.checked, 'passed': s.passed,
+            'failed': s.failed, 'not_applicable': s.not_applicable,
+        }
+        for s in SessionStats.query.filter_by(
+            user_id=current_user.id
+        ).order_by(SessionStats.started_at.desc())
+    ])
+
+
+@api_bp.route('/audits', methods=['POST'])
+@write_access
+def create_audit():
+    """Create a session from ``{benchmark_id, target_name, target_ip, notes}``."""
+    data = request.get_json(silent=True) or {}
+    benchmark = db.session.get(Benchmark, data.get('benchmark_id') or 0)
+    if benchmark is None:
+        abort(400, description='Unknown benchmark_id.')
+
+    session, count = create_session(
+        current_user.id, benchmark,
+        str(data.get('target_name') or '').strip(),
+        str(data.get('target_ip') or '').strip(),
+        str(data.get('notes') or '').strip(),
+    )
+    db.session.commit()
+    return jsonify(id=session.id, benchmark_id=benchmark.id, target_name=session.target_name,
+                   target_ip=session.target_ip, total=count), 201
+
+
+@api_bp.route('/audits/<int:session_id>/results', methods=['POST'])
+@write_access
+def update_results(session_id):
+    """Bulk-update results from a JSON list of ``{check_number, status, finding}``."""
+    session = AuditSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        abort(403)
+    if session.status != 'in_progress':
+        abort(409, description='Audit session is completed.')
+
+    data = request.get_json(silent=True)
+    entries = data.get('results') if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        abort(400, description='Expected a JSON list of results.')
+
+    updated, errors = apply_result_updates(session, entries)
+    db.session.commit()
+    return jsonify(
+        updated=updated,
+        errors=[{'index': index, 'error': message} for index, message in errors],
+    )
+
+
+@api_bp.route('/audits/<int:session_id>/sync', methods=['POST'])
+@write_access
+def sync(session_id):
+    """Apply offline changes ``{since, changes: [{check_id, status, finding, checked_at}]}``.
+
+    The latest ``checked_at`` wins; the response lists conflicts and the
+    results changed on the server since ``since``.
+    """
+    session = AuditSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        abort(403)
+    if session.status != 'in_progress':
+        abort(409, description='Audit session is completed.')
+
+    data = request.get_json(silent=True)
+    changes = data.get('changes') if isinstance(data, dict) else None
+    if not isinstance(changes, list):
+        abort(400, description='Expected a JSON object with a list of changes.')
+    try:
+        since = parse_timestamp(data['since']) if data.get('since') else None
+    except ValueError:
+        abort(400, description='Invalid since time.')
+
+    report = sync_results(session, changes, since, current_user.id)
+    db.session.commit()
+    report['errors'] = [{'index': index, 'error': message} for index, message in report['errors']]
+    return jsonify(report)
+
+
+@api_bp.route('/audits/<int:session_id>/results')
+def session_results(session_id):
+    """Stream every result of one session, ordered by id."""
+    session = AuditSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        abort(403)
+
+    after = _id_cursor(request.args.get('since'))
+    if session.status == 'archived':
+        records = _archived_records(session, after[0] if after else 0)
+    else:
+        query = _results_query().filter(AuditResult.session_id == session_id)
+        records = (
+            _result_record(row, str(row.id))
+            for row in keyset_rows(query, (AuditResult.id,), after)
+        )
+    return _stream(records, RESULT_FIELDS, f'audit_{session_id}_results')
+
+
+@api_bp.route('/results')
+def results():
+    """Stream assessed results across all sessions in the order they were checked.
+
+    ``since`` is the ``cursor`` of the last record seen; only results checked
+    after it are returned, so a pipeline can poll incrementally. Results
+    still ``not_checked`` have no check time and are not part of this feed.
+    """
+    after = _result_cursor(request.args.get('since'))
+    query = _results_query().filter(
+        AuditSession.user_id == current_user.id,
+        AuditResult.checked_at.isnot(None),
+    )
+    benchmark_id = request.args.get('benchmark', type=int)
+    if benchmark_id:
+        query = query.filter(AuditSession.benchmark_id == benchmark_id)
+    status = request.args.get('status')
+    if status:
+        query = query.filter(AuditResult.status == status)
+
+    records = (
+        _result_record(row, f'{row.checked_at.isoformat()}|{row.id}')
+        for row in keyset_rows(query, (AuditResult.checked_at, AuditResult.id), after)
+    )
+    return _stream(records, RESULT_FIELDS, 'results')
+
+
+# --- Instrumentation -----------------------------------------------------------
+
+@api_bp.route('/metrics/templates')
+def template_metrics():
+    """Template render timings of the worker process that serves the request."""
+    return jsonify(pid=os.getpid(), items=template_timings())
+
+
+# --- Helpers -------------------------------------------------------------------
+
+def _results_query():
+    return db.session.query(
+        AuditResult.id, AuditResult.session_id, AuditSession.benchmark_id,
+        AuditSession.target_name, AuditSession.target_ip, AuditResult.check_id,
+        Check.check_number, AuditResult.status, AuditResult.finding, AuditResult.checked_at,
+    ).join(AuditSession, AuditResult.session_id == AuditSession.id).join(
+        Check, AuditResult.check_id == Check.id
+    )
+
+
+def _result_record(row, cursor):
+    return dict(row._mapping, cursor=cursor)
+
+
+def _archived_records(session, after):
+    for result in sorted(load_archive(session).results, key=lambda r: r.id):
+        if result.id > after:
+            yield {
+                'id': result.id, 'session_id': session.id, 'benchmark_id': session.benchmark_id,
+                'target_name': session.target_name, 'target_ip': session.target_ip,
+                'check_id': result.check_id, 'check_number': result.check.check_number,
+                'status': result.status, 'finding': result.finding, 'checked_at': result.checked_at,
+                'cursor': str(result.id),
+            }
+
+
+def _id_cursor(since):
+    if not since:
+        return None
+    if not since.isdigit():
+        abort(400, description='Invalid since cursor.')
+    return (int(since),)
+
+
+def _result_cursor(since):
+    if not since:
+        return None
+    checked_at, _sep, result_id = since.rpartition('|')
+    try:
+        return (datetime.fromisoformat(checked_at), int(result_id))
+    except ValueError:
+        abort(400, description='Invalid since cursor.')
+
+
+def _stream(records, fields, name):
+    """Stream records as NDJSON (default) or CSV (``?format=csv`` or ``Accept: text/csv``)."""
+    fmt = request.args.get('format')
+    if fmt is None:
+        best = request.accept_mimetypes.best_match(['application/x-ndjson', 'text/csv'])
+        fmt = 'csv' if best == 'text/csv' else 'ndjson'
+
+    if fmt == 'csv':
+        return Response(
+            stream_with_context(csv_lines(records, fields)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={name}.csv'},
+        )
+    if fmt == 'ndjson':
+        return Response(stream_with_context(ndjson_lines(records)), mimetype='application/x-ndjson')
+    abort(400, description='Unsupported format; use ndjson or csv.')
@@ -1,11 +1,31 @@
+import json
+import queue
+import time
 from datetime import datetime, timezone
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from flask import (
+    Blueprint, Response, render_template, request, redirect, url_for, flash, abort,
+    current_app, stream_with_context,
+)
 from flask_login import login_required, current_user
+from sqlalchemy.orm import contains_eager
 from ..extensions import db
-from ..models import Benchmark, BenchmarkSection, Check, AuditSession, AuditResult
+from ..models import Benchmark, Check, AuditSession, AuditResult, AuditResultEvent, AuditEvidence, SessionStats
+from ..utils.archive import load_archive
+from ..utils.audit_sessions import create_session
+from ..utils.compare import compare_sessions, CATEGORIES, CATEGORY_LABELS
+from ..utils.events import broker, sse_message
+from ..utils.excel_import import import_checklist, ChecklistImportError
+from ..utils.history import result_events, session_state_as_of
+from ..utils.offline import parse_timestamp, sync_results
+from ..utils.section_rollups import session_sections
+from ..utils.stats import record_result_changes, record_session_completed
+from ..utils.templating import stream_page
 
 audits_bp = Blueprint('audits', __name__, url_prefix='/audits')
 
+# Most recent result changes listed on a session's history page
+HISTORY_LIMIT = 200
+
 
 @audits_bp.route('/')
 @login_required
@@ -13,7 +33,54 @@ def list_audits():
     sessions = AuditSession.query.filter_by(
         user_id=current_user.id
     ).order_by(AuditSession.started_at.desc()).all()
-    return render_template('audits/list.html', sessions=sessions)
+    stats = {s.session_id: s for s in SessionStats.query.filter_by(user_id=current_user.id)}
+    return render_template('audits/list.html', sessions=sessions, stats=stats)
+
+
+@audits_bp.route('/compare')
+@login_required
+def compare():
+    baseline_id = request.args.get('a', type=int)
+    other_ids = [int(v) for v in request.args.getlist('b') if v.isdigit()]
+    my_sessions = AuditSession.query.filter_by(
+        user_id=current_user.id
+    ).order_by(AuditSession.started_at.desc()).all()
+
+    if not baseline_id or not other_ids:
+        return render_template('audits/compare.html', comparison=None, sessions=my_sessions)
+
+    baseline, others = load_comparison_sessions(baseline_id, other_ids)
+    if baseline is None:
+        flash('Sessions can only be compared against a baseline of the same benchmark.', 'error')
+        return render_template('audits/compare.html', comparison=None, sessions=my_sessions)
+
+    comparison = compare_sessions(baseline, others)
+    show = request.args.get('show', 'changes')
+    return render_template('audits/compare.html',
+                           comparison=comparison,
+                           sessions=my_sessions,
+                           show=show,
+                           categories=CATEGORIES,
+                           category_labels=CATEGORY_LABELS)
+
+
+def load_comparison_sessions(baseline_id, other_ids):
+    """Load a baseline and the sessions compared to it, enforcing ownership.
+
+    Returns ``(None, [])`` when the sessions are not all of one benchmark.
+    """
+    wanted = [baseline_id] + [sid for sid in dict.fromkeys(other_ids) if sid != baseline_id]
+    found = {s.id: s for s in AuditSession.query.filter(AuditSession.id.in_(wanted))}
+    if len(found) != len(wanted):
+        abort(404)
+    if any(s.user_id != current_user.id for s in found.values()):
+        abort(403)
+    baseline, others = found[baseline_id], [found[sid] for sid in wanted[1:]]
+    if not others:
+        return None, []
+    if any(s.benchmark_id != baseline.benchmark_id for s in others):
+        return None, []
+    return baseline, others
 
 
 @audits_bp.route('/new', methods=['GET', 'POST'])
@@ -31,31 +98,11 @@ def new_audit():
             return render_template('audits/new.html', benchmarks=benchmarks)
 
         benchmark = Benchmark.query.get_or_404(benchmark_id)
-
-        # Create session
-        session = AuditSession(
-            user_id=current_user.id,
-            benchmark_id=benchmark_id,
-            target_name=target_name or 'Unnamed Target',
-            target_ip=target_ip,
-            notes=notes
+        session, check_count = create_session(
+            current_user.id, benchmark, target_name, target_ip, notes
         )
-        db.session.add(session)
-        db.session.flush()
-
-        # Create audit result entries for all checks in benchmark
-        checks = Check.query.join(BenchmarkSection).filter(
-            BenchmarkSection.benchmark_id == benchmark_id
-        ).all()
-        for check in checks:
-            result = AuditResult(
-                session_id=session.id,
-                check_id=check.id
-            )
-            db.session.add(result)
-
         db.session.commit()
-        flash(f'Audit session created with {len(checks)} checks.', 'success')
+        flash(f'Audit session created with {check_count} checks.', 'success')
         return redirect(url_for('audits.session_detail', session_id=session.id))
 
     benchmarks = Benchmark.query.order_by(Benchmark.name).all()
@@ -69,14 +116,127 @@ def session_detail(session_id):
     if session.user_id != current_user.id:
         abort(403)
 
-    # Get results with checks, organized by section
-    results = AuditResult.query.filter_by(
-        session_id=session_id
-    ).join(Check).order_by(Check.check_number).all()
+    # Backfilling missing rollups commits, so read them before loading the results
+    sections = session_sections(session, max_depth=0)
 
-    return render_template('audits/session.html',
-                           session=session,
-                           results=results)
+    if session.status == 'archived':
+        archive = load_archive(session)
+        results, evidence_checks = archive.results, archive.evidence_checks
+    else:
+        # Get results with checks, organized by section; rows render while the page streams
+        results = AuditResult.query.filter_by(
+            session_id=session_id
+        ).join(Check, AuditResult.check_id == Check.id).options(
+            contains_eager(AuditResult.check)
+        ).order_by(Check.check_number).all()
+        evidence_checks = {
+            check_id for (check_id,) in db.session.query(AuditEvidence.check_id).filter_by(session_id=session_id)
+        }
+
+    return stream_page('audits/session.html',
+                       session=session,
+                       stats=db.session.get(SessionStats, session_id),
+                       sections=sections,
+                       results=results,
+                       evidence_checks=evidence_checks)
+
+
+@audits_bp.route('/<int:session_id>/events')
+@login_required
+def session_events(session_id):
+    """Server-sent events carrying re-rendered rows and counters as results change."""
+    session = AuditSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        abort(403)
+
+    config = current_app.config
+    # Each stream holds a worker thread, so the slot is taken here, before streaming
+    subscription = broker.subscribe(session_id, config['SSE_QUEUE_SIZE'], config['SSE_MAX_STREAMS'])
+    if subscription is None:
+        # A 200 stream that ends makes the browser itself reconnect after ``retry``;
+        # an error status would have the htmx extension retry within seconds
+        body = 'retry: 30000\n\n' + sse_message('status', render_template('audits/_live_paused.html'))
+        return Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    since = int(last_event_id) if last_event_id.isdigit() else None
+    response = Response(
+        stream_with_context(_session_event_stream(subscription, since)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    response.call_on_close(lambda: broker.unsubscribe(subscription))  # also if never iterated
+    return response
+
+
+def _session_event_stream(subscription, since=None):
+    """Yield events until the stream's time is up; the browser then reconnects.
+
+    ``since`` is the last event id the browser saw (milliseconds since the
+    epoch): after a reconnect, results changed since then are re-sent. They
+    are found in the result history as well as by ``checked_at``, which a
+    reset to not checked clears.
+    """
+    config = current_app.config
+    session_id = subscription.session_id
+    deadline = time.monotonic() + config['SSE_STREAM_SECONDS']
+    try:
+        yield f'retry: 3000\nid: {_event_id()}\n\n' + sse_message('status', '')
+        if since is not None:
+            checked_since = datetime.fromtimestamp(since / 1000, timezone.utc).replace(tzinfo=None)
+            checked = db.session.query(AuditResult.check_id).filter(
+                AuditResult.session_id == session_id, AuditResult.checked_at >= checked_since
+            )
+            changed = db.session.query(AuditResultEvent.check_id).filter(
+                AuditResultEvent.session_id == session_id, AuditResultEvent.changed_at >= checked_since
+            )
+            missed = [check_id for (check_id,) in checked.union(changed)]
+            yield _render_session_events(session_id, missed)
+        db.session.rollback()  # never hold a read transaction open while idle
+
+        while time.monotonic() < deadline:
+            try:
+                check_ids = subscription.get(timeout=config['SSE_HEARTBEAT'])
+            except queue.Empty:
+                yield f'id: {_event_id()}\n\n'  # keep-alive; also detects closed clients
+                continue
+            if check_ids is None:
+                yield sse_message('reload', '')
+                return
+            yield _render_session_events(session_id, check_ids)
+            db.session.rollback()
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _render_session_events(session_id, check_ids):
+    session = db.session.get(AuditSession, session_id)
+    results = AuditResult.query.filter(
+        AuditResult.session_id == session_id, AuditResult.check_id.in_(check_ids)
+    ).all() if check_ids else []
+    evidence_checks = {
+        check_id for (check_id,) in db.session.query(AuditEvidence.check_id).filter(
+            AuditEvidence.session_id == session_id, AuditEvidence.check_id.in_(check_ids)
+        )
+    } if check_ids else set()
+
+    events = [
+        sse_message(f'result-{result.id}', render_template(
+            'audits/_result_row.html', result=result, session=session, evidence_checks=evidence_checks
+        ))
+        for result in results
+    ]
+    events.append(sse_message('progress', render_template(
+        'audits/_progress.html', stats=db.session.get(SessionStats, session_id)
+    )))
+    events.append(sse_message('sections', render_template(
+        'audits/_sections.html', sections=session_sections(session, max_depth=0)
+    )))
+    return f'id: {_event_id()}\n' + ''.join(events)
+
+
+def _event_id():
+    return int(time.time() * 1000)
 
 
 @audits_bp.route('/<int:session_id>/check/<int:check_id>', methods=['POST'])
@@ -95,28 +255,207 @@ def update_result(session_id, check_id):
     finding = request.form.get('finding', '').strip()
 
     if status in ('pass', 'fail', 'not_applicable', 'not_checked'):
+        old_status = result.status
         result.status = status
         result.finding = finding
         result.checked_at = datetime.now(timezone.utc) if status != 'not_checked' else None
+        record_result_changes(session, [(check_id, old_status, status, finding)], 'web',
+                              actor_id=current_user.id)
         db.session.commit()
 
     # Return HTMX partial
     if request.headers.get('HX-Request'):
+        evidence_checks = {
+            check_id for (check_id,) in db.session.query(AuditEvidence.check_id).filter_by(
+                session_id=session_id, check_id=check_id
+            )
+        }
         return render_template('audits/_result_row.html',
-                               result=result, session=session)
+                               result=result, session=session,
+                               evidence_checks=evidence_checks)
 
     return redirect(url_for('audits.session_detail', session_id=session_id))
 
 
+@audits_bp.route('/<int:session_id>/evidence/<int:check_id>')
+@login_required
+def evidence(session_id, check_id):
+    session = AuditSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        abort(403)
+
+    if session.status == 'archived':
+        archive = load_archive(session)
+        evidence, result = archive.evidence(check_id), archive.result(check_id)
+        if evidence is None:
+            abort(404)
+    else:
+        evidence = AuditEvidence.query.filter_by(
+            session_id=session_id,
+            check_id=check_id
+        ).first_or_404()
+        result = AuditResult.query.filter_by(session_id=session_id, check_id=check_id).first()
+
+    return render_template('audits/evidence.html',
+                           session=session,
+                           evidence=evidence,
+                           check=db.session.get(Check, check_id),
+                           result=result)
+
+
+@audits_bp.route('/<int:session_id>/history')
+@login_required
+def history(session_id):
+    session = AuditSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        abort(403)
+
+    check_id = request.args.get('check', type=int)
+    at = request.args.get('at', '').strip()
+    as_of = None
+    if at:
+        try:
+            as_of = datetime.fromisoformat(at)
+        except ValueError:
+            flash('Enter the time as YYYY-MM-DD HH:MM (UTC).', 'error')
+        else:
+            if as_of.tzinfo is not None:
+                as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+
+    archive = load_archive(session) if session.status == 'archived' else None
+    if archive is not None:
+        checks = {result.check_id: result.check for result in archive.results}
+    else:
+        checks = dict(
+            db.session.query(AuditResult.check_id, Check).join(Check, AuditResult.check_id == Check.id)
+            .filter(AuditResult.session_id == session_id)
+        )
+    if as_of is not None:
+        state = archive.state_as_of(as_of) if archive else session_state_as_of(session_id, as_of)
+        rows = [(check, state.get(check.id)) for check in sorted(checks.values(), key=lambda c: c.check_number)]
+        return render_template('audits/history.html', session=session, as_of=as_of, rows=rows,
+                               started=as_of >= session.started_at.replace(tzinfo=None))
+
+    limit = None if check_id else HISTORY_LIMIT
+    if archive is not None:
+        events = archive.events(check_id, limit)
+    else:
+        events = result_events(session_id, check_id=check_id, limit=limit)
+    return render_template('audits/history.html', session=session, as_of=None, checks=checks,
+                           events=events, check=checks.get(check_id))
+
+
 @audits_bp.route('/<int:session_id>/complete', methods=['POST'])
 @login_required
 def complete_session(session_id):
     session = AuditSession.query.get_or_404(session_id)
     if session.user_id != current_user.id:
         abort(403)
+    if session.status == 'archived':
+        flash('Archived audit sessions cannot be modified.', 'error')
+        return redirect(url_for('audits.session_detail', session_id=session_id))
 
     session.status = 'completed'
     session.completed_at = datetime.now(timezone.utc)
+    record_session_completed(session)
     db.session.commit()
     flash('Audit session marked as complete.', 'success')
     return redirect(url_for('audits.session_detail', session_id=session_id))
+
+
+@audits_bp.route('/import', methods=['GET', 'POST'])
+@audits_bp.route('/<int:session_id>/import', methods=['GET', 'POST'])
+@login_required
+def import_results(session_id=None):
+    session = None
+    if session_id is not None:
+        session = AuditSession.query.get_or_404(session_id)
+        if session.user_id != current_user.id:
+            abort(403)
+        if session.status != 'in_progress':
+            flash('Completed audit sessions cannot be modified.', 'error')
+            return redirect(url_for('audits.session_detail', session_id=session_id))
+
+    benchmarks = Benchmark.query.order_by(Benchmark.name).all()
+    if request.method == 'GET':
+        return render_template('audits/import.html', session=session, benchmarks=benchmarks)
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Please choose a filled-in checklist (.xlsx) to upload.', 'error')
+        return render_template('audits/import.html', session=session, benchmarks=benchmarks)
+
+    if session is None:
+        benchmark_id = request.form.get('benchmark_id', type=int)
+        if not benchmark_id:
+            flash('Please select a benchmark.', 'error')
+            return render_template('audits/import.html', session=session, benchmarks=benchmarks)
+        benchmark = Benchmark.query.get_or_404(benchmark_id)
+        session, _ = create_session(
+            current_user.id, benchmark,
+            request.form.get('target_name', '').strip(),
+            request.form.get('target_ip', '').strip(),
+            request.form.get('notes', '').strip(),
+        )
+
+    # Session creation and every result update share one transaction
+    try:
+        report = import_checklist(upload.stream, session)
+    except ChecklistImportError as exc:
+        db.session.rollback()
+        flash(f'Could not import checklist: {exc}', 'error')
+        return render_template('audits/import.html',
+                               session=session if session_id else None,
+                               benchmarks=benchmarks)
+    db.session.commit()
+
+    flash(f'Imported {report["rows"]} rows ({report["updated"]} updated, '
+          f'{report["unchanged"]} unchanged) in {report["seconds"]:.2f}s '
+          f'- {report["rows_per_second"]} rows/s.', 'success')
+    skipped = report['unknown'] + report['invalid']
+    if skipped:
+        flash(f'Skipped {len(skipped)} rows with unknown check numbers or statuses: '
+              f'{", ".join(skipped[:10])}{" ..." if len(skipped) > 10 else ""}', 'info')
+    return redirect(url_for('audits.session_detail', session_id=session.id))
+
+
+@audits_bp.route('/<int:session_id>/sync', methods=['GET', 'POST'])
+@login_required
+def sync(session_id):
+    """Upload the changes file saved by an offline bundle."""
+    session = AuditSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        abort(403)
+    if session.status != 'in_progress':
+        flash('Completed audit sessions cannot be modified.', 'error')
+        return redirect(url_for('audits.session_detail', session_id=session_id))
+
+    if request.method == 'GET':
+        return render_template('audits/sync.html', session=session, report=None)
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Please choose a changes file (.json) to upload.', 'error')
+        return render_template('audits/sync.html', session=session, report=None)
+    try:
+        data = json.load(upload.stream)
+        if data.get('session_id') not in (None, session.id):
+            raise ValueError('the changes were made in another audit session')
+        changes = data['changes']
+        if not isinstance(changes, list):
+            raise ValueError('"changes" is not a list')
+        since = parse_timestamp(data['since']) if data.get('since') else None
+    except (ValueError, KeyError, AttributeError) as exc:
+        flash(f'Could not read changes file: {exc}', 'error')
+        return render_template('audits/sync.html', session=session, report=None)
+
+    report = sync_results(session, changes, since, current_user.id)
+    db.session.commit()
+    flash(f'Synced {len(changes)} changes: {report["applied"]} applied, '
+          f'{report["unchanged"]} unchanged, {len(report["conflicts"])} kept from the server.', 'success')
+    checks = dict(
+        db.session.query(Check.id, Check.check_number).filter(
+            Check.id.in_([conflict['check_id'] for conflict in report['conflicts']])
+        )
+    ) if report['conflicts'] else {}
+    return render_template('audits/sync.html', session=session, report=report, checks=checks)
@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, abort
 from flask_login import login_user, logout_user, login_required, current_user
 from ..extensions import db
 from ..models.user import User
+from ..models.token import ApiToken, TOKEN_SCOPES
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -42,6 +43,9 @@ def register():
             flash('Passwords do not match.', 'error')
         elif len(password) < 8:
             flash('Password must be at least 8 characters.', 'error')
+        elif username.casefold() in {name.casefold() for name in current_app.config['ADMIN_USERNAMES']}:
+            # Admin rights follow the username; admins are created by seed.py only
+            flash('That username is reserved.', 'error')
         elif User.query.filter_by(username=username).first():
             flash('Username already exists.', 'error')
         else:
@@ -64,3 +68,39 @@ def logout():
     logout_user()
     flash('You have been logged out.', 'info')
     return redirect(url_for('auth.login'))
+
+
+@auth_bp.route('/tokens', methods=['GET', 'POST'])
+@login_required
+def tokens():
+    plaintext = None
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        scope = request.form.get('scope', 'read')
+        if not name:
+            flash('Token name is required.', 'error')
+        elif scope not in TOKEN_SCOPES:
+            flash('Invalid scope.', 'error')
+        else:
+            _token, plaintext = ApiToken.issue(current_user.id, name, scope)
+            db.session.commit()
+            flash('Token created. Copy it now; it will not be shown again.', 'success')
+
+    api_tokens = ApiToken.query.filter_by(
+        user_id=current_user.id
+    ).order_by(ApiToken.created_at.desc()).all()
+    return render_template('auth/tokens.html', api_tokens=api_tokens,
+                           plaintext=plaintext, scopes=TOKEN_SCOPES)
+
+
+@auth_bp.route('/tokens/<int:token_id>/revoke', methods=['POST'])
+@login_required
+def revoke_token(token_id):
+    token = ApiToken.query.get_or_404(token_id)
+    if token.user_id != current_user.id:
+        abort(403)
+
+    token.revoke()
+    db.session.commit()
+    flash(f'Token "{token.name}" revoked.', 'info')
+    return redirect(url_for('auth.tokens'))
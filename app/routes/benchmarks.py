@@ -1,12 +1,15 @@
 from flask import Blueprint, render_template, abort
 from flask_login import login_required
 from ..models import Benchmark, BenchmarkSection, Check
+from ..utils.compression import reference_page
+from ..utils.templating import stream_page
 
 benchmarks_bp = Blueprint('benchmarks', __name__, url_prefix='/benchmarks')
 
 
 @benchmarks_bp.route('/')
 @login_required
+@reference_page
 def list_benchmarks():
     benchmarks = Benchmark.query.join(Benchmark.platform).order_by(Benchmark.name).all()
     return render_template('benchmarks/list.html', benchmarks=benchmarks)
@@ -14,6 +17,7 @@ def list_benchmarks():
 
 @benchmarks_bp.route('/<int:benchmark_id>')
 @login_required
+@reference_page
 def detail(benchmark_id):
     benchmark = Benchmark.query.get_or_404(benchmark_id)
     # Get top-level sections
@@ -40,11 +44,11 @@ def section(benchmark_id, section_id):
     # Build breadcrumb
     breadcrumb = _build_breadcrumb(section)
 
-    return render_template('benchmarks/section.html',
-                           benchmark=benchmark,
-                           section=section,
-                           checks=checks,
-                           breadcrumb=breadcrumb)
+    return stream_page('benchmarks/section.html',
+                       benchmark=benchmark,
+                       section=section,
+                       checks=checks,
+                       breadcrumb=breadcrumb)
 
 
 def _get_section_checks(section):
@@ -1,12 +1,19 @@
 from flask import Blueprint, render_template, request
 from flask_login import login_required
 from ..models import Check, BenchmarkSection, Benchmark, Platform
+from ..utils.compression import reference_page
+from ..utils.related import collapse_related, related_checks
+
+# Search results shown, and checks fetched to fill them when related ones are collapsed
+SEARCH_LIMIT = 50
+COLLAPSED_FETCH = 250
 
 checks_bp = Blueprint('checks', __name__, url_prefix='/checks')
 
 
 @checks_bp.route('/<int:check_id>')
 @login_required
+@reference_page
 def detail(check_id):
     check = Check.query.get_or_404(check_id)
     section = check.section
@@ -23,7 +30,8 @@ def detail(check_id):
                            check=check,
                            section=section,
                            benchmark=benchmark,
-                           breadcrumb=breadcrumb)
+                           breadcrumb=breadcrumb,
+                           related=related_checks(check.id))
 
 
 @checks_bp.route('/search')
@@ -33,6 +41,8 @@ def search():
     platform_slug = request.args.get('platform', '')
     level = request.args.get('level', '')
     scored = request.args.get('scored', '')
+    # The same control on other platforms is shown once, unless one platform is picked
+    collapse = request.args.get('collapse', 'true') != 'false' and not platform_slug
 
     checks_query = Check.query.join(BenchmarkSection).join(Benchmark)
 
@@ -56,16 +66,21 @@ def search():
     if scored in ('true', 'false'):
         checks_query = checks_query.filter(Check.scored == (scored == 'true'))
 
-    checks = checks_query.order_by(Check.check_number).limit(50).all()
+    checks_query = checks_query.order_by(Check.check_number)
+    if collapse:
+        results = collapse_related(checks_query.limit(COLLAPSED_FETCH).all())[:SEARCH_LIMIT]
+    else:
+        results = [(check, []) for check in checks_query.limit(SEARCH_LIMIT)]
 
     # If HTMX request, return partial
     if request.headers.get('HX-Request'):
-        return render_template('checks/_search.html', checks=checks, query=query)
+        return render_template('checks/_search.html', results=results, query=query)
 
     # Full page search
     platforms = Platform.query.order_by(Platform.name).all()
     return render_template('checks/search.html',
-                           checks=checks,
+                           results=results,
+                           collapse=collapse,
                            query=query,
                            platforms=platforms,
                            selected_platform=platform_slug,
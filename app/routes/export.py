@@ -1,7 +1,21 @@
-from flask import Blueprint, send_file, request
+import io
+import os
+import unicodedata
+from urllib.parse import quote
+from flask import (
+    Blueprint, Response, current_app, send_file, render_template, request, flash, redirect, url_for,
+    stream_with_context,
+)
 from flask_login import login_required, current_user
 from ..models import Benchmark, AuditSession
-from ..utils.excel_export import export_benchmark_to_excel, export_audit_to_excel
+from ..utils.excel_export import (
+    export_benchmark_to_excel, export_audit_to_excel, export_comparison_to_excel,
+)
+from ..utils.export_bundle import bundle_checklists, checklist_filename, stream_bundle
+from ..utils.compare import compare_sessions
+from ..utils.offline import build_offline_bundle
+from ..utils.xccdf_results import arf_document, test_result_document
+from .audits import load_comparison_sessions
 
 export_bp = Blueprint('export', __name__, url_prefix='/export')
 
@@ -17,7 +31,7 @@ def export_benchmark(benchmark_id):
 
     output = export_benchmark_to_excel(benchmark, level=level, scored_only=scored_only)
 
-    filename = f'CIS_Checklist_{benchmark.platform.slug}_{benchmark.version}.xlsx'
+    filename = checklist_filename(benchmark)
     return send_file(
         output,
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
@@ -26,6 +40,36 @@ def export_benchmark(benchmark_id):
     )
 
 
+@export_bp.route('/bundle')
+@login_required
+def bundle():
+    benchmarks = Benchmark.query.order_by(Benchmark.name).all()
+    return render_template('export/bundle.html', benchmarks=benchmarks)
+
+
+@export_bp.route('/bundle.zip')
+@login_required
+def export_bundle():
+    benchmark_ids = [int(v) for v in request.args.getlist('benchmark') if v.isdigit()]
+    benchmarks = Benchmark.query.filter(Benchmark.id.in_(benchmark_ids)).order_by(Benchmark.name).all()
+    if not benchmarks:
+        flash('Select at least one benchmark to export.', 'error')
+        return redirect(url_for('export.bundle'))
+
+    level = request.args.get('level', type=int)
+    scored_only = request.args.get('scored_only', 'false') == 'true'
+
+    # Load everything before streaming; the workbooks are built without the database
+    checklists = bundle_checklists(benchmarks, level=level, scored_only=scored_only)
+    workers = current_app.config['EXPORT_WORKERS'] or os.cpu_count() or 1
+
+    return Response(
+        stream_bundle(checklists, workers),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename=CIS_Checklists.zip'},
+    )
+
+
 @export_bp.route('/audit/<int:session_id>')
 @login_required
 def export_audit(session_id):
@@ -44,3 +88,105 @@ def export_audit(session_id):
         as_attachment=True,
         download_name=filename
     )
+
+
+@export_bp.route('/audit/<int:session_id>/xccdf')
+@login_required
+def export_audit_xccdf(session_id):
+    """Stream the session's results as an XCCDF 1.2 TestResult document."""
+    session = AuditSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        from flask import abort
+        abort(403)
+
+    target = session.target_name.replace(' ', '_') if session.target_name else 'audit'
+    response = Response(stream_with_context(test_result_document(session)), mimetype='application/xml')
+    return _attachment(response, f'Audit_Results_{target}_{session.id}-xccdf.xml')
+
+
+@export_bp.route('/audits/arf')
+@login_required
+def export_audits_arf():
+    """Stream several sessions as one ARF report collection.
+
+    Takes session ids (``?session=``), or else every own session matching
+    ``benchmark`` and ``status`` (completed and archived by default).
+    """
+    sessions = AuditSession.query.filter(AuditSession.user_id == current_user.id)
+    session_ids = [int(v) for v in request.args.getlist('session') if v.isdigit()]
+    if session_ids:
+        sessions = sessions.filter(AuditSession.id.in_(session_ids))
+    else:
+        benchmark_id = request.args.get('benchmark', type=int)
+        if benchmark_id:
+            sessions = sessions.filter(AuditSession.benchmark_id == benchmark_id)
+        statuses = request.args.getlist('status') or ['completed', 'archived']
+        sessions = sessions.filter(AuditSession.status.in_(statuses))
+    if sessions.first() is None:
+        flash('No audit sessions to export.', 'error')
+        return redirect(url_for('audits.list_audits'))
+
+    return Response(
+        stream_with_context(arf_document(sessions)),
+        mimetype='application/xml',
+        headers={'Content-Disposition': 'attachment; filename=Audit_Results-arf.xml'},
+    )
+
+
+@export_bp.route('/audit/<int:session_id>/offline')
+@login_required
+def export_offline(session_id):
+    """Download the session as an offline bundle to work from in the field."""
+    session = AuditSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        from flask import abort
+        abort(403)
+    if session.status != 'in_progress':
+        # Only open sessions accept the changes a bundle saves
+        flash('Only audit sessions in progress can be worked on offline.', 'error')
+        return redirect(url_for('audits.session_detail', session_id=session_id))
+
+    target = session.target_name.replace(' ', '_') if session.target_name else 'audit'
+    return send_file(
+        io.BytesIO(build_offline_bundle(session)),
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=f'Audit_Offline_{target}_{session.id}.zip'
+    )
+
+
+@export_bp.route('/compare')
+@login_required
+def export_comparison():
+    baseline_id = request.args.get('a', type=int)
+    other_ids = [int(v) for v in request.args.getlist('b') if v.isdigit()]
+    baseline, others = (None, [])
+    if baseline_id and other_ids:
+        baseline, others = load_comparison_sessions(baseline_id, other_ids)
+    if baseline is None:
+        flash('Sessions can only be compared against a baseline of the same benchmark.', 'error')
+        return redirect(url_for('audits.compare'))
+
+    output = export_comparison_to_excel(compare_sessions(baseline, others))
+
+    target = baseline.target_name.replace(' ', '_') if baseline.target_name else 'audit'
+    filename = f'Audit_Comparison_{target}_{baseline.started_at.strftime("%Y%m%d")}.xlsx'
+    return send_file(
+        output,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name=filename
+    )
+
+
+def _attachment(response, filename):
+    """Set Content-Disposition as ``send_file`` does: quoted, with an RFC 5987 name if not ASCII."""
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='')}"}
+    else:
+        names = {'filename': filename}
+    response.headers.set('Content-Disposition', 'attachment', **names)
+    return response
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
-from ..models import Platform, Benchmark, Check, AuditSession
+from ..extensions import db
+from ..models import PlatformStats, UserStats, SessionStats
 
 main_bp = Blueprint('main', __name__)
 
@@ -8,15 +9,20 @@ main_bp = Blueprint('main', __name__)
 @main_bp.route('/')
 @login_required
 def dashboard():
-    platforms = Platform.query.order_by(Platform.name).all()
-    benchmarks = Benchmark.query.all()
-    total_checks = Check.query.count()
-    recent_audits = AuditSession.query.filter_by(
+    # Reads only from the rollup tables maintained by utils.stats
+    platforms = PlatformStats.query.order_by(PlatformStats.name).all()
+    benchmark_count = sum(p.benchmark_count for p in platforms)
+    total_checks = sum(p.check_count for p in platforms)
+    user_stats = db.session.get(UserStats, current_user.id) or UserStats(
+        open_sessions=0, completed_sessions=0, recent_passed=0, recent_checked=0
+    )
+    recent_audits = SessionStats.query.filter_by(
         user_id=current_user.id
-    ).order_by(AuditSession.started_at.desc()).limit(5).all()
+    ).order_by(SessionStats.started_at.desc()).limit(5).all()
 
     return render_template('main/dashboard.html',
                            platforms=platforms,
-                           benchmarks=benchmarks,
+                           benchmark_count=benchmark_count,
                            total_checks=total_checks,
+                           user_stats=user_stats,
                            recent_audits=recent_audits)
@@ -0,0 +1,177 @@
+"""Cross-session compliance trend aggregates.
+
+Outcomes are bucketed by the quarter in which a session started, so a
+quarterly audit of the same target lands in its own period. The aggregate
+tables are adjusted incrementally from ``utils.stats`` and the analytics
+views never scan ``audit_results``.
+"""
+from collections import defaultdict
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from ..extensions import db
+from ..models import (
+    Check, AuditSession, AuditResult, SessionStats,
+    BenchmarkPeriodStats, CheckPeriodStats,
+)
+
+# AuditResult.status -> aggregate counter column
+_STATUS_COUNTERS = {
+    'pass': 'passed',
+    'fail': 'failed',
+    'not_applicable': 'not_applicable',
+}
+_BENCHMARK_COUNTERS = ('sessions', 'checked', *_STATUS_COUNTERS.values())
+
+
+def period_for(moment):
+    """Return the reporting period (``YYYY-Qn``) for a datetime."""
+    return f'{moment.year}-Q{(moment.month - 1) // 3 + 1}'
+
+
+def record_session(session):
+    """Count a newly created session in its benchmark's period."""
+    _increment(BenchmarkPeriodStats, _BENCHMARK_COUNTERS, [{
+        'benchmark_id': session.benchmark_id, 'period': period_for(session.started_at),
+        **dict.fromkeys(_BENCHMARK_COUNTERS, 0), 'sessions': 1,
+    }])
+
+
+def record_outcome_changes(session, changes):
+    """Apply ``(check_id, old_status, new_status)`` transitions to the aggregates."""
+    if not changes:
+        return
+    period = period_for(session.started_at)
+    bench_totals = dict.fromkeys(_BENCHMARK_COUNTERS, 0)
+    check_totals = defaultdict(lambda: dict.fromkeys(_STATUS_COUNTERS.values(), 0))
+    for check_id, old_status, new_status in changes:
+        for status, delta in ((old_status, -1), (new_status, 1)):
+            column = _STATUS_COUNTERS.get(status)
+            if column:
+                check_totals[check_id][column] += delta
+                bench_totals[column] += delta
+            if status and status != 'not_checked':
+                bench_totals['checked'] += delta
+
+    if any(bench_totals.values()):
+        _increment(BenchmarkPeriodStats, _BENCHMARK_COUNTERS, [{
+            'benchmark_id': session.benchmark_id, 'period': period, **bench_totals,
+        }])
+    rows = [
+        {'check_id': check_id, 'period': period, 'benchmark_id': session.benchmark_id, **totals}
+        for check_id, totals in check_totals.items()
+    ]
+    if rows:
+        _increment(CheckPeriodStats, _STATUS_COUNTERS.values(), rows)
+
+
+def rebuild_analytics():
+    """Recompute the trend aggregates from audit_results.
+
+    Only needed to backfill history recorded before the aggregates existed.
+    Archived sessions are read from the archive.
+    """
+    from .archive import archived_statuses  # the archive module builds on the stats modules
+
+    CheckPeriodStats.query.delete()
+    BenchmarkPeriodStats.query.delete()
+
+    for session in AuditSession.query.order_by(AuditSession.id).all():
+        record_session(session)
+        if session.status == 'archived':
+            rows = [(check_id, status) for check_id, status in archived_statuses(session.id).items()
+                    if status != 'not_checked']
+        else:
+            rows = db.session.query(AuditResult.check_id, AuditResult.status).filter(
+                AuditResult.session_id == session.id,
+                AuditResult.status != 'not_checked',
+            )
+        record_outcome_changes(session, [(check_id, None, status) for check_id, status in rows])
+        db.session.flush()
+
+
+def _increment(model, counters, rows):
+    """Add the ``counters`` of ``rows`` to the model's rows, creating missing ones.
+
+    Each row holds every column of the table, with deltas for the counters.
+    The addition is done in SQL so that concurrent sessions do not lose each
+    other's updates.
+    """
+    table = model.__table__
+    keys = [column.name for column in table.primary_key]
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: table.c[name] + statement.excluded[name] for name in counters},
+    )
+    db.session.execute(statement, rows)
+
+
+# --- Queries -----------------------------------------------------------------
+
+def benchmark_trend(benchmark_id):
+    """Per-period compliance for one benchmark, oldest first."""
+    return BenchmarkPeriodStats.query.filter_by(
+        benchmark_id=benchmark_id
+    ).order_by(BenchmarkPeriodStats.period).all()
+
+
+def top_failed_checks(benchmark_id=None, period=None, limit=20):
+    """Rank checks by how often they failed across all sessions.
+
+    Returns ``(check, failed, checked)`` tuples, most failures first.
+    """
+    failed = func.sum(CheckPeriodStats.failed).label('failed')
+    checked = func.sum(
+        CheckPeriodStats.passed + CheckPeriodStats.failed + CheckPeriodStats.not_applicable
+    ).label('checked')
+    ranking = db.session.query(CheckPeriodStats.check_id, failed, checked)
+    if benchmark_id:
+        ranking = ranking.filter(CheckPeriodStats.benchmark_id == benchmark_id)
+    if period:
+        ranking = ranking.filter(CheckPeriodStats.period == period)
+    ranking = ranking.group_by(CheckPeriodStats.check_id).having(failed > 0).order_by(
+        failed.desc(), CheckPeriodStats.check_id
+    ).limit(limit).all()
+
+    checks = {c.id: c for c in Check.query.filter(Check.id.in_([r.check_id for r in ranking]))}
+    return [(checks[r.check_id], r.failed, r.checked) for r in ranking if r.check_id in checks]
+
+
+def check_trend(check_id):
+    """Per-period outcome totals for one check, oldest first."""
+    return CheckPeriodStats.query.filter_by(
+        check_id=check_id
+    ).order_by(CheckPeriodStats.period).all()
+
+
+def target_history(target_name, target_ip=None, user_id=None):
+    """All sessions recorded against a target, oldest first.
+
+    Pass ``user_id`` to restrict the history to that user's sessions.
+    """
+    query = SessionStats.query.filter_by(target_name=target_name)
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    if target_ip:
+        query = query.filter_by(target_ip=target_ip)
+    return query.order_by(SessionStats.started_at).all()
+
+
+def targets(benchmark_id=None, user_id=None, limit=100):
+    """Audited targets with their session count and most recent audit.
+
+    Pass ``user_id`` to count only that user's sessions.
+    """
+    query = db.session.query(
+        SessionStats.target_name,
+        SessionStats.target_ip,
+        func.count(SessionStats.session_id).label('sessions'),
+        func.max(SessionStats.started_at).label('last_audit'),
+    )
+    if benchmark_id:
+        query = query.filter(SessionStats.benchmark_id == benchmark_id)
+    if user_id is not None:
+        query = query.filter(SessionStats.user_id == user_id)
+    return query.group_by(SessionStats.target_name, SessionStats.target_ip).order_by(
+        func.max(SessionStats.started_at).desc()
+    ).limit(limit).all()
@@ -0,0 +1,276 @@
+"""Archival tier for completed audit sessions.
+
+Completed sessions older than ``ARCHIVE_AFTER_DAYS`` are moved out of the
+audit database by ``archive.py``. They go into the ``archive`` database
+(``ARCHIVE_DATABASE_PATH``, by default ``<audit db>_archive.db``) as one
+``archived_sessions`` row each. The row holds the session's results, evidence
+and history as zlib-compressed JSON. The session row and its
+``session_stats`` counters stay behind with status ``archived``, so listings,
+the dashboard and analytics are unchanged. ``audit_results``,
+``audit_evidence``, ``audit_result_events`` and ``section_rollups`` keep only
+the sessions still in use, however many years of history are archived.
+
+Archived sessions are read-only. Their pages, exports and API results decode
+the row on demand (``load_archive``). ``restore_session`` moves a session back.
+
+The two databases are written one after the other. Archiving commits the
+archive row before the audit rows are deleted; restoring re-inserts the audit
+rows before the archive row is deleted. An interrupted run leaves both copies,
+and running it again finishes the job.
+"""
+import json
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+from types import SimpleNamespace
+from sqlalchemy import insert
+from ..extensions import db
+from ..models import (
+    ArchivedSession, AuditEvidence, AuditResult, AuditResultEvent, AuditSession, Check,
+    SectionRollup, User,
+)
+from . import section_rollups
+from .catalog import sibling_database_path
+from .history import result_log
+from .stats import record_session_archived
+
+ARCHIVE_BIND = 'archive'
+ARCHIVE_FORMAT = 1
+
+_RESULT_FIELDS = ('id', 'check_id', 'status', 'finding', 'checked_at')
+_EVIDENCE_FIELDS = (
+    'id', 'check_id', 'command', 'stdout', 'stderr', 'exit_code', 'timed_out', 'truncated',
+    'duration_ms', 'proposed_status', 'collected_at',
+)
+_EVENT_FIELDS = ('id', 'check_id', 'status', 'finding', 'actor_id', 'source', 'changed_at')
+_TIME_FIELDS = ('checked_at', 'collected_at', 'changed_at')
+
+
+class ArchiveError(ValueError):
+    """Raised when a session cannot be archived or restored."""
+
+
+def configure_archive(app):
+    """Point the ``archive`` bind at its own file; call before ``db.init_app``.
+
+    With an in-memory audit database and no ARCHIVE_DATABASE_PATH the
+    archive shares the audit database instead (see ``init_archive``).
+    """
+    path = app.config.get('ARCHIVE_DATABASE_PATH')
+    path = os.path.abspath(path) if path else sibling_database_path(app, 'archive')
+    app.config['ARCHIVE_DATABASE_PATH'] = path
+    if path is None:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[ARCHIVE_BIND] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_archive(app):
+    """Create the archive table if needed."""
+    with app.app_context():
+        if app.config['ARCHIVE_DATABASE_PATH'] is None:
+            db.engines[ARCHIVE_BIND] = db.engines[None]  # single-database mode
+        db.create_all(bind_key=ARCHIVE_BIND)
+
+
+# --- Archiving -------------------------------------------------------------------
+
+def archive_candidates(older_than_days, limit=None):
+    """Completed sessions whose completion is more than ``older_than_days`` ago, oldest first."""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=older_than_days)
+    query = AuditSession.query.filter(
+        AuditSession.status == 'completed', AuditSession.completed_at < cutoff
+    ).order_by(AuditSession.completed_at)
+    return query.limit(limit).all() if limit else query.all()
+
+
+def archive_session(session):
+    """Move a completed session's rows into the archive and commit.
+
+    Returns the ``ArchivedSession`` row.
+    """
+    if session.status != 'completed':
+        raise ArchiveError(f'Session {session.id} is {session.status}; only completed sessions are archived.')
+    result_log.flush()  # its last history events may still be buffered
+
+    results = _rows(AuditResult, _RESULT_FIELDS, session.id)
+    evidence = _rows(AuditEvidence, _EVIDENCE_FIELDS, session.id)
+    history = _rows(AuditResultEvent, _EVENT_FIELDS, session.id)
+    blobs, raw_size = {}, 0
+    for name, document in (
+        ('results', {'results': results, 'evidence_checks': [row[1] for row in evidence]}),
+        ('evidence', evidence),
+        ('history', history),
+    ):
+        data = json.dumps(document, separators=(',', ':')).encode()
+        raw_size += len(data)
+        blobs[name] = zlib.compress(data, 9)
+
+    archived = db.session.merge(ArchivedSession(
+        session_id=session.id,
+        user_id=session.user_id,
+        benchmark_id=session.benchmark_id,
+        target_name=session.target_name,
+        completed_at=session.completed_at,
+        archived_at=datetime.now(timezone.utc),
+        format=ARCHIVE_FORMAT,
+        result_count=len(results),
+        raw_size=raw_size,
+        **blobs,
+    ))
+    db.session.commit()  # the archived copy is durable before anything is deleted
+
+    _delete_rows(session.id)
+    session.status = 'archived'
+    record_session_archived(session)
+    db.session.commit()
+    return archived
+
+
+def restore_session(session):
+    """Move an archived session back into the audit database and commit."""
+    archived = db.session.get(ArchivedSession, session.id)
+    if session.status != 'archived' or archived is None:
+        raise ArchiveError(f'Session {session.id} is not archived.')
+    _check_format(archived)
+
+    _delete_rows(session.id)  # left over from an interrupted restore
+    document = _unpack(archived.results)
+    for model, fields, rows in (
+        (AuditResult, _RESULT_FIELDS, document['results']),
+        (AuditEvidence, _EVIDENCE_FIELDS, _unpack(archived.evidence)),
+        (AuditResultEvent, _EVENT_FIELDS, _unpack(archived.history)),
+    ):
+        if rows:
+            db.session.execute(insert(model), [
+                dict(_record(fields, row), session_id=session.id) for row in rows
+            ])
+    section_rollups.record_session(session, {row[1]: row[2] for row in document['results']})
+    session.status = 'completed'
+    record_session_archived(session)
+    db.session.commit()
+
+    db.session.delete(archived)
+    db.session.commit()
+
+
+def vacuum_audit_database():
+    """Rebuild the audit database file so the space of archived rows is returned."""
+    with db.engines[None].connect() as conn:
+        conn.execution_options(isolation_level='AUTOCOMMIT').exec_driver_sql('VACUUM')
+
+
+def _rows(model, fields, session_id):
+    return [
+        [_iso(value) if field in _TIME_FIELDS else value for field, value in zip(fields, row)]
+        for row in db.session.query(*(getattr(model, field) for field in fields))
+        .filter(model.session_id == session_id).order_by(model.id)
+    ]
+
+
+def _delete_rows(session_id):
+    for model in (AuditResult, AuditEvidence, AuditResultEvent, SectionRollup):
+        model.query.filter_by(session_id=session_id).delete(synchronize_session=False)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _record(fields, row):
+    return {
+        field: datetime.fromisoformat(value) if field in _TIME_FIELDS and value else value
+        for field, value in zip(fields, row)
+    }
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+def _check_format(archived):
+    if archived.format != ARCHIVE_FORMAT:
+        raise ArchiveError(f'Archive of session {archived.session_id} has unknown format {archived.format}.')
+
+
+# --- Reading ---------------------------------------------------------------------
+
+def archived_statuses(session_id):
+    """``{check_id: status}`` of an archived session."""
+    archived = db.session.get(ArchivedSession, session_id)
+    if archived is None:
+        return {}
+    return {row[1]: row[2] for row in _unpack(archived.results)['results']}
+
+
+def load_archive(session):
+    """Read-only view of an archived session; 404s if its archive row is missing."""
+    archived = ArchivedSession.query.get_or_404(session.id)
+    _check_format(archived)
+    return SessionArchive(session, archived)
+
+
+class SessionArchive:
+    """An archived session's results, evidence and history, decoded on first use.
+
+    Records are namespaces with the attributes of the model rows they were
+    archived from, so templates and exporters read them like live rows.
+    """
+
+    def __init__(self, session, archived):
+        self.session = session
+        self.archived = archived
+
+    @cached_property
+    def _document(self):
+        return _unpack(self.archived.results)
+
+    @cached_property
+    def results(self):
+        """Results with their ``check`` attached, ordered by check number."""
+        rows = [SimpleNamespace(session_id=self.session.id, **_record(_RESULT_FIELDS, row))
+                for row in self._document['results']]
+        checks = {check.id: check for check in Check.query.filter(Check.id.in_([r.check_id for r in rows]))}
+        for row in rows:
+            row.check = checks.get(row.check_id)
+        return sorted((row for row in rows if row.check is not None), key=lambda r: r.check.check_number)
+
+    @property
+    def evidence_checks(self):
+        return set(self._document['evidence_checks'])
+
+    def result(self, check_id):
+        return next((row for row in self.results if row.check_id == check_id), None)
+
+    def evidence(self, check_id):
+        if check_id not in self.evidence_checks:
+            return None
+        for row in _unpack(self.archived.evidence):
+            if row[1] == check_id:
+                return SimpleNamespace(session_id=self.session.id, **_record(_EVIDENCE_FIELDS, row))
+        return None
+
+    @cached_property
+    def _events(self):
+        rows = [SimpleNamespace(session_id=self.session.id, **_record(_EVENT_FIELDS, row))
+                for row in _unpack(self.archived.history)]
+        users = {user.id: user for user in User.query.filter(User.id.in_({r.actor_id for r in rows}))}
+        for row in rows:
+            row.actor = users.get(row.actor_id)
+        rows.sort(key=lambda r: (r.changed_at, r.id), reverse=True)
+        return rows
+
+    def events(self, check_id=None, limit=None):
+        """Events newest first, like ``history.result_events``."""
+        rows = [r for r in self._events if check_id is None or r.check_id == check_id]
+        return rows[:limit] if limit else rows
+
+    def state_as_of(self, when):
+        """The last event of each check at or before ``when``, like ``history.session_state_as_of``."""
+        state = {}
+        for row in self._events:
+            if row.changed_at <= when and row.check_id not in state:
+                state[row.check_id] = row
+        return state
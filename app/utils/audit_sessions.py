@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+from sqlalchemy import insert, update
+from ..extensions import db
+from ..models import BenchmarkSection, Check, AuditSession, AuditResult
+from .stats import record_session_created, record_result_changes
+
+RESULT_STATUSES = ('pass', 'fail', 'not_applicable', 'not_checked')
+
+
+def create_session(user_id, benchmark, target_name='', target_ip='', notes=''):
+    """Create an audit session with a ``not_checked`` result for every check.
+
+    Runs in the caller's transaction; the caller commits. Returns the
+    session and the number of results created.
+    """
+    session = AuditSession(
+        user_id=user_id,
+        benchmark_id=benchmark.id,
+        target_name=target_name or 'Unnamed Target',
+        target_ip=target_ip,
+        notes=notes
+    )
+    db.session.add(session)
+    db.session.flush()
+
+    check_ids = [row[0] for row in db.session.query(Check.id).join(BenchmarkSection).filter(
+        BenchmarkSection.benchmark_id == benchmark.id
+    )]
+    if check_ids:
+        db.session.execute(insert(AuditResult), [
+            {'session_id': session.id, 'check_id': check_id, 'status': 'not_checked'}
+            for check_id in check_ids
+        ])
+
+    record_session_created(session, len(check_ids))
+    return session, len(check_ids)
+
+
+def apply_result_updates(session, entries, source='api'):
+    """Apply ``{check_number, status, finding}`` dicts to a session's results.
+
+    ``check_id`` (an integer) may be given instead of ``check_number`` (a
+    string); a missing ``finding`` keeps the current one. Runs in the caller's transaction with
+    one executemany UPDATE; the caller commits. Returns ``(updated, errors)``
+    where errors lists ``(index, message)`` for rejected entries.
+    """
+    by_id, by_number = {}, {}
+    for result_id, check_id, check_number, status, finding in db.session.query(
+        AuditResult.id, AuditResult.check_id, Check.check_number,
+        AuditResult.status, AuditResult.finding,
+    ).join(Check, AuditResult.check_id == Check.id).filter(AuditResult.session_id == session.id):
+        by_id[check_id] = by_number[check_number] = [result_id, check_id, status, finding]
+
+    now = datetime.now(timezone.utc)
+    pending, errors = {}, []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append((index, 'Entry must be an object.'))
+            continue
+        check_id, check_number = entry.get('check_id'), entry.get('check_number')
+        if check_id is not None:
+            if not isinstance(check_id, int) or isinstance(check_id, bool):
+                errors.append((index, 'check_id must be an integer.'))
+                continue
+            row = by_id.get(check_id)
+        elif check_number is not None:
+            if not isinstance(check_number, str):
+                errors.append((index, 'check_number must be a string.'))
+                continue
+            row = by_number.get(check_number)
+        else:
+            row = None
+        status = entry.get('status')
+        if row is None:
+            errors.append((index, 'Unknown check.'))
+            continue
+        if status not in RESULT_STATUSES:
+            errors.append((index, f'Invalid status {status!r}.'))
+            continue
+        result_id, check_id, old_status, old_finding = row
+        finding = entry['finding'] if entry.get('finding') is not None else old_finding
+        if status == old_status and finding == old_finding:
+            continue
+        first = pending.get(result_id)
+        pending[result_id] = {
+            'id': result_id,
+            'status': status,
+            'finding': finding,
+            'checked_at': now if status != 'not_checked' else None,
+            'old_status': first['old_status'] if first else old_status,
+            'check_id': check_id,
+        }
+        row[2], row[3] = status, finding
+
+    if pending:
+        db.session.execute(update(AuditResult), [
+            {key: value for key, value in values.items() if key not in ('old_status', 'check_id')}
+            for values in pending.values()
+        ])
+        record_result_changes(session, [
+            (values['check_id'], values['old_status'], values['status'], values['finding'])
+            for values in pending.values()
+        ], source)
+    return len(pending), errors
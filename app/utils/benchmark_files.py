@@ -0,0 +1,160 @@
+"""Parse and validate benchmark YAML files before they are seeded.
+
+Files are parsed with libyaml's ``CSafeLoader`` when PyYAML was built with
+it (falling back to the pure-Python ``SafeLoader``), in a process pool so
+that a large library parses on every core. Each worker also checks its tree
+against the benchmark schema, and every problem in every file is collected,
+so nothing is inserted until the whole library is known to be loadable.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+# Optional text fields and the check levels the catalog knows
+_BENCHMARK_TEXT = ('description', 'url')
+_SECTION_TEXT = ('description',)
+_CHECK_TEXT = (
+    'description', 'rationale', 'audit_command', 'audit_steps', 'expected_output',
+    'remediation', 'references',
+)
+_LEVELS = (1, 2)
+
+
+class BenchmarkFileError(ValueError):
+    """Raised when benchmark files cannot be parsed or do not match the schema."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__(f'{len(self.errors)} problem(s) in benchmark files:\n  ' + '\n  '.join(self.errors))
+
+
+def load_yaml(filepath):
+    """Load and parse a YAML file."""
+    import yaml  # only seeding needs PyYAML
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(filepath, 'rb') as f:
+        return yaml.load(f, Loader=loader)
+
+
+def benchmark_files(benchmarks_dir):
+    """Sorted paths of the YAML files in ``benchmarks_dir``."""
+    return [
+        os.path.join(benchmarks_dir, filename)
+        for filename in sorted(os.listdir(benchmarks_dir))
+        if filename.endswith('.yaml') or filename.endswith('.yml')
+    ]
+
+
+def parse_benchmark_files(paths, workers=None):
+    """Parse and validate ``paths``; returns ``[(path, data)]`` in the same order.
+
+    Raises ``BenchmarkFileError`` listing the problems of all files if any
+    file fails to parse or validate.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        parsed = [_parse_file(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(_parse_file, paths))
+
+    errors = [error for _data, file_errors in parsed for error in file_errors]
+    if errors:
+        raise BenchmarkFileError(errors)
+    return [(path, data) for path, (data, _errors) in zip(paths, parsed)]
+
+
+def _parse_file(path):
+    """Worker: returns ``(data, errors)`` for one file."""
+    import yaml
+    filename = os.path.basename(path)
+    try:
+        data = load_yaml(path)
+    except (OSError, yaml.YAMLError) as exc:
+        return None, [f'{filename}: {" ".join(str(exc).split())}']
+    return data, [f'{filename}: {error}' for error in validate_benchmark(data)]
+
+
+# --- Schema ----------------------------------------------------------------------
+
+def validate_benchmark(data):
+    """Return the schema errors of a parsed benchmark file (empty when valid)."""
+    errors = []
+    if not isinstance(data, dict):
+        return ['file must contain a mapping with "benchmark" and "sections"']
+
+    bench = data.get('benchmark')
+    if not isinstance(bench, dict):
+        errors.append('benchmark: missing or not a mapping')
+    else:
+        _required_text(bench, ('name', 'version', 'platform'), 'benchmark', errors)
+        _optional_text(bench, _BENCHMARK_TEXT, 'benchmark', errors)
+        release_date = bench.get('release_date')
+        if release_date is not None and not isinstance(release_date, date):
+            try:
+                date.fromisoformat(str(release_date))
+            except ValueError:
+                errors.append(f'benchmark.release_date: {release_date!r} is not a YYYY-MM-DD date')
+
+    seen = {}
+    for i, section in enumerate(_list(data, 'sections', '', errors)):
+        _validate_section(section, f'sections[{i}]', seen, errors)
+    return errors
+
+
+def _validate_section(section, where, seen, errors):
+    if not isinstance(section, dict):
+        errors.append(f'{where}: not a mapping')
+        return
+    _required_text(section, ('number', 'title'), where, errors)
+    _optional_text(section, _SECTION_TEXT, where, errors)
+
+    for i, check in enumerate(_list(section, 'checks', where, errors)):
+        _validate_check(check, f'{where}.checks[{i}]', seen, errors)
+    for i, child in enumerate(_list(section, 'children', where, errors)):
+        _validate_section(child, f'{where}.children[{i}]', seen, errors)
+
+
+def _validate_check(check, where, seen, errors):
+    if not isinstance(check, dict):
+        errors.append(f'{where}: not a mapping')
+        return
+    _required_text(check, ('number', 'title'), where, errors)
+    _optional_text(check, _CHECK_TEXT, where, errors)
+    if 'level' in check and check['level'] not in _LEVELS:
+        errors.append(f'{where}.level: {check["level"]!r} is not one of {_LEVELS}')
+    if 'scored' in check and not isinstance(check['scored'], bool):
+        errors.append(f'{where}.scored: {check["scored"]!r} is not true or false')
+
+    number = check.get('number')
+    if isinstance(number, str):
+        if number in seen:
+            errors.append(f'{where}.number: {number!r} is also used by {seen[number]}')
+        else:
+            seen[number] = where
+
+
+def _list(mapping, key, where, errors):
+    value = mapping.get(key)
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        errors.append(f'{where + "." if where else ""}{key}: not a list')
+        return []
+    return value
+
+
+def _required_text(mapping, keys, where, errors):
+    for key in keys:
+        value = mapping.get(key)
+        if value is None or value == '':
+            errors.append(f'{where}.{key}: missing')
+        elif not isinstance(value, str):
+            errors.append(f'{where}.{key}: {value!r} must be a quoted string')
+
+
+def _optional_text(mapping, keys, where, errors):
+    for key in keys:
+        value = mapping.get(key)
+        if value is not None and not isinstance(value, str):
+            errors.append(f'{where}.{key}: {value!r} must be text')
@@ -0,0 +1,310 @@
+"""Separate, read-only database for the reference catalog.
+
+Platforms, benchmarks, sections, checks and their rollups are bound to the
+``catalog`` bind, a SQLite file opened with ``mode=ro&immutable=1`` and
+memory-mapped, so catalog reads take no locks and never wait on audit
+writes. The same file is attached read-only to every audit connection as
+``catalog``, so queries joining results to checks keep working unchanged.
+
+The catalog is never written in place: seeding copies it, writes the copy
+and swaps it in with ``os.replace``. Open connections keep reading the old
+file until their next checkout, which notices the new inode and reconnects.
+
+A database from before the split still holds the catalog tables. Until
+``python split_catalog.py`` moves them out, the catalog bind reads them
+through the audit engine and seeding is refused.
+"""
+import os
+import shutil
+import sqlite3
+from contextlib import contextmanager
+from urllib.parse import quote
+from flask import current_app
+from sqlalchemy import create_engine, event, exc, make_url
+from ..extensions import db
+
+CATALOG_BIND = 'catalog'
+
+
+class CatalogSplitError(ValueError):
+    """Raised when legacy catalog tables cannot be moved out safely."""
+
+
+def configure_catalog(app):
+    """Point the ``catalog`` bind at its own file; call before ``db.init_app``.
+
+    With an in-memory audit database and no CATALOG_DATABASE_PATH the
+    catalog shares the audit database instead (see ``init_catalog``).
+    """
+    path = catalog_path(app)
+    app.config['CATALOG_DATABASE_PATH'] = path
+    if path is None:
+        return
+
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[CATALOG_BIND] = f'sqlite:///file:{path}?mode=ro&immutable=1&uri=true'
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+    # URI filenames must be enabled on audit connections to ATTACH the catalog immutable
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options['connect_args'] = dict(options.get('connect_args') or {}, uri=True)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def catalog_path(app):
+    """Absolute catalog path, derived from the audit database if not configured."""
+    if app.config.get('CATALOG_DATABASE_PATH'):
+        return os.path.abspath(app.config['CATALOG_DATABASE_PATH'])
+    return sibling_database_path(app, 'catalog')
+
+
+def sibling_database_path(app, name):
+    """``<audit db>_<name>.db`` beside the audit database; None if that is in memory."""
+    audit_path = _sqlite_path(app.config['SQLALCHEMY_DATABASE_URI'], app.instance_path)
+    if audit_path is None:
+        return None
+    root, ext = os.path.splitext(audit_path)
+    return f'{root}_{name}{ext or ".db"}'
+
+
+def init_catalog(app):
+    """Install connection hooks; publish an empty catalog on a fresh install.
+
+    If the audit database still holds catalog tables, the catalog bind is
+    pointed at the audit engine so reads keep working from them.
+    """
+    with app.app_context():
+        engines = db.engines
+        path = app.config['CATALOG_DATABASE_PATH']
+        if path is None:
+            engines[CATALOG_BIND] = engines[None]  # single-database mode
+            return
+
+        mmap_size = app.config['CATALOG_MMAP_SIZE']
+
+        @event.listens_for(engines[CATALOG_BIND], 'connect')
+        def on_catalog_connect(dbapi_connection, record):
+            record.info['catalog_inode'] = _inode(path)
+            dbapi_connection.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+
+        @event.listens_for(engines[None], 'connect')
+        def on_audit_connect(dbapi_connection, record):
+            record.info['catalog_inode'] = _inode(path)
+            if record.info['catalog_inode'] is not None:
+                dbapi_connection.execute('ATTACH DATABASE ? AS catalog', (_immutable_uri(path),))
+                dbapi_connection.execute(f'PRAGMA catalog.mmap_size={int(mmap_size)}')
+
+        def on_checkout(dbapi_connection, record, proxy):
+            if record.info.get('catalog_inode') != _inode(path):
+                raise exc.DisconnectionError('Catalog database was replaced.')
+
+        event.listen(engines[CATALOG_BIND], 'checkout', on_checkout)
+        event.listen(engines[None], 'checkout', on_checkout)
+
+        legacy = legacy_catalog_tables()
+        if legacy:
+            # The legacy tables shadow the attached catalog; once the split drops
+            # them and publishes the file, checkout reconnects and attaches it
+            engines[CATALOG_BIND] = engines[None]
+            app.logger.warning('The audit database still holds catalog tables (%s). '
+                               'Run `python split_catalog.py` to move them to %s.',
+                               ', '.join(table.name for table in legacy), path)
+        elif not os.path.exists(path):
+            # Fresh install: publish an empty catalog so reads work before seeding
+            staging = _staging_path(path)
+            _create_schema(staging)
+            _publish(staging, path)
+
+
+def warm_catalog(app):
+    """Read the catalog file into the OS page cache, e.g. before workers fork.
+
+    Every process memory-maps the immutable catalog (``CATALOG_MMAP_SIZE``),
+    so all workers map these same cached pages: the page cache is the shared
+    copy, and nothing is kept in this process's memory. Returns the bytes read.
+    """
+    path = app.config['CATALOG_DATABASE_PATH']
+    if path is None or not os.path.exists(path):
+        return 0
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                return size
+            size += len(chunk)
+
+
+@contextmanager
+def writable_catalog():
+    """Run a block with the catalog bind pointed at a writable copy, then swap it in.
+
+    The block's work is committed and the copy atomically replaces the
+    catalog file. The bind is switched for the whole process, so this is
+    meant for the seed command, not for request handlers. In
+    single-database mode the block writes in place. Raises
+    ``CatalogSplitError`` while the audit database still holds catalog tables.
+    """
+    path = current_app.config['CATALOG_DATABASE_PATH']
+    engines = db.engines
+    if path is not None and engines[CATALOG_BIND] is engines[None]:
+        raise CatalogSplitError('The audit database still holds catalog tables. '
+                                'Run `python split_catalog.py` first.')
+    if path is None:
+        db.create_all(bind_key=CATALOG_BIND)
+        yield
+        db.session.commit()
+        return
+
+    staging = _staging_path(path)
+    if os.path.exists(path):
+        shutil.copyfile(path, staging)
+    engine = create_engine(f'sqlite:///{staging}')
+    db.metadatas[CATALOG_BIND].create_all(engine)
+
+    db.session.close()
+    previous, engines[CATALOG_BIND] = engines[CATALOG_BIND], engine
+    try:
+        yield
+        db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        _discard(staging)
+        raise
+    finally:
+        db.session.close()
+        engines[CATALOG_BIND] = previous
+        engine.dispose()
+
+    _publish(staging, path)
+
+
+def legacy_catalog_tables():
+    """Catalog tables still present in the audit database (from before the split)."""
+    audit_path = db.engines[None].url.database
+    if not audit_path or audit_path == ':memory:' or not os.path.exists(audit_path):
+        return []
+    conn = sqlite3.connect(audit_path)
+    try:
+        present = {row[0] for row in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type = 'table'"
+        )}
+    finally:
+        conn.close()
+    return [table for table in db.metadatas[CATALOG_BIND].sorted_tables if table.name in present]
+
+
+def split_legacy_catalog(path, drop=True):
+    """Move catalog tables out of a database created before the catalog split.
+
+    Rows are copied into a new catalog file, unless one already exists. The
+    tables are dropped from the audit database (where they would shadow the
+    attached catalog) only once every table holds the same rows in both:
+    equal counts and no row, compared on their shared columns, found in one
+    but not the other. Returns ``{table name: rows}``; raises
+    ``CatalogSplitError`` without dropping anything if any table differs.
+    """
+    legacy = legacy_catalog_tables()
+    if not legacy:
+        return {}
+    db.session.close()  # its connection predates the catalog file and has none attached
+    audit_engine = db.engines[None]
+    audit_path = audit_engine.url.database
+
+    if not os.path.exists(path):
+        staging = _staging_path(path)
+        _create_schema(staging)
+
+        conn = sqlite3.connect(audit_path)
+        try:
+            conn.execute('ATTACH DATABASE ? AS staging', (staging,))
+            for table in legacy:
+                old = {row[1] for row in conn.execute(f'PRAGMA main.table_info("{table.name}")')}
+                columns = ', '.join(f'"{c.name}"' for c in table.columns if c.name in old)
+                conn.execute(f'INSERT INTO staging."{table.name}" ({columns}) '
+                             f'SELECT {columns} FROM main."{table.name}"')
+            conn.commit()
+            conn.execute('DETACH DATABASE staging')
+        finally:
+            conn.close()
+        _publish(staging, path)
+
+    conn = sqlite3.connect(audit_path, uri=True)  # URI filenames, to attach the catalog immutable
+    try:
+        conn.execute('ATTACH DATABASE ? AS catalog', (_immutable_uri(path),))
+        counts, mismatched = {}, []
+        for table in legacy:
+            old, new = (conn.execute(f'SELECT count(*) FROM {schema}."{table.name}"').fetchone()[0]
+                        for schema in ('main', 'catalog'))
+            counts[table.name] = old
+            if old != new:
+                mismatched.append(f'{table.name} ({old} rows in the audit database, {new} in the catalog)')
+                continue
+            shared = {row[1] for row in conn.execute(f'PRAGMA main.table_info("{table.name}")')}
+            columns = ', '.join(f'"{c.name}"' for c in table.columns if c.name in shared)
+            differing = max(
+                conn.execute(f'SELECT count(*) FROM (SELECT {columns} FROM {a}."{table.name}" '
+                             f'EXCEPT SELECT {columns} FROM {b}."{table.name}")').fetchone()[0]
+                for a, b in (('main', 'catalog'), ('catalog', 'main'))
+            )
+            if differing:
+                mismatched.append(f'{table.name} ({differing} rows differ)')
+        conn.execute('DETACH DATABASE catalog')
+        if mismatched:
+            raise CatalogSplitError(f'The tables differ, nothing was dropped: {", ".join(mismatched)}. '
+                                    f'Remove {path} to copy the tables again.')
+        if drop:
+            for table in reversed(legacy):
+                conn.execute(f'DROP TABLE main."{table.name}"')
+            conn.commit()
+    finally:
+        conn.close()
+    audit_engine.dispose()
+    return counts
+
+
+def _sqlite_path(uri, instance_path):
+    url = make_url(uri)
+    if not url.drivername.startswith('sqlite'):
+        return None
+    database = url.database or ''
+    if url.query.get('uri') and database.startswith('file:'):
+        database = database[5:].split('?', 1)[0]
+    if database in ('', ':memory:') or 'mode=memory' in uri:
+        return None
+    return database if os.path.isabs(database) else os.path.join(instance_path, database)
+
+
+def _immutable_uri(path):
+    return f'file:{quote(path)}?mode=ro&immutable=1'
+
+
+def _inode(path):
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+def _staging_path(path):
+    return f'{path}.{os.getpid()}.tmp'
+
+
+def _create_schema(staging):
+    engine = create_engine(f'sqlite:///{staging}')
+    db.metadatas[CATALOG_BIND].create_all(engine)
+    engine.dispose()
+
+
+def _publish(staging, path):
+    """Flush ``staging`` to disk and atomically move it over ``path``."""
+    with open(staging, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(staging, path)
+
+
+def _discard(staging):
+    try:
+        os.remove(staging)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,221 @@
+"""Local evidence collector.
+
+Runs a benchmark's ``audit_command`` scripts on the local host with asyncio
+subprocesses, capturing stdout and stderr as evidence and proposing a
+pass/fail status for each result with the compiled matchers from
+``utils.matchers``. Commands run with bounded parallelism,
+a per-command timeout and a cap on how much output is kept.
+"""
+import asyncio
+import os
+import signal
+import time
+from datetime import datetime, timezone
+from sqlalchemy import insert, update
+from ..extensions import db
+from ..models import BenchmarkSection, Check, AuditResult, AuditEvidence
+from .matchers import evaluate, get_matchers
+from .stats import record_result_changes
+
+# Exit codes meaning the command itself could not run (not executable / not found)
+_UNRUNNABLE_EXIT_CODES = (126, 127)
+
+
+class CommandResult:
+    """Captured outcome of one audit command."""
+
+    def __init__(self, command, stdout='', stderr='', exit_code=None,
+                 timed_out=False, truncated=False, duration_ms=0):
+        self.command = command
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_code = exit_code
+        self.timed_out = timed_out
+        self.truncated = truncated
+        self.duration_ms = duration_ms
+
+    def __repr__(self):
+        return f'<CommandResult exit={self.exit_code} timed_out={self.timed_out}>'
+
+
+class _CappedBuffer:
+    """Keeps at most ``limit`` bytes of a stream while draining the rest."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.data = bytearray()
+        self.truncated = False
+
+    async def drain(self, stream):
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                return
+            room = self.limit - len(self.data)
+            if room > 0:
+                self.data += chunk[:room]
+            if len(chunk) > room:
+                self.truncated = True
+
+    def text(self):
+        return self.data.decode('utf-8', errors='replace')
+
+
+def run_commands(commands, concurrency=8, timeout=15, max_output=65536):
+    """Run ``{key: command}`` concurrently and return ``{key: CommandResult}``."""
+    return asyncio.run(_run_all(commands, concurrency, timeout, max_output))
+
+
+async def _run_all(commands, concurrency, timeout, max_output):
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    keys = list(commands)
+    results = await asyncio.gather(*(
+        _run_one(commands[key], semaphore, timeout, max_output) for key in keys
+    ))
+    return dict(zip(keys, results))
+
+
+async def _run_one(command, semaphore, timeout, max_output):
+    async with semaphore:
+        started = time.monotonic()
+        stdout, stderr = _CappedBuffer(max_output), _CappedBuffer(max_output)
+        try:
+            proc = await asyncio.create_subprocess_shell(
+                command,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,  # own process group, so timeouts kill pipelines too
+            )
+        except OSError as exc:
+            return CommandResult(command, stderr=str(exc), exit_code=None)
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.gather(
+                stdout.drain(proc.stdout), stderr.drain(proc.stderr), proc.wait()
+            ), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            _kill_group(proc)
+            await proc.wait()
+
+        return CommandResult(
+            command,
+            stdout=stdout.text(),
+            stderr=stderr.text(),
+            exit_code=proc.returncode,
+            timed_out=timed_out,
+            truncated=stdout.truncated or stderr.truncated,
+            duration_ms=int((time.monotonic() - started) * 1000),
+        )
+
+
+def _kill_group(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def propose_status(matcher, result):
+    """Propose ``'pass'``/``'fail'`` for a captured result, or None if undecidable.
+
+    Output cut off at ``max_output`` is undecidable: the missing part may decide it.
+    """
+    if result.timed_out or result.truncated:
+        return None
+    if result.exit_code is None or result.exit_code in _UNRUNNABLE_EXIT_CODES:
+        return None
+    return evaluate(matcher, result.stdout, result.stderr)
+
+
+def collect_session(session, concurrency=8, timeout=15, max_output=65536, prefill=True):
+    """Run every audit command of the session's benchmark and store the evidence.
+
+    When ``prefill`` is set, results that are still ``not_checked`` take the
+    proposed status, with a short evidence summary as their finding. Runs in
+    the caller's transaction; the caller commits. Returns a summary dict.
+    """
+    commands = {
+        check_id: command.strip()
+        for check_id, command in db.session.query(Check.id, Check.audit_command).join(BenchmarkSection).filter(
+            BenchmarkSection.benchmark_id == session.benchmark_id,
+            Check.audit_command.isnot(None),
+            Check.audit_command != '',
+        )
+    }
+
+    started = time.monotonic()
+    captured = run_commands(commands, concurrency, timeout, max_output)
+    elapsed = time.monotonic() - started
+
+    now = datetime.now(timezone.utc)
+    matchers = get_matchers()
+    proposals = {check_id: propose_status(matchers.get(check_id), result)
+                 for check_id, result in captured.items()}
+
+    AuditEvidence.query.filter(
+        AuditEvidence.session_id == session.id,
+        AuditEvidence.check_id.in_(commands),
+    ).delete(synchronize_session=False)
+    if captured:
+        db.session.execute(insert(AuditEvidence), [
+            {
+                'session_id': session.id,
+                'check_id': check_id,
+                'command': result.command,
+                'stdout': result.stdout,
+                'stderr': result.stderr,
+                'exit_code': result.exit_code,
+                'timed_out': result.timed_out,
+                'truncated': result.truncated,
+                'duration_ms': result.duration_ms,
+                'proposed_status': proposals[check_id],
+                'collected_at': now,
+            }
+            for check_id, result in captured.items()
+        ])
+
+    prefilled = 0
+    if prefill:
+        pending = db.session.query(AuditResult.id, AuditResult.check_id, AuditResult.finding).filter(
+            AuditResult.session_id == session.id,
+            AuditResult.status == 'not_checked',
+            AuditResult.check_id.in_(commands),
+        ).all()
+        updates, changes = [], []
+        for result_id, check_id, finding in pending:
+            status = proposals[check_id]
+            if status is None:
+                continue
+            updates.append({
+                'id': result_id,
+                'status': status,
+                'finding': finding or _summary(status, captured[check_id]),
+                'checked_at': now,
+            })
+            changes.append((check_id, 'not_checked', status, updates[-1]['finding']))
+        if updates:
+            db.session.execute(update(AuditResult), updates)
+            record_result_changes(session, changes, 'collector')
+        prefilled = len(updates)
+
+    values = list(proposals.values())
+    return {
+        'commands': len(commands),
+        'passed': values.count('pass'),
+        'failed': values.count('fail'),
+        'undecided': values.count(None),
+        'timed_out': sum(1 for r in captured.values() if r.timed_out),
+        'prefilled': prefilled,
+        'seconds': elapsed,
+    }
+
+
+def _summary(status, result):
+    first_line = next((line for line in result.stdout.splitlines() if line.strip()), '')
+    summary = f'[collector] proposed {status.upper()} (exit {result.exit_code})'
+    if first_line:
+        summary += f': {first_line.strip()[:200]}'
+    return summary
@@ -0,0 +1,127 @@
+"""Line up audit sessions of the same benchmark check by check.
+
+All sessions' results are fetched in one query sorted by check, then merged
+in a single pass, so comparing a baseline with any number of sessions costs
+one round trip regardless of benchmark size.
+"""
+from itertools import groupby
+from ..extensions import db
+from ..models import BenchmarkSection, Check, AuditResult
+
+# Change categories, in display order
+CATEGORIES = ('regression', 'fixed', 'still_failing', 'changed', 'unchanged')
+
+CATEGORY_LABELS = {
+    'regression': 'Regression',
+    'fixed': 'Fixed',
+    'still_failing': 'Still Failing',
+    'changed': 'Changed',
+    'unchanged': 'Unchanged',
+}
+
+_PASSING = ('pass', 'not_applicable')
+
+
+def classify(old_status, new_status):
+    """Categorise a baseline -> session status transition."""
+    if old_status == 'fail' and new_status == 'fail':
+        return 'still_failing'
+    if old_status in _PASSING and new_status == 'fail':
+        return 'regression'
+    if old_status == 'fail' and new_status in _PASSING:
+        return 'fixed'
+    if old_status == new_status:
+        return 'unchanged'
+    return 'changed'
+
+
+def compare_sessions(baseline, sessions):
+    """Compare ``baseline`` with one or more sessions of the same benchmark.
+
+    Returns a dict with one row per check (baseline and per-session status,
+    finding and category), per-session category totals, and the same totals
+    rolled up by top-level section.
+    """
+    session_ids = [baseline.id] + [s.id for s in sessions]
+    position = {sid: i for i, sid in enumerate(session_ids)}
+    top_sections = _top_level_sections(baseline.benchmark_id)
+
+    merged = db.session.query(
+        AuditResult.check_id, AuditResult.session_id, AuditResult.status, AuditResult.finding,
+        Check.check_number, Check.title, Check.section_id,
+    ).join(Check, AuditResult.check_id == Check.id).filter(
+        AuditResult.session_id.in_(session_ids)
+    ).order_by(Check.check_number, Check.id, AuditResult.session_id)
+
+    rows = []
+    totals = [_empty_counts() for _ in sessions]
+    section_totals = {}
+
+    for _check_id, group in groupby(merged, key=lambda r: r.check_id):
+        entries = [None] * len(session_ids)
+        first = None
+        for result in group:
+            first = first or result
+            entries[position[result.session_id]] = result
+
+        base = entries[0]
+        base_status = base.status if base else 'not_checked'
+        section = top_sections.get(first.section_id)
+        per_section = section_totals.setdefault(
+            section, [_empty_counts() for _ in sessions]
+        )
+
+        columns = []
+        for i, entry in enumerate(entries[1:]):
+            status = entry.status if entry else 'not_checked'
+            category = classify(base_status, status)
+            totals[i][category] += 1
+            per_section[i][category] += 1
+            columns.append({
+                'status': status,
+                'finding': entry.finding if entry else None,
+                'category': category,
+            })
+
+        rows.append({
+            'check_id': first.check_id,
+            'check_number': first.check_number,
+            'title': first.title,
+            'section': section,
+            'baseline': {'status': base_status, 'finding': base.finding if base else None},
+            'sessions': columns,
+        })
+
+    return {
+        'baseline': baseline,
+        'sessions': sessions,
+        'rows': rows,
+        'totals': totals,
+        'sections': sorted(section_totals.items(), key=lambda item: _section_key(item[0])),
+    }
+
+
+def _empty_counts():
+    return {category: 0 for category in CATEGORIES}
+
+
+def _top_level_sections(benchmark_id):
+    """Map every section id of a benchmark to its top-level ``"N. Title"`` label."""
+    sections = {
+        s.id: s for s in db.session.query(
+            BenchmarkSection.id, BenchmarkSection.parent_id,
+            BenchmarkSection.number, BenchmarkSection.title,
+        ).filter(BenchmarkSection.benchmark_id == benchmark_id)
+    }
+    labels = {}
+    for section_id, section in sections.items():
+        top = section
+        while top.parent_id is not None and top.parent_id in sections:
+            top = sections[top.parent_id]
+        labels[section_id] = f'{top.number}. {top.title}'
+    return labels
+
+
+def _section_key(label):
+    number = (label or '').split('.', 1)[0]
+    return (0, int(number), label) if number.isdigit() else (1, 0, label or '')
@@ -0,0 +1,141 @@
+"""Negotiated gzip/brotli compression of responses.
+
+Text responses of at least ``COMPRESS_MIN_SIZE`` bytes are compressed with
+the best encoding the client accepts: brotli when the optional ``brotli``
+package is installed, otherwise gzip. Streamed responses are gzipped on the
+fly with a sync flush after every chunk, so they keep streaming. Server-sent
+events and file downloads are left alone.
+
+Reference pages (``reference_page``) carry an ETag of their rendered body;
+their compressed bodies are cached by ETag and encoding, so a page that has
+not changed is compressed only once per worker. The ETag is sent weak, since
+the compressed and identity bodies differ byte for byte.
+"""
+import gzip
+import zlib
+from functools import wraps
+from flask import current_app, make_response, request
+from .cache import TTLCache
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'text/xml',
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+}
+
+# Uncompressed bytes of a streamed response gathered before a sync flush
+STREAM_FLUSH_SIZE = 8 * 1024
+
+_compressed = TTLCache(maxsize=512)
+_brotli = None
+
+
+def reference_page(view):
+    """Tag a catalog page with an ETag and answer revalidation with 304.
+
+    Pages are per-user (navigation, flashed messages), so they are marked
+    ``private``; browsers revalidate them and skip the body when unchanged.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            response.add_etag()
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.make_conditional(request)
+        return response
+    return wrapped
+
+
+def compress_response(response):
+    """``after_request`` hook compressing the response if worthwhile."""
+    if not _should_compress(response):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    encoding = request.accept_encodings.best_match(_available_encodings())
+    if encoding is None:
+        return response
+
+    level = current_app.config['COMPRESS_LEVEL']
+    if response.is_streamed:
+        if not request.accept_encodings['gzip']:
+            return response
+        response.response = _gzip_stream(response.response, level)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers.pop('Content-Length', None)
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    etag, weak = response.get_etag()
+    key = (etag, encoding) if etag and not weak else None
+    body = _compressed.get(key) if key else None
+    if body is None:
+        body = _compress(data, encoding, level)
+        if key:
+            _compressed.set(key, body, current_app.config['COMPRESS_CACHE_TTL'])
+    if etag:
+        response.set_etag(etag, weak=True)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    _compressed.maxsize = app.config['COMPRESS_CACHE_SIZE']
+    app.after_request(compress_response)
+
+
+def _should_compress(response):
+    return (
+        response.status_code == 200
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and 'Content-Encoding' not in response.headers
+        and not response.direct_passthrough
+        and not response.cache_control.no_transform
+        and request.method != 'HEAD'
+    )
+
+
+def _available_encodings():
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli  # optional; falls back to gzip
+        except ImportError:
+            brotli = False
+        _brotli = brotli
+    return ['br', 'gzip'] if _brotli else ['gzip']
+
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        return _brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _gzip_stream(chunks, level):
+    """Gzip a streamed body; the first chunk is flushed at once, later ones in batches."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    pending = STREAM_FLUSH_SIZE  # flush after the first chunk
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= STREAM_FLUSH_SIZE:
+                data += compressor.flush(zlib.Z_SYNC_FLUSH)
+                pending = 0
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
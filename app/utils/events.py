@@ -0,0 +1,176 @@
+"""Live audit session events, fanned out to server-sent event streams.
+
+Result changes are queued on the database session by ``record_result_changes``
+and published only once the transaction commits. A notification names the
+session and the checks that changed (or none, meaning "reload everything").
+
+Every process that has open streams binds a Unix datagram socket in
+``EVENTS_SOCKET_DIR``; publishing sends one small datagram to each socket
+found there, so changes made by another gunicorn worker, ``collect.py`` or
+``ingest.py`` reach every open stream. Each stream reads from its own
+bounded queue: a client too slow to keep up is told to reload instead of
+letting the queue grow.
+"""
+import atexit
+import glob
+import json
+import os
+import queue
+import socket
+import threading
+import uuid
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Above this many changed checks a notification asks streams to reload instead
+MAX_CHECKS_PER_EVENT = 50
+
+_PENDING_KEY = 'kenbu_result_events'
+
+
+class Subscription:
+    """One stream's bounded queue of notifications for a session."""
+
+    def __init__(self, session_id, maxsize):
+        self.session_id = session_id
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, check_ids):
+        try:
+            self.queue.put_nowait(check_ids)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Return the next list of changed check ids, None to reload, or raise queue.Empty."""
+        if self.overflowed:
+            return None
+        check_ids = self.queue.get(timeout=timeout)
+        return None if self.overflowed else check_ids
+
+
+class Broker:
+    """Delivers session notifications to this process's subscriptions."""
+
+    def __init__(self):
+        self.socket_dir = None
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._socket = None
+
+    def configure(self, socket_dir):
+        self.socket_dir = socket_dir
+
+    def subscribe(self, session_id, maxsize, limit=0):
+        """Open a subscription, or return None if ``limit`` streams are already open."""
+        subscription = Subscription(session_id, maxsize)
+        with self._lock:
+            if limit and sum(len(subscribers) for subscribers in self._subscriptions.values()) >= limit:
+                return None
+            self._subscriptions.setdefault(session_id, set()).add(subscription)
+            if self._socket is None:
+                self._start_receiver()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.session_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.session_id]
+
+    def publish(self, session_id, check_ids=None):
+        """Notify every process; ``check_ids`` None (or too many) means reload."""
+        if check_ids is not None:
+            check_ids = sorted(set(check_ids))
+            if len(check_ids) > MAX_CHECKS_PER_EVENT:
+                check_ids = None
+        message = json.dumps({'session': session_id, 'checks': check_ids}).encode()
+
+        if self.socket_dir is None or not hasattr(socket, 'AF_UNIX'):
+            self._deliver(message)
+            return
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        try:
+            for path in glob.glob(os.path.join(self.socket_dir, '*.sock')):
+                try:
+                    sender.sendto(message, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    _unlink(path)  # left behind by a process that exited
+                except (BlockingIOError, OSError):
+                    pass  # receiver is backed up; its streams miss this change
+        finally:
+            sender.close()
+
+    def _deliver(self, message):
+        data = json.loads(message)
+        with self._lock:
+            subscribers = list(self._subscriptions.get(data['session'], ()))
+        for subscription in subscribers:
+            subscription.put(data['checks'])
+
+    def _start_receiver(self):
+        if self.socket_dir is None or not hasattr(socket, 'AF_UNIX'):
+            self._socket = False  # in-process delivery only
+            return
+        os.makedirs(self.socket_dir, exist_ok=True)
+        path = os.path.join(self.socket_dir, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.sock')
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(path)
+        atexit.register(_unlink, path)
+        self._socket = receiver
+        threading.Thread(target=self._receive, args=(receiver,), daemon=True,
+                         name='session-events').start()
+
+    def _receive(self, receiver):
+        while True:
+            message = receiver.recv(65536)
+            try:
+                self._deliver(message)
+            except (ValueError, KeyError):
+                continue
+
+
+broker = Broker()
+
+
+def init_events(app):
+    """Point the broker at the app's socket directory."""
+    broker.configure(app.config.get('EVENTS_SOCKET_DIR') or os.path.join(app.instance_path, 'events'))
+
+
+def queue_result_events(db_session, session_id, check_ids=None):
+    """Publish a notification for ``session_id`` when ``db_session`` commits."""
+    pending = db_session.info.setdefault(_PENDING_KEY, {})
+    if check_ids is None or pending.get(session_id, ()) is None:
+        pending[session_id] = None
+    else:
+        pending.setdefault(session_id, set()).update(check_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending(db_session):
+    pending = db_session.info.pop(_PENDING_KEY, None)
+    for session_id, check_ids in (pending or {}).items():
+        broker.publish(session_id, check_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(db_session):
+    db_session.info.pop(_PENDING_KEY, None)
+
+
+def sse_message(event_name, data):
+    """Format one server-sent event; multi-line data becomes several ``data:`` lines."""
+    lines = ''.join(f'data: {line}\n' for line in data.splitlines() or [''])
+    return f'event: {event_name}\n{lines}\n'
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,7 +1,16 @@
 import io
 from datetime import datetime, timezone
-import xlsxwriter
+from types import SimpleNamespace
+from ..extensions import db
 from ..models import Check, BenchmarkSection, AuditResult
+from .archive import load_archive
+from .section_rollups import session_sections
+
+# Check attributes written to a fieldwork checklist
+_CHECKLIST_FIELDS = (
+    'check_number', 'title', 'level', 'scored', 'audit_command', 'audit_steps',
+    'expected_output', 'remediation',
+)
 
 
 def export_benchmark_to_excel(benchmark, level=None, scored_only=False):
@@ -9,8 +18,42 @@ def export_benchmark_to_excel(benchmark, level=None, scored_only=False):
 
     Returns a BytesIO object containing the Excel file.
     """
+    return io.BytesIO(build_benchmark_workbook(benchmark_checklist(benchmark, level, scored_only)))
+
+
+def benchmark_checklist(benchmark, level=None, scored_only=False):
+    """Load what a fieldwork checklist needs into plain, picklable data."""
+    checks_query = _checklist_query(benchmark.id)
+    if level:
+        checks_query = checks_query.filter(Check.level == level)
+    if scored_only:
+        checks_query = checks_query.filter(Check.scored.is_(True))
+
+    return {
+        'benchmark': {
+            'name': benchmark.name,
+            'version': benchmark.version,
+            'platform': benchmark.platform.name,
+            'release_date': benchmark.release_date,
+            'description': benchmark.description,
+            'url': benchmark.url,
+            'total_checks': benchmark.total_checks,
+        },
+        'checks': [tuple(row) for row in checks_query.order_by(Check.check_number)],
+    }
+
+
+def build_benchmark_workbook(checklist):
+    """Write a fieldwork checklist workbook; needs no database, so it can run in a worker process.
+
+    Returns the workbook as bytes.
+    """
+    info = checklist['benchmark']
+    benchmark = SimpleNamespace(**dict(info, platform=SimpleNamespace(name=info['platform'])))
+    checks = [SimpleNamespace(**dict(zip(_CHECKLIST_FIELDS, row))) for row in checklist['checks']]
+
     output = io.BytesIO()
-    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    workbook = _new_workbook(output)
 
     # Define formats
     formats = _create_formats(workbook)
@@ -19,20 +62,18 @@ def export_benchmark_to_excel(benchmark, level=None, scored_only=False):
     _write_cover_sheet(workbook, formats, benchmark)
 
     # Checklist sheet
-    checks_query = Check.query.join(BenchmarkSection).filter(
-        BenchmarkSection.benchmark_id == benchmark.id
-    )
-    if level:
-        checks_query = checks_query.filter(Check.level == level)
-    if scored_only:
-        checks_query = checks_query.filter(Check.scored.is_(True))
-
-    checks = checks_query.order_by(Check.check_number).all()
     _write_checklist_sheet(workbook, formats, checks)
 
     workbook.close()
-    output.seek(0)
-    return output
+    return output.getvalue()
+
+
+def _checklist_query(benchmark_id):
+    return db.session.query(
+        *(getattr(Check, field) for field in _CHECKLIST_FIELDS)
+    ).join(BenchmarkSection, Check.section_id == BenchmarkSection.id).filter(
+        BenchmarkSection.benchmark_id == benchmark_id
+    )
 
 
 def export_audit_to_excel(session):
@@ -41,27 +82,55 @@ def export_audit_to_excel(session):
     Returns a BytesIO object containing the Excel file.
     """
     output = io.BytesIO()
-    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    workbook = _new_workbook(output)
 
     formats = _create_formats(workbook)
 
     # Cover sheet with session info
     _write_audit_cover_sheet(workbook, formats, session)
 
+    # Section rollups first: backfilling missing ones commits
+    sections = session_sections(session, max_depth=0)
+
     # Checklist with results
-    results = AuditResult.query.filter_by(
-        session_id=session.id
-    ).join(Check).order_by(Check.check_number).all()
+    if session.status == 'archived':
+        results = load_archive(session).results
+    else:
+        results = AuditResult.query.filter_by(
+            session_id=session.id
+        ).join(Check, AuditResult.check_id == Check.id).order_by(Check.check_number).all()
     _write_audit_checklist_sheet(workbook, formats, results)
 
     # Summary sheet
-    _write_summary_sheet(workbook, formats, session, results)
+    _write_summary_sheet(workbook, formats, results, sections)
+
+    workbook.close()
+    output.seek(0)
+    return output
+
+
+def export_comparison_to_excel(comparison):
+    """Export a baseline-vs-sessions comparison to an Excel file.
+
+    Returns a BytesIO object containing the Excel file.
+    """
+    output = io.BytesIO()
+    workbook = _new_workbook(output)
+
+    formats = _create_formats(workbook)
+    _write_comparison_sheet(workbook, formats, comparison)
+    _write_comparison_sections_sheet(workbook, formats, comparison)
 
     workbook.close()
     output.seek(0)
     return output
 
 
+def _new_workbook(output):
+    import xlsxwriter  # loaded on first export rather than at app start-up
+    return xlsxwriter.Workbook(output, {'in_memory': True})
+
+
 def _create_formats(workbook):
     """Create reusable formats for the workbook."""
     return {
@@ -293,13 +362,13 @@ def _write_audit_checklist_sheet(workbook, formats, results):
         sheet.autofilter(0, 0, len(results), len(headers) - 1)
 
 
-def _write_summary_sheet(workbook, formats, session, results):
-    """Write summary statistics sheet."""
+def _write_summary_sheet(workbook, formats, results, sections):
+    """Write summary statistics sheet; ``sections`` are the top-level section rollups."""
     sheet = workbook.add_worksheet('Summary')
     sheet.hide_gridlines(2)
     sheet.set_column('A:A', 25)
     sheet.set_column('B:B', 20)
-    sheet.set_column('C:C', 15)
+    sheet.set_column('C:D', 15)
 
     row = 1
     sheet.merge_range(row, 0, row, 2, 'Audit Summary', formats['title'])
@@ -340,40 +409,18 @@ def _write_summary_sheet(workbook, formats, session, results):
     sheet.write(row, 0, 'Section', formats['header'])
     sheet.write(row, 1, 'Pass / Checked', formats['header'])
     sheet.write(row, 2, 'Rate', formats['header'])
+    sheet.write(row, 3, 'Weighted Score', formats['header'])
     row += 1
 
-    # Group results by top-level section
-    section_stats = {}
-    for result in results:
-        # Get top-level section number
-        check_num = result.check.check_number
-        top_section = check_num.split('.')[0]
-        section_title = result.check.section.title
-
-        # Walk up to find top-level section title
-        sec = result.check.section
-        while sec.parent:
-            sec = sec.parent
-        top_title = f'{sec.number}. {sec.title}'
-
-        if top_title not in section_stats:
-            section_stats[top_title] = {'pass': 0, 'checked': 0, 'total': 0}
-        section_stats[top_title]['total'] += 1
-        if result.status != 'not_checked':
-            section_stats[top_title]['checked'] += 1
-        if result.status == 'pass':
-            section_stats[top_title]['pass'] += 1
-
-    for section_name in sorted(section_stats.keys()):
-        stats = section_stats[section_name]
-        checked = stats['checked']
-        passed = stats['pass']
-        rate = passed / checked if checked > 0 else 0
+    for section in sections:
+        rate = section.passed / section.checked if section.checked > 0 else 0
+        score = section.weight_passed / section.weight_checked if section.weight_checked > 0 else 0
 
         fmt = formats['cell_alt'] if row % 2 == 0 else formats['cell']
-        sheet.write(row, 0, section_name, fmt)
-        sheet.write(row, 1, f'{passed} / {checked}', fmt)
+        sheet.write(row, 0, f'{section.number}. {section.title}', fmt)
+        sheet.write(row, 1, f'{section.passed} / {section.checked}', fmt)
         sheet.write(row, 2, rate, formats['stat_pct'])
+        sheet.write(row, 3, score, formats['stat_pct'])
         row += 1
 
     # Add a pie chart
@@ -407,3 +454,81 @@ def _write_summary_sheet(workbook, formats, session, results):
         chart.set_title({'name': 'Results Distribution'})
         chart.set_size({'width': 480, 'height': 360})
         sheet.insert_chart(row, 0, chart)
+
+
+_STATUS_DISPLAY = {
+    'pass': 'Pass',
+    'fail': 'Fail',
+    'not_applicable': 'N/A',
+    'not_checked': 'Not Checked',
+}
+
+_CHANGE_DISPLAY = {
+    'regression': 'Regression',
+    'fixed': 'Fixed',
+    'still_failing': 'Still Failing',
+    'changed': 'Changed',
+    'unchanged': 'Unchanged',
+}
+
+
+def _write_comparison_sheet(workbook, formats, comparison):
+    """Write one row per check with the baseline and each session's status."""
+    sheet = workbook.add_worksheet('Comparison')
+    sessions = comparison['sessions']
+
+    headers = ['Check #', 'Title', 'Section', 'Baseline']
+    widths = [12, 45, 30, 14]
+    for session in sessions:
+        label = f'{session.target_name} ({session.started_at.strftime("%Y-%m-%d")})'
+        headers += [f'{label} Status', f'{label} Change']
+        widths += [16, 16]
+
+    for i, (width, header) in enumerate(zip(widths, headers)):
+        sheet.set_column(i, i, width)
+        sheet.write(0, i, header, formats['header'])
+    sheet.freeze_panes(1, 4)
+
+    change_formats = {
+        'regression': formats['fail'],
+        'fixed': formats['pass'],
+        'still_failing': formats['cell_l2'],
+    }
+    for row_idx, row in enumerate(comparison['rows'], start=1):
+        fmt = formats['cell_alt'] if row_idx % 2 == 0 else formats['cell']
+        sheet.write(row_idx, 0, row['check_number'], fmt)
+        sheet.write(row_idx, 1, row['title'], fmt)
+        sheet.write(row_idx, 2, row['section'] or '', fmt)
+        sheet.write(row_idx, 3, _STATUS_DISPLAY.get(row['baseline']['status'], ''), fmt)
+        col = 4
+        for cell in row['sessions']:
+            cell_fmt = change_formats.get(cell['category'], fmt)
+            sheet.write(row_idx, col, _STATUS_DISPLAY.get(cell['status'], ''), cell_fmt)
+            sheet.write(row_idx, col + 1, _CHANGE_DISPLAY[cell['category']], cell_fmt)
+            col += 2
+
+    if comparison['rows']:
+        sheet.autofilter(0, 0, len(comparison['rows']), len(headers) - 1)
+
+
+def _write_comparison_sections_sheet(workbook, formats, comparison):
+    """Write change totals per session, overall and by top-level section."""
+    sheet = workbook.add_worksheet('Sections')
+    sheet.set_column('A:A', 40)
+    sheet.set_column(1, len(_CHANGE_DISPLAY) + 1, 15)
+
+    row = 0
+    blocks = [('All Sections', comparison['totals'])] + list(comparison['sections'])
+    for section, counts_per_session in blocks:
+        sheet.write(row, 0, section or '', formats['subtitle'])
+        row += 1
+        sheet.write(row, 0, 'Session', formats['header'])
+        for i, label in enumerate(_CHANGE_DISPLAY.values(), start=1):
+            sheet.write(row, i, label, formats['header'])
+        row += 1
+        for session, counts in zip(comparison['sessions'], counts_per_session):
+            sheet.write(row, 0, session.target_name, formats['cell'])
+            for i, category in enumerate(_CHANGE_DISPLAY, start=1):
+                sheet.write(row, i, counts[category], formats['cell'])
+            row += 1
+        row += 1
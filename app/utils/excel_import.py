@@ -0,0 +1,155 @@
+import time
+import zipfile
+from datetime import datetime, timezone
+from sqlalchemy import update
+from ..extensions import db
+from ..models import Check, AuditResult
+from .stats import record_result_changes
+
+# Rows applied per executemany UPDATE
+IMPORT_BATCH_SIZE = 500
+
+# Status cell text (as written by the exporters and the dropdown) -> AuditResult.status
+STATUS_VALUES = {
+    'pass': 'pass',
+    'fail': 'fail',
+    'n/a': 'not_applicable',
+    'na': 'not_applicable',
+    'not applicable': 'not_applicable',
+    'not checked': 'not_checked',
+}
+
+
+class ChecklistImportError(ValueError):
+    """Raised when an uploaded workbook is not a Kenbu checklist."""
+
+
+def iter_checklist_rows(fileobj):
+    """Stream ``(check_number, status, finding)`` from every checklist sheet.
+
+    The workbook is opened in read-only mode, so rows are parsed lazily from
+    the underlying XML instead of loading every sheet into memory. Sheets
+    without a ``Check #`` / ``Status`` header row (Cover, Summary) are skipped.
+    """
+    # openpyxl is slow to import; load it on first use rather than at app start-up
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError) as exc:
+        raise ChecklistImportError(f'Not a readable .xlsx workbook ({exc}).') from exc
+    try:
+        found_sheet = False
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            columns = _header_columns(next(rows, ()))
+            if columns is None:
+                continue
+            found_sheet = True
+            for row in rows:
+                check_number = _cell(row, columns['check'])
+                if not check_number:
+                    continue
+                yield (
+                    check_number,
+                    _cell(row, columns['status']),
+                    _cell(row, columns['finding']),
+                )
+        if not found_sheet:
+            raise ChecklistImportError('No checklist rows found (expected a "Check #" column).')
+    finally:
+        workbook.close()
+
+
+def import_checklist(fileobj, session):
+    """Apply statuses and findings from a filled-in checklist to ``session``.
+
+    All updates go through executemany UPDATEs in the caller's transaction;
+    the caller commits. Returns a report dict including rows per second.
+    """
+    started = time.perf_counter()
+    results = {
+        check_number: (result_id, check_id, status, finding)
+        for result_id, check_id, check_number, status, finding in db.session.query(
+            AuditResult.id, AuditResult.check_id, Check.check_number,
+            AuditResult.status, AuditResult.finding,
+        ).join(Check, AuditResult.check_id == Check.id).filter(
+            AuditResult.session_id == session.id
+        )
+    }
+
+    report = {'rows': 0, 'updated': 0, 'unchanged': 0, 'unknown': [], 'invalid': []}
+    now = datetime.now(timezone.utc)
+    batch = []
+    changes = []
+
+    for check_number, status_text, finding in iter_checklist_rows(fileobj):
+        report['rows'] += 1
+        current = results.get(check_number)
+        if current is None:
+            report['unknown'].append(check_number)
+            continue
+        result_id, check_id, old_status, old_finding = current
+
+        if status_text:
+            status = STATUS_VALUES.get(status_text.lower())
+            if status is None:
+                report['invalid'].append(check_number)
+                continue
+        else:
+            status = old_status
+        finding = finding if finding is not None else (old_finding or '')
+
+        if status == old_status and finding == (old_finding or ''):
+            report['unchanged'] += 1
+            continue
+
+        batch.append({
+            'id': result_id,
+            'status': status,
+            'finding': finding,
+            'checked_at': now if status != 'not_checked' else None,
+        })
+        changes.append((check_id, old_status, status, finding))
+        results[check_number] = (result_id, check_id, status, finding)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            report['updated'] += _apply(batch)
+
+    report['updated'] += _apply(batch)
+    record_result_changes(session, changes, 'import')
+
+    elapsed = time.perf_counter() - started
+    report['seconds'] = elapsed
+    report['rows_per_second'] = int(report['rows'] / elapsed) if elapsed > 0 else report['rows']
+    return report
+
+
+def _apply(batch):
+    if not batch:
+        return 0
+    count = len(batch)
+    db.session.execute(update(AuditResult), batch)
+    batch.clear()
+    return count
+
+
+def _header_columns(row):
+    """Map a checklist header row to column indexes, or None if it is not one."""
+    labels = [str(v).strip().lower() if v is not None else '' for v in row]
+    if 'check #' not in labels or 'status' not in labels:
+        return None
+    return {
+        'check': labels.index('check #'),
+        'status': labels.index('status'),
+        'finding': labels.index('findings') if 'findings' in labels else None,
+    }
+
+
+def _cell(row, index):
+    if index is None or index >= len(row):
+        return None
+    value = row[index]
+    if value is None:
+        return None
+    return str(value).strip()
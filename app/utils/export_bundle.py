@@ -0,0 +1,117 @@
+"""Bundle several benchmark checklists into one streamed ZIP download.
+
+Checklist data is loaded from the database up front; the workbooks are then
+written in a process pool, since building one is CPU-bound Python. Each
+workbook is added to the ZIP and sent as soon as it is finished, so the
+download starts with the first workbook and the whole bundle takes about as
+long as the largest benchmark rather than the sum of all of them.
+
+The pool is created on first use in each process and kept for later
+bundles, sized by ``EXPORT_WORKERS`` (one per CPU by default) whatever the
+size of the bundle that created it. Each gunicorn worker (2 x CPUs + 1 by
+default) gets its own pool, so a host can run that many times
+``EXPORT_WORKERS`` builders. Pool processes are started from a fork server
+where available, so they do not inherit the web worker's threads or
+database connections.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .excel_export import benchmark_checklist, build_benchmark_workbook
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+class _ZipStream:
+    """Write-only sink for ``zipfile``; collects what was written until drained.
+
+    It has no ``tell``/``seek``, so ``zipfile`` writes sizes after each member
+    instead of seeking back, which is what lets the archive be streamed.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def checklist_filename(benchmark):
+    return f'CIS_Checklist_{benchmark.platform.slug}_{benchmark.version}.xlsx'
+
+
+def bundle_checklists(benchmarks, level=None, scored_only=False):
+    """Load the checklists to bundle as ``(filename, checklist)`` pairs."""
+    names = set()
+    checklists = []
+    for benchmark in benchmarks:
+        name = base = checklist_filename(benchmark)
+        copy = 1
+        while name in names:
+            copy += 1
+            name = f'{base[:-5]}_{copy}.xlsx'
+        names.add(name)
+        checklists.append((name, benchmark_checklist(benchmark, level, scored_only)))
+    return checklists
+
+
+def stream_bundle(checklists, workers):
+    """Yield a ZIP of the checklists' workbooks, adding each as it is built."""
+    sink = _ZipStream()
+    timestamp = time.localtime()[:6]
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+        for name, data in _build_workbooks(checklists, workers):
+            # Workbooks are already compressed; storing them keeps the CPU free
+            archive.writestr(zipfile.ZipInfo(name, timestamp), data)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _build_workbooks(checklists, workers):
+    if workers <= 1 or len(checklists) <= 1:
+        for name, checklist in checklists:
+            yield name, build_benchmark_workbook(checklist)
+        return
+
+    pool = _get_pool(workers)
+    futures = {pool.submit(build_benchmark_workbook, checklist): name for name, checklist in checklists}
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # The client went away or a build failed: drop the queued builds
+        for future in futures:
+            future.cancel()
+
+
+def _get_pool(workers):
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+            _pool_pid = os.getpid()
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _mp_context():
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
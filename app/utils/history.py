@@ -0,0 +1,203 @@
+"""Append-only history of audit result changes, written behind the request.
+
+``record_result_changes`` queues one event per change on the database
+session. Once that transaction commits, the events move to this process's
+``ResultLog`` buffer and a background thread inserts them in batches. This
+happens every ``RESULT_LOG_FLUSH_INTERVAL`` seconds, or sooner when
+``RESULT_LOG_BATCH_SIZE`` events are waiting. A status click therefore
+commits exactly what it did before; its history row is written with other
+changes in a later transaction.
+
+The buffer is bounded: when ``RESULT_LOG_MAX_PENDING`` events are waiting,
+the committing thread flushes them itself. A failed write keeps the batch
+for the background thread's next attempt, and until a write succeeds again
+committing threads do not retry inline; the oldest events beyond
+``RESULT_LOG_MAX_PENDING`` are dropped and logged. Events still buffered are
+flushed when the process exits normally; a crash loses at most the last
+flush interval.
+
+Readers flush this process's buffer before querying, but other workers'
+buffers are not visible: history pages can miss up to one flush interval of
+changes made through other processes.
+"""
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from ..models import AuditResultEvent
+
+_PENDING_KEY = 'kenbu_result_history'
+
+logger = logging.getLogger(__name__)
+
+
+class ResultLog:
+    """Per-process buffer of committed result events and its flush thread."""
+
+    def __init__(self):
+        self.batch_size = 500
+        self.max_pending = 5000
+        self.interval = 1.0
+        self._pending = {}  # engine -> rows
+        self._count = 0
+        self._failing = False  # the last write failed; leave retries to the thread
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def configure(self, app):
+        self.batch_size = app.config['RESULT_LOG_BATCH_SIZE']
+        self.max_pending = app.config['RESULT_LOG_MAX_PENDING']
+        self.interval = app.config['RESULT_LOG_FLUSH_INTERVAL']
+
+    def append(self, engine, rows):
+        with self._lock:
+            self._start()
+            self._pending.setdefault(engine, []).extend(rows)
+            self._count += len(rows)
+            if self._failing:
+                self._trim()  # the thread retries once per interval
+                return
+            pending = self._count
+        if pending >= self.max_pending:
+            self.flush()
+        elif pending >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """Write every buffered event now; returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending, self._count = self._pending, {}, 0
+            written, failed = 0, False
+            for engine, batch in pending.items():
+                try:
+                    with engine.begin() as conn:
+                        for start in range(0, len(batch), self.batch_size):
+                            conn.execute(insert(AuditResultEvent), batch[start:start + self.batch_size])
+                except SQLAlchemyError:
+                    logger.exception('Writing %d result events failed; will retry', len(batch))
+                    with self._lock:
+                        self._pending.setdefault(engine, [])[:0] = batch
+                        self._count += len(batch)
+                        self._failing = True
+                        self._trim()
+                    failed = True
+                    continue
+                written += len(batch)
+            if written and not failed:
+                with self._lock:
+                    self._failing = False
+            return written
+
+    def _trim(self):
+        # Called with the lock held: drop the oldest events beyond max_pending
+        excess = self._count - self.max_pending
+        if excess <= 0:
+            return
+        for batch in self._pending.values():
+            dropped = min(excess, len(batch))
+            del batch[:dropped]
+            excess -= dropped
+            if not excess:
+                break
+        dropped = self._count - self.max_pending - excess
+        self._count -= dropped
+        logger.error('Result history buffer full; dropped the %d oldest events', dropped)
+
+    def _start(self):
+        # Called with the lock held; a forked worker starts its own thread
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._pending, self._count = {}, 0  # the parent process writes its own events
+        threading.Thread(target=self._run, daemon=True, name='result-log').start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+result_log = ResultLog()
+atexit.register(result_log.flush)
+
+
+def init_history(app):
+    result_log.configure(app)
+
+
+def queue_result_history(db_session, session, changes, actor_id, source):
+    """Log ``(check_id, old_status, new_status, finding)`` changes when ``db_session`` commits."""
+    now = datetime.now(timezone.utc)
+    db_session.info.setdefault(_PENDING_KEY, []).extend(
+        {
+            'session_id': session.id,
+            'check_id': check_id,
+            'status': new_status,
+            'finding': finding,
+            'actor_id': actor_id,
+            'source': source,
+            'changed_at': now,
+        }
+        for check_id, _old_status, new_status, finding in changes
+    )
+
+
+@event.listens_for(Session, 'after_commit')
+def _log_pending(db_session):
+    rows = db_session.info.pop(_PENDING_KEY, None)
+    if rows:
+        result_log.append(db_session.get_bind(AuditResultEvent), rows)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(db_session):
+    db_session.info.pop(_PENDING_KEY, None)
+
+
+def session_state_as_of(session_id, when):
+    """Reconstruct a session's results at ``when`` from the event log.
+
+    Returns ``{check_id: event}`` with the last event of each check at or
+    before ``when``; checks without one were still ``not_checked``. Flushes
+    this process's buffer first so its own recent changes are included;
+    changes made through other workers in the last flush interval may be
+    missing.
+    """
+    result_log.flush()
+    latest = (
+        select(
+            AuditResultEvent.id,
+            func.row_number().over(
+                partition_by=AuditResultEvent.check_id,
+                order_by=(AuditResultEvent.changed_at.desc(), AuditResultEvent.id.desc()),
+            ).label('position'),
+        )
+        .where(AuditResultEvent.session_id == session_id, AuditResultEvent.changed_at <= when)
+        .subquery()
+    )
+    events = AuditResultEvent.query.join(latest, AuditResultEvent.id == latest.c.id).filter(
+        latest.c.position == 1
+    )
+    return {event.check_id: event for event in events}
+
+
+def result_events(session_id, check_id=None, limit=None):
+    """A session's (or one result's) events, newest first.
+
+    Like ``session_state_as_of``, this sees other workers' changes only once
+    they have flushed them.
+    """
+    result_log.flush()
+    query = AuditResultEvent.query.filter_by(session_id=session_id)
+    if check_id is not None:
+        query = query.filter_by(check_id=check_id)
+    query = query.order_by(AuditResultEvent.changed_at.desc(), AuditResultEvent.id.desc())
+    return query.limit(limit).all() if limit else query.all()
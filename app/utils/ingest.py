@@ -0,0 +1,257 @@
+"""Ingest offline evidence bundles collected on air-gapped hosts.
+
+A bundle is a tarball (optionally gzip/bzip2/xz compressed) laid out as::
+
+    <host>/<check_number>.out   stdout of the check's audit command
+    <host>/<check_number>.err   stderr (optional)
+    <host>/<check_number>.rc    exit code (optional)
+    <host>/target_ip            the host's IP address (optional)
+
+The archive is read as a stream. A check's files may come in any order
+within its host directory, so one host's outputs are held in memory until
+the next host starts: at most ``max_output`` bytes per file, so about
+``2 * max_output`` per check. Chunks of up to ``batch_size`` outputs from
+one host are scored in a process pool; each worker compiles the benchmark's
+matchers once. Results are written from the main process, one session per
+host, with executemany batches. Outputs cut at ``max_output`` are stored
+but get no proposed status, since the missing part may decide it.
+"""
+import os
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from sqlalchemy import insert, update
+from ..extensions import db
+from ..models import BenchmarkSection, Check, AuditSession, AuditResult, AuditEvidence
+from .audit_sessions import create_session
+from .matchers import compile_expectation, evaluate
+from .stats import record_result_changes
+
+# Outputs per chunk sent to a worker and written per transaction
+INGEST_BATCH_SIZE = 500
+
+_EXTENSIONS = ('.out', '.err', '.rc')
+
+
+class BundleError(ValueError):
+    """Raised when an uploaded file is not a readable evidence bundle."""
+
+
+# --- Worker side -----------------------------------------------------------------
+
+_worker_matchers = {}
+
+
+def _init_worker(expectations):
+    """Compile ``{check_number: expected_output}`` once per worker process."""
+    _worker_matchers.clear()
+    _worker_matchers.update(
+        (number, compile_expectation(text)) for number, text in expectations.items()
+    )
+
+
+def _evaluate_chunk(outputs):
+    """Score ``[(check_number, stdout, stderr, exit_code, truncated)]``; returns proposals in order."""
+    proposals = []
+    for check_number, stdout, stderr, exit_code, truncated in outputs:
+        if truncated or exit_code in (126, 127):
+            proposals.append(None)
+        else:
+            proposals.append(evaluate(_worker_matchers.get(check_number), stdout, stderr))
+    return proposals
+
+
+# --- Reading -------------------------------------------------------------------
+
+def iter_bundle(fileobj, max_output=65536):
+    """Stream ``(host, target_ip, outputs)`` from a bundle, one host at a time.
+
+    ``outputs`` is a list of ``(check_number, stdout, stderr, exit_code,
+    truncated)``; ``truncated`` is set when stdout or stderr was longer than
+    ``max_output`` bytes and only its start was read. Members must be grouped
+    by host directory, as ``tar -c`` writes them; a host seen again later
+    yields a second group. A host's outputs are buffered until it ends.
+    """
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode='r|*')
+    except tarfile.TarError as exc:
+        raise BundleError(f'Not a readable tar bundle ({exc}).') from exc
+
+    host, target_ip, files = None, '', {}
+    try:
+        for member in archive:
+            if not member.isfile():
+                continue
+            parts = [part for part in member.name.split('/') if part not in ('', '.')]
+            if len(parts) < 2:
+                continue
+            member_host, filename = parts[-2], parts[-1]
+            if member_host != host:
+                if files:
+                    yield host, target_ip, _outputs(files)
+                host, target_ip, files = member_host, '', {}
+
+            data = archive.extractfile(member).read(max_output)
+            text = data.decode('utf-8', errors='replace')
+            if filename == 'target_ip':
+                target_ip = text.strip()
+                continue
+            check_number, ext = os.path.splitext(filename)
+            if ext in _EXTENSIONS:
+                parts = files.setdefault(check_number, {})
+                parts[ext] = text
+                if ext != '.rc' and member.size > max_output:
+                    parts['truncated'] = True
+    except tarfile.TarError as exc:
+        raise BundleError(f'Bundle is truncated or corrupt ({exc}).') from exc
+    finally:
+        archive.close()
+
+    if files:
+        yield host, target_ip, _outputs(files)
+
+
+def _outputs(files):
+    outputs = []
+    for check_number, parts in files.items():
+        rc = parts.get('.rc', '').strip()
+        outputs.append((
+            check_number,
+            parts.get('.out', ''),
+            parts.get('.err', ''),
+            int(rc) if rc.lstrip('-').isdigit() else None,
+            parts.get('truncated', False),
+        ))
+    return outputs
+
+
+# --- Pipeline ------------------------------------------------------------------
+
+def ingest_bundle(fileobj, benchmark, user_id, workers=None, batch_size=INGEST_BATCH_SIZE,
+                  max_output=65536, overwrite=False):
+    """Evaluate a bundle against ``benchmark`` and record one session per host.
+
+    Each written chunk is committed, so transaction size is bounded by
+    ``batch_size``. Memory holds the current host's outputs (see
+    ``iter_bundle``) plus the chunks in flight. Returns a report dict.
+    """
+    started = time.perf_counter()
+    checks = {
+        number: (check_id, command, expected)
+        for check_id, number, command, expected in db.session.query(
+            Check.id, Check.check_number, Check.audit_command, Check.expected_output
+        ).join(BenchmarkSection).filter(BenchmarkSection.benchmark_id == benchmark.id)
+    }
+    expectations = {number: expected for number, (_id, _cmd, expected) in checks.items()}
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+    sessions = {}
+    report = {'hosts': 0, 'outputs': 0, 'unknown': 0, 'passed': 0, 'failed': 0,
+              'undecided': 0, 'updated': 0, 'sessions_created': 0}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(expectations,)) as pool:
+        in_flight = {}
+        for host, target_ip, outputs in iter_bundle(fileobj, max_output):
+            if host not in sessions:
+                sessions[host] = _host_session(host, target_ip, benchmark, user_id, report)
+            known = [output for output in outputs if output[0] in checks]
+            report['unknown'] += len(outputs) - len(known)
+            for i in range(0, len(known), batch_size):
+                chunk = known[i:i + batch_size]
+                if len(in_flight) >= max_in_flight:
+                    _drain(in_flight, sessions, checks, overwrite, report, FIRST_COMPLETED)
+                in_flight[pool.submit(_evaluate_chunk, chunk)] = (host, chunk)
+        _drain(in_flight, sessions, checks, overwrite, report)
+
+    report['hosts'] = len(sessions)
+    elapsed = time.perf_counter() - started
+    report['seconds'] = elapsed
+    report['outputs_per_second'] = int(report['outputs'] / elapsed) if elapsed > 0 else report['outputs']
+    return report
+
+
+def _drain(in_flight, sessions, checks, overwrite, report, return_when=None):
+    """Write finished chunks; waits for one (FIRST_COMPLETED) or all of them."""
+    if return_when is None:
+        done = list(in_flight)
+    else:
+        done, _pending = wait(in_flight, return_when=return_when)
+    for future in done:
+        host, chunk = in_flight.pop(future)
+        _write_chunk(sessions[host], chunk, future.result(), checks, overwrite, report)
+
+
+def _host_session(host, target_ip, benchmark, user_id, report):
+    """Reuse the host's open session for this benchmark, or create one."""
+    session = AuditSession.query.filter_by(
+        user_id=user_id, benchmark_id=benchmark.id, target_name=host, status='in_progress'
+    ).order_by(AuditSession.started_at.desc()).first()
+    if session is None:
+        session, _count = create_session(user_id, benchmark, host, target_ip,
+                                         'Created from an evidence bundle')
+        report['sessions_created'] += 1
+    elif target_ip and not session.target_ip:
+        session.target_ip = target_ip
+    db.session.commit()
+    return session.id
+
+
+def _write_chunk(session_id, chunk, proposals, checks, overwrite, report):
+    session = db.session.get(AuditSession, session_id)
+    now = datetime.now(timezone.utc)
+    check_ids = [checks[number][0] for number, *_output in chunk]
+
+    current = {
+        check_id: (result_id, status, finding)
+        for result_id, check_id, status, finding in db.session.query(
+            AuditResult.id, AuditResult.check_id, AuditResult.status, AuditResult.finding
+        ).filter(AuditResult.session_id == session_id, AuditResult.check_id.in_(check_ids))
+    }
+
+    AuditEvidence.query.filter(
+        AuditEvidence.session_id == session_id,
+        AuditEvidence.check_id.in_(check_ids),
+    ).delete(synchronize_session=False)
+
+    evidence, updates, changes = [], [], []
+    for (number, stdout, stderr, exit_code, truncated), status in zip(chunk, proposals):
+        check_id, command, _expected = checks[number]
+        evidence.append({
+            'session_id': session_id,
+            'check_id': check_id,
+            'command': (command or '').strip(),
+            'stdout': stdout,
+            'stderr': stderr,
+            'exit_code': exit_code,
+            'timed_out': False,
+            'truncated': truncated,
+            'duration_ms': None,
+            'proposed_status': status,
+            'collected_at': now,
+        })
+        report['outputs'] += 1
+        report[{'pass': 'passed', 'fail': 'failed'}.get(status, 'undecided')] += 1
+
+        existing = current.get(check_id)
+        if status is None or existing is None:
+            continue
+        result_id, old_status, finding = existing
+        if old_status == status or (old_status != 'not_checked' and not overwrite):
+            continue
+        updates.append({
+            'id': result_id,
+            'status': status,
+            'finding': finding or f'[bundle] proposed {status.upper()}',
+            'checked_at': now,
+        })
+        changes.append((check_id, old_status, status, updates[-1]['finding']))
+
+    db.session.execute(insert(AuditEvidence), evidence)
+    if updates:
+        db.session.execute(update(AuditResult), updates)
+        record_result_changes(session, changes, 'bundle')
+    report['updated'] += len(updates)
+    db.session.commit()
@@ -0,0 +1,94 @@
+"""In-process timing counters.
+
+Template renders are timed by ``TimedTemplate`` (see ``templating.py``).
+Totals are kept per process; the most recent request's renders are also
+reported in a ``Server-Timing`` header, which browsers show in their
+developer tools. Streamed pages finish after their headers are sent, so
+they only appear in the totals, together with their time to first chunk.
+"""
+import threading
+from flask import g, has_request_context
+
+# Renders reported in one Server-Timing header
+MAX_SERVER_TIMINGS = 20
+
+_lock = threading.Lock()
+_templates = {}
+
+
+class TemplateTiming:
+    """Render counters for one template."""
+
+    __slots__ = ('name', 'count', 'total_ms', 'max_ms', 'streamed', 'first_chunk_ms')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.streamed = 0
+        self.first_chunk_ms = 0.0
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {
+            'template': self.name,
+            'count': self.count,
+            'mean_ms': round(self.mean_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'total_ms': round(self.total_ms, 3),
+            'streamed': self.streamed,
+            'mean_first_chunk_ms': round(self.first_chunk_ms / self.streamed, 3) if self.streamed else None,
+        }
+
+
+def record_template(name, elapsed_ms, first_chunk_ms=None):
+    """Add one render of ``name``; ``first_chunk_ms`` is set for streamed renders."""
+    name = name or '<string>'
+    with _lock:
+        timing = _templates.get(name)
+        if timing is None:
+            timing = _templates[name] = TemplateTiming(name)
+        timing.count += 1
+        timing.total_ms += elapsed_ms
+        timing.max_ms = max(timing.max_ms, elapsed_ms)
+        if first_chunk_ms is not None:
+            timing.streamed += 1
+            timing.first_chunk_ms += first_chunk_ms
+
+    if first_chunk_ms is None and has_request_context():
+        renders = g.setdefault('template_timings', [])
+        if len(renders) < MAX_SERVER_TIMINGS:
+            renders.append((name, elapsed_ms))
+
+
+def template_timings():
+    """Per-template counters of this process, slowest total first."""
+    with _lock:
+        timings = [timing.as_dict() for timing in _templates.values()]
+    return sorted(timings, key=lambda t: t['total_ms'], reverse=True)
+
+
+def reset_timings():
+    with _lock:
+        _templates.clear()
+
+
+def add_server_timing(response):
+    """``after_request`` hook adding this request's template renders to Server-Timing."""
+    renders = g.pop('template_timings', None)
+    if renders:
+        entries = [
+            f'tpl{i};desc="{name}";dur={elapsed_ms:.1f}'
+            for i, (name, elapsed_ms) in enumerate(renders)
+        ]
+        existing = response.headers.get('Server-Timing')
+        response.headers['Server-Timing'] = ', '.join(([existing] if existing else []) + entries)
+    return response
+
+
+def init_instrumentation(app):
+    app.after_request(add_server_timing)
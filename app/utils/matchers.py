@@ -0,0 +1,362 @@
+"""Compile ``Check.expected_output`` text into reusable output matchers.
+
+Expected output is free text written for humans. Each expectation is
+compiled once into a matcher tree:
+
+* literal lines (``install /bin/false``, ``net.ipv4.ip_forward = 0``), with
+  ``<placeholders>`` matching any value, must all appear in the output;
+* records (``Name : Domain`` then ``Enabled : True``, or a ``line vty 0 4``
+  section with indented commands) must match within one record of the
+  output, not across records;
+* numeric thresholds (``PASS_MAX_DAYS 365 (or less)``, ``... 24 or more``)
+  compare every value found for the key;
+* ``No output ...`` (or ``No matching lines found``) asserts that stdout is
+  empty;
+* a line wrapped in slashes (``/^umask\\s+0?27$/``) is used as a regex.
+
+Only lines that look like command output are compiled as literals: a
+single word, an all-lowercase directive, or a line with a value-like token
+(a digit, ``=``, ``:``, ``/``, a tab, aligned columns, ...), and never a
+line with English function words ("is", "the", "and", ...). Anything
+else is prose ("/tmp is mounted as a separate partition"), as are
+alternatives ("DEFAULT (or FUTURE or FIPS)"); they compile to None and no
+status is proposed. A trailing parenthetical that only annotates the line
+("audit-<version> (installed)") is dropped.
+
+Compiled matchers are cached per catalog version, so scoring outputs from
+many hosts only pays for the regex searches.
+"""
+import re
+import threading
+from sqlalchemy import func
+from ..extensions import db
+from ..models import Check
+
+_NO_OUTPUT = re.compile(r'^\(?(?:no output|no matching lines)\b', re.IGNORECASE)
+
+_NUMERIC = re.compile(
+    r'^(?P<key>.*?)[ \t]*[:=]?[ \t]*(?P<value>-?\d+)[ \t,]*\(?[ \t]*or[ \t]+'
+    r'(?P<op>greater|more|higher|less|fewer|lower)\b(?P<rest>[^)]*)\)?[ \t]*$',
+    re.IGNORECASE,
+)
+_BUT_NOT = re.compile(r'but not (-?\d+)', re.IGNORECASE)
+
+_TRAILING_PARENTHETICAL = re.compile(r'^(?P<line>.*?)[ \t]*\((?P<note>[^()]*)\)[ \t]*$')
+_SEPARATOR = re.compile(r'[ \t]*((?<=[ \t])[:=]|[:=](?=[ \t]))[ \t]*')
+_PLACEHOLDER = re.compile(r'<[^<>]+>')
+
+# Function words of English prose; command output does not contain them as words
+_FUNCTION_WORDS = frozenset(
+    'a an the is are was were be been being should must will shall can may and or but if'.split()
+)
+# Something only output has: a digit, punctuation of values and paths, a CamelCase
+# identifier, a tab or aligned columns
+_OUTPUT_TOKEN = re.compile(r'[\d=:/_"\'<>$\-,*@+^|\[\]{}.#%~\\()]|[a-z][A-Z]|\t| {2}')
+_PLAIN_WORDS = re.compile(r'[A-Za-z]+(?: [A-Za-z]+)*')
+_KEY_VALUE = re.compile(r'^(?P<key>[^:=]*?\S)[ \t]*:[ \t]*\S')
+
+_GREATER = ('greater', 'more', 'higher')
+
+
+class EmptyOutput:
+    """Passes when stdout is empty (stderr noise is ignored)."""
+
+    def matches(self, stdout, stderr=''):
+        return not stdout.strip()
+
+    def __repr__(self):
+        return '<EmptyOutput>'
+
+
+class LinePattern:
+    """Passes when the pattern is found on a line of stdout or stderr."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def matches(self, stdout, stderr=''):
+        return self.pattern.search(stdout) is not None or (
+            bool(stderr) and self.pattern.search(stderr) is not None
+        )
+
+    def __repr__(self):
+        return f'<LinePattern {self.pattern.pattern!r}>'
+
+
+class Numeric:
+    """Passes when every value found for ``key`` satisfies the threshold."""
+
+    def __init__(self, key, minimum=None, maximum=None, excluded=()):
+        self.pattern = re.compile(
+            _boundary_before(key) + _literal(key) + r'[ \t]*[:=]?[ \t]*"?(-?\d+)(?![\d.])',
+            re.IGNORECASE | re.MULTILINE,
+        )
+        self.minimum = minimum
+        self.maximum = maximum
+        self.excluded = set(excluded)
+
+    def matches(self, stdout, stderr=''):
+        values = [int(v) for v in self.pattern.findall(stdout)]
+        if not values:
+            return False
+        return all(self._accepts(v) for v in values)
+
+    def _accepts(self, value):
+        if value in self.excluded:
+            return False
+        if self.minimum is not None and value < self.minimum:
+            return False
+        if self.maximum is not None and value > self.maximum:
+            return False
+        return True
+
+    def __repr__(self):
+        return f'<Numeric {self.pattern.pattern!r} min={self.minimum} max={self.maximum}>'
+
+
+class Record:
+    """Passes when each group of lines is found together in one record of stdout.
+
+    ``groups`` are ``(header, members)`` matchers. With ``key`` unset, output
+    records are config sections starting at unindented lines and the header
+    must match a section's first line. With ``key`` set, each line with that
+    key starts a new record (lines before the first one belong to it) and the
+    header may match anywhere in the record. A group passes when one record
+    matches its header and every member.
+    """
+
+    def __init__(self, groups, key=None):
+        self.groups = groups
+        self.key = key
+
+    def matches(self, stdout, stderr=''):
+        records = [(record[0], '\n'.join(record)) for record in self._records(stdout)]
+        return all(
+            any(header.matches(text if self.key else first) and all(m.matches(text) for m in members)
+                for first, text in records)
+            for header, members in self.groups
+        )
+
+    def _records(self, stdout):
+        records = []
+        keyed = False
+        for line in stdout.splitlines():
+            if not line.strip():
+                continue
+            if self.key is None:
+                starts = not records or not line[:1].isspace()
+            else:
+                match = _KEY_VALUE.match(line.strip())
+                is_key = match is not None and match.group('key').lower() == self.key
+                starts = not records or (is_key and keyed)
+                keyed = keyed or is_key
+            if starts:
+                records.append([])
+            records[-1].append(line)
+        return records
+
+    def __repr__(self):
+        return f'<Record {self.key!r} {self.groups!r}>'
+
+
+class AllOf:
+    def __init__(self, matchers):
+        self.matchers = matchers
+
+    def matches(self, stdout, stderr=''):
+        return all(m.matches(stdout, stderr) for m in self.matchers)
+
+    def __repr__(self):
+        return f'<AllOf {self.matchers!r}>'
+
+
+class AnyOf:
+    def __init__(self, matchers):
+        self.matchers = matchers
+
+    def matches(self, stdout, stderr=''):
+        return any(m.matches(stdout, stderr) for m in self.matchers)
+
+    def __repr__(self):
+        return f'<AnyOf {self.matchers!r}>'
+
+
+def compile_expectation(text):
+    """Compile expected-output text into a matcher, or None if it is prose."""
+    raw = [line.rstrip() for line in (text or '').splitlines()]
+    raw = [line for line in raw if line.strip()]
+    if not raw:
+        return None
+    if _NO_OUTPUT.match(raw[0].strip()):
+        return EmptyOutput()
+
+    lines = []  # (indented, line)
+    for line in raw:
+        stripped = line.strip()
+        if stripped.startswith('(') and stripped.endswith(')'):
+            if _is_alternative(stripped[1:-1]):
+                return None
+            continue  # annotation of the previous line
+        lines.append((line[:1].isspace(), stripped))
+
+    matchers = [_compile_line(line) for _indented, line in lines]
+    if not matchers or None in matchers:
+        return None
+    if len(matchers) == 1:
+        return matchers[0]
+    return _compile_record(lines, matchers) or AllOf(matchers)
+
+
+def _compile_record(lines, matchers):
+    """A ``Record`` for config sections and ``Key : Value`` listings, else None."""
+    if any(indented for indented, _line in lines):
+        groups = []
+        for (indented, _line), matcher in zip(lines, matchers):
+            if indented and groups:
+                groups[-1][1].append(matcher)
+            else:
+                groups.append((matcher, []))
+        return Record(groups)
+
+    keys = [_KEY_VALUE.match(line) for _indented, line in lines]
+    if not all(keys):
+        return None
+    key = keys[0].group('key').lower()
+    groups = []
+    for match, matcher in zip(keys, matchers):
+        if match.group('key').lower() == key or not groups:
+            groups.append((matcher, []))
+        else:
+            groups[-1][1].append(matcher)
+    return Record(groups, key)
+
+
+def evaluate(matcher, stdout, stderr=''):
+    """Return ``'pass'``/``'fail'`` for captured output, or None without a matcher."""
+    if matcher is None:
+        return None
+    return 'pass' if matcher.matches(stdout or '', stderr or '') else 'fail'
+
+
+def _compile_line(line):
+    if len(line) > 2 and line.startswith('/') and line.endswith('/'):
+        try:
+            return LinePattern(re.compile(line[1:-1], re.MULTILINE))
+        except re.error:
+            return None
+
+    numeric = _NUMERIC.match(line)
+    if numeric and numeric.group('key'):
+        if _has_function_words(numeric.group('key')):
+            return None
+        value = int(numeric.group('value'))
+        greater = numeric.group('op').lower() in _GREATER
+        excluded = [int(v) for v in _BUT_NOT.findall(numeric.group('rest'))]
+        return Numeric(
+            numeric.group('key'),
+            minimum=value if greater else None,
+            maximum=None if greater else value,
+            excluded=excluded,
+        )
+
+    parenthetical = _TRAILING_PARENTHETICAL.match(line)
+    if parenthetical:
+        base, note = parenthetical.group('line'), parenthetical.group('note')
+        if _is_alternative(note):
+            # "(or no output, ...)" also accepts an empty result; other alternatives can't be matched
+            if 'no output' not in note.lower():
+                return None
+            matcher = _literal_pattern(base) if _is_output(base) else None
+            return AnyOf([matcher, EmptyOutput()]) if matcher else None
+        if '(' not in base and _is_annotation(note):
+            line = base  # "(installed)", "(if no devices are paired)"
+
+    return _literal_pattern(line) if _is_output(line) else None
+
+
+def _is_alternative(text):
+    return text.lstrip().lower().startswith(('or ', 'e.g.'))
+
+
+def _is_annotation(text):
+    """Parenthesised words describing the line rather than output, like "(package is installed)"."""
+    return _has_function_words(text) or _PLAIN_WORDS.fullmatch(text.strip()) is not None
+
+
+def _is_output(line):
+    """Whether a literal line reads as command output rather than as a description of it."""
+    if not line or _has_function_words(line):
+        return False
+    return len(line.split()) == 1 or line == line.lower() or _OUTPUT_TOKEN.search(line) is not None
+
+
+def _has_function_words(text):
+    return any(word.strip('.,;:()"\'').lower() in _FUNCTION_WORDS for word in text.split())
+
+
+def _literal_pattern(line):
+    if not line:
+        return None
+    parts = _PLACEHOLDER.split(line)
+    body = '.+?'.join(_literal(part) for part in parts)
+    pattern = _boundary_before(line) + body + _boundary_after(line)
+    return LinePattern(re.compile(pattern, re.MULTILINE))
+
+
+def _literal(text):
+    """Escape ``text`` for a regex, letting runs of blanks match any blanks.
+
+    A ``:`` or ``=`` separator with a blank on either side matches with any
+    spacing, so ``Name : Domain`` and ``Name: Domain`` compile alike.
+    """
+    parts = _SEPARATOR.split(text)
+    return r'[ \t]*'.join(
+        re.escape(part) if index % 2 else r'[ \t]+'.join(re.escape(word) for word in part.split())
+        for index, part in enumerate(parts)
+    )
+
+
+def _boundary_before(text):
+    return r'(?<![\w.])' if text[:1].isalnum() or text[:1] == '_' else ''
+
+
+def _boundary_after(text):
+    return r'(?![\w.])' if text[-1:].isalnum() or text[-1:] == '_' else ''
+
+
+# --- Cache ---------------------------------------------------------------------
+
+_cache_lock = threading.Lock()
+_cache = {'version': None, 'matchers': {}}
+
+
+def catalog_version():
+    """Identify the loaded catalog. Seeding only ever inserts checks."""
+    count, max_id = db.session.query(func.count(Check.id), func.max(Check.id)).one()
+    return (count, max_id)
+
+
+def get_matchers():
+    """Return ``{check_id: matcher}`` for the whole catalog, compiled once per version."""
+    version = catalog_version()
+    with _cache_lock:
+        if _cache['version'] != version:
+            _cache['matchers'] = {
+                check_id: compile_expectation(expected)
+                for check_id, expected in db.session.query(Check.id, Check.expected_output)
+            }
+            _cache['version'] = version
+        return _cache['matchers']
+
+
+def evaluate_batch(outputs):
+    """Score captured outputs from many hosts in one pass.
+
+    ``outputs`` yields ``(host, check_id, stdout, stderr)``. Returns
+    ``{host: {check_id: 'pass' | 'fail' | None}}``.
+    """
+    matchers = get_matchers()
+    scores = {}
+    for host, check_id, stdout, stderr in outputs:
+        scores.setdefault(host, {})[check_id] = evaluate(matchers.get(check_id), stdout, stderr)
+    return scores
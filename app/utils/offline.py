@@ -0,0 +1,226 @@
+"""Offline field bundles and the delta sync that brings their changes back.
+
+``build_offline_bundle`` packs one session into a ZIP holding
+``session.json`` (the checklist and current results, as compact rows under a
+field list) and ``index.html``, a self-contained page that works from that
+data with no server. The page keeps edits in the browser's local storage and
+saves them as a ``changes`` file.
+
+``sync_results`` applies such a batch in one transaction. Each change is keyed
+by ``check_id`` and carries the ``checked_at`` time it was made in the field;
+the latest write wins. A change older than the server's result for the same
+check is reported as a conflict, with the server's state, and not applied.
+A reset to not checked clears ``checked_at``, so the server's side of both
+the conflict check and ``server_changes`` also comes from the result history
+(``audit_result_events``).
+"""
+import io
+import json
+import zipfile
+from datetime import datetime, timedelta, timezone
+from flask import render_template
+from sqlalchemy import func, update
+from ..extensions import db
+from ..models import AuditResult, AuditResultEvent, BenchmarkSection, Check
+from .audit_sessions import RESULT_STATUSES
+from .history import result_log
+from .stats import record_result_changes
+
+BUNDLE_FORMAT = 1
+
+CHECK_FIELDS = [
+    'id', 'check_number', 'title', 'level', 'scored', 'section', 'description',
+    'audit_command', 'audit_steps', 'expected_output', 'remediation',
+]
+RESULT_FIELDS = ['check_id', 'status', 'finding', 'checked_at']
+
+
+def format_timestamp(value):
+    """ISO 8601 in UTC with a ``Z`` suffix; stored times are naive UTC."""
+    return value.strftime('%Y-%m-%dT%H:%M:%S.%fZ') if value else None
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 time to naive UTC; naive input is taken as UTC."""
+    if not isinstance(value, str):
+        raise ValueError(f'{value!r} is not an ISO 8601 time')
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def session_bundle_data(session):
+    """The JSON document of an offline bundle."""
+    benchmark = session.benchmark
+    sections = dict(
+        db.session.query(BenchmarkSection.id, BenchmarkSection.number + ' ' + BenchmarkSection.title)
+        .filter(BenchmarkSection.benchmark_id == session.benchmark_id)
+    )
+    checks = [
+        [row.id, row.check_number, row.title, row.level, row.scored, sections.get(row.section_id),
+         row.description, row.audit_command, row.audit_steps, row.expected_output, row.remediation]
+        for row in db.session.query(
+            Check.id, Check.check_number, Check.title, Check.level, Check.scored, Check.section_id,
+            Check.description, Check.audit_command, Check.audit_steps, Check.expected_output,
+            Check.remediation,
+        ).join(BenchmarkSection, Check.section_id == BenchmarkSection.id)
+        .filter(BenchmarkSection.benchmark_id == session.benchmark_id)
+        .order_by(BenchmarkSection.sort_order, Check.sort_order)
+    ]
+    results = [
+        [check_id, status, finding, format_timestamp(checked_at)]
+        for check_id, status, finding, checked_at in db.session.query(
+            AuditResult.check_id, AuditResult.status, AuditResult.finding, AuditResult.checked_at
+        ).filter(AuditResult.session_id == session.id)
+    ]
+    return {
+        'format': BUNDLE_FORMAT,
+        'exported_at': format_timestamp(_utcnow()),
+        'session': {
+            'id': session.id,
+            'target_name': session.target_name,
+            'target_ip': session.target_ip,
+            'status': session.status,
+            'benchmark': {
+                'id': benchmark.id, 'name': benchmark.name, 'version': benchmark.version,
+                'platform': benchmark.platform.name,
+            },
+        },
+        'statuses': list(RESULT_STATUSES),
+        'check_fields': CHECK_FIELDS,
+        'checks': checks,
+        'result_fields': RESULT_FIELDS,
+        'results': results,
+    }
+
+
+def build_offline_bundle(session):
+    """ZIP bytes of ``session.json`` and the offline ``index.html``."""
+    data = session_bundle_data(session)
+    document = json.dumps(data, separators=(',', ':'))
+    page = render_template('audits/offline.html', data=data)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('session.json', document)
+        archive.writestr('index.html', page)
+    return buffer.getvalue()
+
+
+def sync_results(session, changes, since=None, actor_id=None):
+    """Apply a batch of ``{check_id, status, finding, checked_at}`` changes.
+
+    Several changes to one check collapse to the latest. A change is applied
+    when it is newer than the server's result, and reported in ``conflicts``
+    when the server's result is newer and differs. Times in the future are
+    clamped to now. Runs in the caller's transaction with one executemany
+    UPDATE; the caller commits.
+
+    The server's time for a result is its ``checked_at`` (when it was
+    edited), or for a reset, which clears it, the time of its last event.
+
+    Returns a report with the counts, the conflicts and rejected entries,
+    ``server_changes`` (results changed after ``since``, which the client
+    has not seen) and ``synced_at`` to pass as ``since`` next time. Events
+    are written behind the request, so ``server_changes`` looks back one
+    flush interval before ``since`` and may repeat a change the client has.
+    """
+    now = _utcnow()
+    result_log.flush()  # this process's recent changes; other workers' lag one interval
+    changed = dict(db.session.query(
+        AuditResultEvent.check_id, func.max(AuditResultEvent.changed_at)
+    ).filter(AuditResultEvent.session_id == session.id).group_by(AuditResultEvent.check_id).all())
+    current = {
+        check_id: (result_id, status, finding, checked_at, changed.get(check_id))
+        for result_id, check_id, status, finding, checked_at in db.session.query(
+            AuditResult.id, AuditResult.check_id, AuditResult.status,
+            AuditResult.finding, AuditResult.checked_at,
+        ).filter(AuditResult.session_id == session.id)
+    }
+
+    latest, errors = {}, []
+    for index, entry in enumerate(changes):
+        if not isinstance(entry, dict):
+            errors.append((index, 'Entry must be an object.'))
+            continue
+        check_id = entry.get('check_id')
+        status = entry.get('status')
+        finding = entry.get('finding')
+        if check_id not in current:
+            errors.append((index, 'Unknown check.'))
+            continue
+        if status not in RESULT_STATUSES:
+            errors.append((index, f'Invalid status {status!r}.'))
+            continue
+        if finding is not None and not isinstance(finding, str):
+            errors.append((index, 'Finding must be text.'))
+            continue
+        try:
+            checked_at = min(parse_timestamp(entry.get('checked_at')), now)
+        except ValueError:
+            errors.append((index, f'Invalid checked_at {entry.get("checked_at")!r}.'))
+            continue
+        if check_id not in latest or checked_at >= latest[check_id][0]:
+            latest[check_id] = (checked_at, status, finding)
+
+    pending, conflicts, unchanged = [], [], 0
+    for check_id, (checked_at, status, finding) in latest.items():
+        result_id, old_status, old_finding, checked, changed_at = current[check_id]
+        server_at = checked or changed_at
+        if finding is None:
+            finding = old_finding
+        if status == old_status and finding == old_finding:
+            unchanged += 1
+        elif server_at is not None and server_at > checked_at:
+            conflicts.append({
+                'check_id': check_id,
+                'status': old_status,
+                'finding': old_finding,
+                'checked_at': format_timestamp(server_at),
+            })
+        else:
+            pending.append({
+                'id': result_id,
+                'status': status,
+                'finding': finding,
+                'checked_at': checked_at if status != 'not_checked' else None,
+                'old_status': old_status,
+                'check_id': check_id,
+            })
+
+    if pending:
+        db.session.execute(update(AuditResult), [
+            {key: values[key] for key in ('id', 'status', 'finding', 'checked_at')}
+            for values in pending
+        ])
+        record_result_changes(session, [
+            (values['check_id'], values['old_status'], values['status'], values['finding'])
+            for values in pending
+        ], 'sync', actor_id)
+
+    server_changes = []
+    if since is not None:
+        applied = {values['check_id'] for values in pending}
+        changed_since = since - timedelta(seconds=result_log.interval)
+        server_changes = [
+            {'check_id': check_id, 'status': status, 'finding': finding,
+             'checked_at': format_timestamp(checked or changed_at)}
+            for check_id, (_id, status, finding, checked, changed_at) in current.items()
+            if check_id not in applied and (
+                (checked is not None and checked > since)
+                or (changed_at is not None and changed_at > changed_since)
+            )
+        ]
+
+    return {
+        'applied': len(pending),
+        'unchanged': unchanged,
+        'conflicts': conflicts,
+        'errors': errors,
+        'server_changes': server_changes,
+        'synced_at': format_timestamp(now),
+    }
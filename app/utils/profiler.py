@@ -0,0 +1,372 @@
+"""On-demand sampling profiler for slow pages.
+
+An administrator arms the profiler from ``/admin/profiler`` for one endpoint,
+for the next N requests and/or a time window. The arming is written to
+``armed.json`` in ``PROFILER_DIR`` so every gunicorn worker sees it. Each
+process re-reads that file at most once per ``PROFILER_POLL_INTERVAL``, so a
+disarmed profiler costs a clock read per request and nothing else.
+
+A profiled request registers its thread with the process's sampler. The
+sampler is a daemon thread started on demand that reads the thread's stack
+from ``sys._current_frames()`` every ``PROFILER_INTERVAL_MS`` and exits when
+nothing is left to sample. The request is profiled until its response has
+been sent, so streamed pages and exports include the work done while
+streaming. Each request is written to its own file: collapsed stacks (for
+flamegraph.pl, speedscope or inferno) or a speedscope JSON profile.
+
+Requests are counted across workers: each profiled request claims a slot by
+creating ``<token>.<n>.claim`` exclusively, so N means N in total.
+"""
+import glob
+import itertools
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from functools import lru_cache
+from flask import g, request
+
+PROFILE_FORMATS = ('collapsed', 'speedscope')
+
+_ARMED_FILE = 'armed.json'
+_EXTENSIONS = {'collapsed': '.collapsed.txt', 'speedscope': '.speedscope.json'}
+
+
+class Arming:
+    """What to profile: ``requests`` requests to ``endpoint`` until ``until`` (epoch seconds)."""
+
+    __slots__ = ('token', 'endpoint', 'requests', 'until', 'format', 'armed_by')
+
+    def __init__(self, token, endpoint, requests, until, format, armed_by=None):
+        self.token = token
+        self.endpoint = endpoint
+        self.requests = requests
+        self.until = until
+        self.format = format
+        self.armed_by = armed_by
+
+    @property
+    def expires_at(self):
+        return datetime.fromtimestamp(self.until, timezone.utc)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RequestProfile:
+    """Stack samples of one request's thread."""
+
+    def __init__(self, label, thread_id, interval):
+        self.label = label
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()  # tuple of code objects, outermost first -> count
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self._lock = threading.Lock()
+
+    def add_sample(self, frame):
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        stack.reverse()
+        with self._lock:
+            if self.elapsed is None:
+                self.samples[tuple(stack)] += 1
+
+    def stop(self):
+        """Stop collecting; returns False if already stopped."""
+        with self._lock:
+            if self.elapsed is not None:
+                return False
+            self.elapsed = time.perf_counter() - self.started
+            return True
+
+
+class Sampler:
+    """Samples the stacks of this process's profiled request threads."""
+
+    def __init__(self):
+        self.interval = 0.005
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, profile):
+        with self._lock:
+            self._targets[profile.thread_id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='kenbu-profiler', daemon=True)
+                self._thread.start()
+
+    def remove(self, profile):
+        with self._lock:
+            if self._targets.get(profile.thread_id) is profile:
+                del self._targets[profile.thread_id]
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                targets = list(self._targets.values())
+            frames = sys._current_frames()
+            for profile in targets:
+                frame = frames.get(profile.thread_id)
+                if frame is not None:
+                    profile.add_sample(frame)
+            del frames
+
+
+class Profiler:
+    """This process's view of the shared arming and its sampler."""
+
+    def __init__(self):
+        self.directory = None
+        self.poll_interval = 1.0
+        self.max_requests = 50
+        self.max_seconds = 900
+        self.sampler = Sampler()
+        self._arming = None
+        self._mtime = None
+        self._next_poll = 0.0
+        self._exhausted = None  # token whose slots are all claimed
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def configure(self, directory, interval_ms, poll_interval, max_requests, max_seconds):
+        self.directory = directory
+        self.sampler.interval = interval_ms / 1000
+        self.poll_interval = poll_interval
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+
+    @property
+    def armed_path(self):
+        return os.path.join(self.directory, _ARMED_FILE)
+
+    # --- Arming ------------------------------------------------------------------
+
+    def arm(self, endpoint, requests=None, seconds=None, format='collapsed', armed_by=None):
+        """Arm every worker; ``requests`` and ``seconds`` are capped by the configured maximums."""
+        if format not in PROFILE_FORMATS:
+            raise ValueError(f'Unknown profile format: {format}')
+        requests = min(requests or self.max_requests, self.max_requests)
+        seconds = min(seconds or self.max_seconds, self.max_seconds)
+        if requests < 1 or seconds < 1:
+            raise ValueError('Requests and seconds must be positive.')
+
+        os.makedirs(self.directory, exist_ok=True)
+        for path in glob.glob(os.path.join(self.directory, '*.claim')):
+            _unlink(path)
+        arming = Arming(secrets.token_hex(4), endpoint, requests, time.time() + seconds, format, armed_by)
+        tmp_path = f'{self.armed_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(arming.as_dict(), f)
+        os.replace(tmp_path, self.armed_path)
+        self._next_poll = 0.0
+        return arming
+
+    def disarm(self):
+        _unlink(self.armed_path)
+        self._next_poll = 0.0
+
+    def current(self):
+        """The arming in force, or None; reads the shared file at most once per poll interval."""
+        now = time.monotonic()
+        if now >= self._next_poll:
+            with self._lock:
+                if now >= self._next_poll:
+                    self._poll()
+                    self._next_poll = now + self.poll_interval
+        arming = self._arming
+        if arming is None or time.time() >= arming.until:
+            return None
+        return arming
+
+    def claimed(self, arming):
+        """How many requests of ``arming`` have been profiled (or are being profiled)."""
+        return len(glob.glob(os.path.join(self.directory, f'{arming.token}.*.claim')))
+
+    def _poll(self):
+        try:
+            stat = os.stat(self.armed_path)
+        except (FileNotFoundError, TypeError):
+            self._arming = self._mtime = None
+            return
+        mtime = (stat.st_ino, stat.st_mtime_ns)
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.armed_path) as f:
+                self._arming = Arming(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            self._arming = None
+        self._mtime = mtime
+
+    def _claim(self, arming):
+        if self._exhausted == arming.token:
+            return False
+        for slot in range(arming.requests):
+            path = os.path.join(self.directory, f'{arming.token}.{slot}.claim')
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                continue
+            if slot == arming.requests - 1:
+                self.disarm()
+            return True
+        self._exhausted = arming.token
+        return False
+
+    # --- Requests ----------------------------------------------------------------
+
+    def start(self, label):
+        profile = RequestProfile(label, threading.get_ident(), self.sampler.interval)
+        self.sampler.add(profile)
+        return profile
+
+    def finish(self, profile, format, endpoint):
+        """Stop sampling ``profile`` and write it out; returns the file path."""
+        if not profile.stop():
+            return None
+        self.sampler.remove(profile)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        name = f'{endpoint}-{stamp}-{os.getpid()}-{next(self._sequence)}{_EXTENSIONS[format]}'
+        path = os.path.join(self.directory, name)
+        data = collapsed_stacks(profile) if format == 'collapsed' else speedscope_profile(profile)
+        with open(path, 'w') as f:
+            f.write(data)
+        return path
+
+    # --- Output files -------------------------------------------------------------
+
+    def profiles(self):
+        """Written profiles as ``(name, size, modified)``, newest first."""
+        entries = []
+        for extension in _EXTENSIONS.values():
+            for path in glob.glob(os.path.join(self.directory or '', f'*{extension}')):
+                stat = os.stat(path)
+                entries.append((os.path.basename(path), stat.st_size,
+                                datetime.fromtimestamp(stat.st_mtime, timezone.utc)))
+        return sorted(entries, key=lambda entry: entry[2], reverse=True)
+
+    def delete_profiles(self):
+        for name, _size, _modified in self.profiles():
+            _unlink(os.path.join(self.directory, name))
+
+
+profiler = Profiler()
+
+
+def collapsed_stacks(profile):
+    """One ``frame;frame;frame count`` line per distinct stack, outermost frame first."""
+    lines = []
+    for stack, count in profile.samples.most_common():
+        frames = [profile.label] + [frame_label(code).replace(';', ':') for code in stack]
+        lines.append(f"{';'.join(frames)} {count}\n")
+    return ''.join(lines)
+
+
+def speedscope_profile(profile):
+    """A speedscope "sampled" profile, one weighted sample per distinct stack."""
+    frames, index = [], {}
+    samples, weights = [], []
+    interval_ms = profile.interval * 1000
+    for stack, count in profile.samples.most_common():
+        sample = []
+        for code in stack:
+            if code not in index:
+                index[code] = len(frames)
+                frames.append({'name': frame_label(code), 'file': code.co_filename, 'line': code.co_firstlineno})
+            sample.append(index[code])
+        samples.append(sample)
+        weights.append(round(count * interval_ms, 3))
+    return json.dumps({
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': profile.label,
+        'exporter': 'kenbu',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': profile.label,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': round((profile.elapsed or 0) * 1000, 3),
+            'samples': samples,
+            'weights': weights,
+        }],
+    })
+
+
+@lru_cache(maxsize=4096)
+def frame_label(code):
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f'{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})'
+
+
+def _short_path(filename):
+    for marker in ('site-packages' + os.sep, 'dist-packages' + os.sep):
+        head, found, tail = filename.rpartition(marker)
+        if found:
+            return tail
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if filename.startswith(root + os.sep):
+        return os.path.relpath(filename, root)
+    return filename
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# --- Request hooks ----------------------------------------------------------------
+
+def _start_request_profile():
+    arming = profiler.current()
+    if arming is None or request.endpoint != arming.endpoint or not profiler._claim(arming):
+        return
+    g.request_profile = (profiler.start(f'{request.method} {request.path}'), arming.format)
+
+
+def _finish_on_close(response):
+    # A streamed body is generated after teardown; finish once it has been sent.
+    # Passthrough responses (send_file) never call their close callbacks, and
+    # everything else is complete by teardown.
+    if response.is_streamed and not response.direct_passthrough:
+        pending = g.pop('request_profile', None)
+        if pending is not None:
+            profile, format = pending
+            endpoint = request.endpoint
+            response.call_on_close(lambda: profiler.finish(profile, format, endpoint))
+    return response
+
+
+def _finish_on_teardown(exc):
+    pending = g.pop('request_profile', None)
+    if pending is not None:
+        profiler.finish(pending[0], pending[1], request.endpoint)
+
+
+def init_profiler(app):
+    """Configure the profiler and install its (nearly free when disarmed) request hooks."""
+    profiler.configure(
+        app.config.get('PROFILER_DIR') or os.path.join(app.instance_path, 'profiles'),
+        app.config['PROFILER_INTERVAL_MS'],
+        app.config['PROFILER_POLL_INTERVAL'],
+        app.config['PROFILER_MAX_REQUESTS'],
+        app.config['PROFILER_MAX_SECONDS'],
+    )
+    app.before_request(_start_request_profile)
+    app.after_request(_finish_on_close)
+    app.teardown_request(_finish_on_teardown)
@@ -0,0 +1,207 @@
+"""Related-checks index: the same control on other platforms.
+
+Built when the catalog is seeded. Each check's title, audit command and
+remediation are reduced to a set of hashed word and word-pair shingles,
+summarised by a MinHash signature of ``NUM_PERM`` values. The signatures are
+cut into ``BANDS`` bands and hashed into LSH buckets, so only checks sharing
+a bucket are compared. The work grows with the number of checks rather than
+their square.
+
+Candidates on different platforms are kept when their exact Jaccard
+similarity reaches ``SIMILARITY_THRESHOLD``. For each check the best match on
+every other platform is stored in ``related_checks``. Pairs are then merged,
+most similar first, into ``check_groups`` clusters that hold at most one check
+per platform. The clusters are used to collapse search results.
+
+Lookups are primary-key reads of those tables.
+"""
+import random
+import re
+import zlib
+from collections import defaultdict
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+from ..extensions import db
+from ..models import Benchmark, BenchmarkSection, Check, CheckGroup, RelatedCheck
+
+NUM_PERM = 60
+BANDS = 20  # of 3 rows: pairs of similarity 0.5 share a bucket 93% of the time, 0.2 only 15%
+SIMILARITY_THRESHOLD = 0.4
+
+# Buckets holding more checks than this are boilerplate shared by unrelated checks
+MAX_BUCKET_SIZE = 200
+
+_STOPWORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'be', 'by', 'ensure', 'for', 'if', 'in', 'is', 'it', 'not',
+    'of', 'on', 'or', 'set', 'that', 'the', 'to', 'with',
+))
+_TOKEN = re.compile(r'[a-z0-9_]+')
+# Shingles are 32-bit CRCs; XOR with a random mask permutes them. Not strictly
+# min-wise independent, but candidates are verified exactly and it is ~4x
+# cheaper than (a * x + b) mod p.
+_rng = random.Random(43)
+_MASKS = [_rng.getrandbits(32) for _ in range(NUM_PERM)]
+
+
+def shingles(*texts):
+    """Hashed word and adjacent-word-pair shingles of ``texts``."""
+    result = set()
+    for text in texts:
+        words = [word for word in _TOKEN.findall((text or '').lower()) if word not in _STOPWORDS]
+        result.update(zlib.crc32(word.encode()) for word in words)
+        result.update(zlib.crc32(f'{a} {b}'.encode()) for a, b in zip(words, words[1:]))
+    return result
+
+
+def minhash(shingle_set):
+    """MinHash signature of a shingle set (``NUM_PERM`` values)."""
+    if not shingle_set:
+        return None
+    values = list(shingle_set)
+    return tuple(min([value ^ mask for value in values]) for mask in _MASKS)
+
+
+def find_related(documents, threshold=SIMILARITY_THRESHOLD):
+    """Near-duplicate pairs among ``[(check_id, platform_id, shingle_set)]``.
+
+    Returns ``{(check_id, other_id): similarity}`` with ``check_id < other_id``,
+    for checks on different platforms.
+    """
+    rows = NUM_PERM // BANDS
+    platforms, sets, buckets = {}, {}, defaultdict(list)
+    for check_id, platform_id, shingle_set in documents:
+        signature = minhash(shingle_set)
+        if signature is None:
+            continue
+        platforms[check_id] = platform_id
+        sets[check_id] = shingle_set
+        for band in range(BANDS):
+            buckets[(band, signature[band * rows:(band + 1) * rows])].append(check_id)
+
+    pairs = {}
+    for members in buckets.values():
+        if len(members) < 2 or len(members) > MAX_BUCKET_SIZE:
+            continue
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                pair = (a, b) if a < b else (b, a)
+                if platforms[a] == platforms[b] or pair in pairs:
+                    continue
+                similarity = len(sets[a] & sets[b]) / len(sets[a] | sets[b])
+                pairs[pair] = similarity if similarity >= threshold else None
+    return {pair: similarity for pair, similarity in pairs.items() if similarity is not None}
+
+
+def best_per_platform(pairs, platforms):
+    """For each check, its most similar check on every other platform.
+
+    Returns ``{check_id: [(similarity, other_id)]}``, most similar first.
+    """
+    best = defaultdict(dict)
+    for (a, b), similarity in pairs.items():
+        for check_id, other in ((a, b), (b, a)):
+            current = best[check_id].get(platforms[other])
+            if current is None or similarity > current[0]:
+                best[check_id][platforms[other]] = (similarity, other)
+    return {check_id: sorted(by_platform.values(), reverse=True) for check_id, by_platform in best.items()}
+
+
+def group_related(pairs, platforms):
+    """Cluster checks, at most one per platform; returns ``{check_id: group_id}``.
+
+    Pairs are merged most similar first, so a check joins the cluster of its
+    closest match and weaker links never chain two controls together.
+    """
+    parent, members = {}, {}
+
+    def find(x):
+        if x not in parent:
+            parent[x], members[x] = x, {platforms[x]}
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for (a, b), _similarity in sorted(pairs.items(), key=lambda item: item[1], reverse=True):
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b or members[root_a] & members[root_b]:
+            continue
+        root, child = min(root_a, root_b), max(root_a, root_b)
+        parent[child] = root
+        members[root] |= members.pop(child)
+    return {check_id: find(check_id) for check_id in parent}
+
+
+def rebuild_related_checks():
+    """Recompute ``related_checks`` and ``check_groups`` from the catalog.
+
+    Runs inside ``writable_catalog``; the caller commits. Returns the number
+    of similar pairs and of groups.
+    """
+    RelatedCheck.query.delete()
+    CheckGroup.query.delete()
+
+    documents = [
+        (check_id, platform_id, shingles(title, audit_command, remediation))
+        for check_id, platform_id, title, audit_command, remediation in db.session.query(
+            Check.id, Benchmark.platform_id, Check.title, Check.audit_command, Check.remediation
+        ).join(BenchmarkSection, Check.section_id == BenchmarkSection.id)
+        .join(Benchmark, BenchmarkSection.benchmark_id == Benchmark.id)
+    ]
+    platforms = {check_id: platform_id for check_id, platform_id, _shingles in documents}
+    pairs = find_related(documents)
+
+    rows = [
+        {'check_id': check_id, 'related_id': other, 'similarity': round(similarity, 4)}
+        for check_id, matches in best_per_platform(pairs, platforms).items()
+        for similarity, other in matches
+    ]
+    if rows:
+        db.session.execute(insert(RelatedCheck), rows)
+
+    groups = group_related(pairs, platforms)
+    sizes = defaultdict(int)
+    for group_id in groups.values():
+        sizes[group_id] += 1
+    rows = [
+        {'check_id': check_id, 'group_id': group_id, 'size': sizes[group_id]}
+        for check_id, group_id in groups.items()
+        if sizes[group_id] > 1
+    ]
+    if rows:
+        db.session.execute(insert(CheckGroup), rows)
+    return len(pairs), sum(1 for size in sizes.values() if size > 1)
+
+
+def related_checks(check_id):
+    """The closest check on each other platform, most similar first."""
+    return (
+        RelatedCheck.query.filter_by(check_id=check_id)
+        .options(joinedload(RelatedCheck.related).joinedload(Check.section)
+                 .joinedload(BenchmarkSection.benchmark).joinedload(Benchmark.platform))
+        .order_by(RelatedCheck.similarity.desc())
+        .all()
+    )
+
+
+def collapse_related(checks):
+    """Fold checks of the same group into their first occurrence.
+
+    Returns ``[(check, others)]`` where ``others`` are the later checks of
+    the same group, in their original order.
+    """
+    groups = dict(
+        db.session.query(CheckGroup.check_id, CheckGroup.group_id)
+        .filter(CheckGroup.check_id.in_([check.id for check in checks]))
+    ) if checks else {}
+    collapsed, by_group = [], {}
+    for check in checks:
+        group_id = groups.get(check.id)
+        if group_id is not None and group_id in by_group:
+            by_group[group_id].append(check)
+            continue
+        others = []
+        if group_id is not None:
+            by_group[group_id] = others
+        collapsed.append((check, others))
+    return collapsed
@@ -0,0 +1,213 @@
+"""Per-session, per-section compliance rollups.
+
+Each session has one ``section_rollups`` row per section of its benchmark,
+counting the results of that section and all its subsections. The rows are
+created with the session and adjusted from ``utils.stats`` in the caller's
+transaction, so the session page and the audit export never scan
+``audit_results`` to break compliance down by section.
+
+A result change adds its delta to the check's own section and to each
+ancestor. The ancestor chain of every check is computed once per benchmark and
+process (the catalog is immutable at run time), so a change costs O(depth)
+counter updates. All the updates of a transaction go out as one executemany
+UPDATE.
+"""
+import threading
+from collections import defaultdict
+from sqlalchemy import bindparam, insert, update
+from ..extensions import db
+from ..models import AuditResult, AuditSession, BenchmarkSection, Check, SectionRollup
+
+# Weight of a scored check by level; checks that are not scored weigh nothing
+LEVEL_WEIGHTS = {1: 2, 2: 1}
+
+# Counters adjusted for a result with the given status (besides the weights)
+_STATUS_COUNTERS = {
+    'pass': 'passed',
+    'fail': 'failed',
+    'not_applicable': 'not_applicable',
+}
+_COUNTERS = ('checked', 'passed', 'failed', 'not_applicable', 'weight_checked', 'weight_passed')
+
+_layouts_lock = threading.Lock()
+_layouts = {}  # (catalog engine, benchmark_id) -> BenchmarkLayout
+
+
+class BenchmarkLayout:
+    """A benchmark's sections in depth-first order and each check's ancestor chain."""
+
+    def __init__(self, sections, checks):
+        self.sections = sections  # [(section_id, parent_id, number, title, depth)]
+        self.checks = checks  # {check_id: (weight, (section_id, parent_id, ...))}
+
+
+def check_weight(level, scored):
+    return LEVEL_WEIGHTS.get(level, 1) if scored else 0
+
+
+def benchmark_layout(benchmark_id):
+    """Return the cached ``BenchmarkLayout`` of a benchmark, loading it on first use."""
+    key = (db.session.get_bind(BenchmarkSection), benchmark_id)
+    layout = _layouts.get(key)
+    if layout is not None:
+        return layout
+
+    children, parents = defaultdict(list), {}
+    for section_id, parent_id, number, title, _sort_order in db.session.query(
+        BenchmarkSection.id, BenchmarkSection.parent_id, BenchmarkSection.number,
+        BenchmarkSection.title, BenchmarkSection.sort_order,
+    ).filter(BenchmarkSection.benchmark_id == benchmark_id).order_by(
+        BenchmarkSection.sort_order, BenchmarkSection.id
+    ):
+        children[parent_id].append((section_id, number, title))
+        parents[section_id] = parent_id
+
+    sections = []
+
+    def walk(parent_id, depth):
+        for section_id, number, title in children.get(parent_id, ()):
+            sections.append((section_id, parent_id, number, title, depth))
+            walk(section_id, depth + 1)
+    walk(None, 0)
+
+    chains = {}
+    for section_id, *_rest in sections:
+        chain, current = [], section_id
+        while current is not None:
+            chain.append(current)
+            current = parents.get(current)
+        chains[section_id] = tuple(chain)
+
+    checks = {
+        check_id: (check_weight(level, scored), chains[section_id])
+        for check_id, section_id, level, scored in db.session.query(
+            Check.id, Check.section_id, Check.level, Check.scored
+        ).join(BenchmarkSection, Check.section_id == BenchmarkSection.id)
+        .filter(BenchmarkSection.benchmark_id == benchmark_id)
+        if section_id in chains
+    }
+    layout = BenchmarkLayout(sections, checks)
+    with _layouts_lock:
+        return _layouts.setdefault(key, layout)
+
+
+def rollup_rows(session, statuses=None):
+    """The rollup rows of a session as dicts, in benchmark order.
+
+    ``statuses`` is ``{check_id: status}`` for sessions that already have
+    results; by default every result is ``not_checked``.
+    """
+    layout = benchmark_layout(session.benchmark_id)
+    rows = {
+        section_id: {
+            'session_id': session.id, 'section_id': section_id, 'parent_id': parent_id,
+            'number': number, 'title': title, 'depth': depth, 'position': position,
+            'total': 0, 'weight_total': 0, **dict.fromkeys(_COUNTERS, 0),
+        }
+        for position, (section_id, parent_id, number, title, depth) in enumerate(layout.sections)
+    }
+    for check_id, (weight, chain) in layout.checks.items():
+        deltas = _deltas(weight, None, (statuses or {}).get(check_id, 'not_checked'))
+        for section_id in chain:
+            row = rows[section_id]
+            row['total'] += 1
+            row['weight_total'] += weight
+            for column, delta in deltas.items():
+                row[column] += delta
+    return list(rows.values())
+
+
+def record_session(session, statuses=None):
+    """Insert the rollup rows of a session (see ``rollup_rows``)."""
+    rows = rollup_rows(session, statuses)
+    if rows:
+        db.session.execute(insert(SectionRollup), rows)
+
+
+def record_outcome_changes(session, changes):
+    """Apply ``(check_id, old_status, new_status)`` transitions to the section rollups."""
+    if not changes:
+        return
+    layout = benchmark_layout(session.benchmark_id)
+    totals = defaultdict(lambda: dict.fromkeys(_COUNTERS, 0))
+    for check_id, old_status, new_status in changes:
+        entry = layout.checks.get(check_id)
+        if entry is None:
+            continue
+        weight, chain = entry
+        deltas = _deltas(weight, old_status, new_status)
+        for section_id in chain:
+            section_totals = totals[section_id]
+            for column, delta in deltas.items():
+                section_totals[column] += delta
+
+    table = SectionRollup.__table__
+    statement = update(table).where(
+        table.c.session_id == bindparam('b_session_id'),
+        table.c.section_id == bindparam('b_section_id'),
+    ).values({column: table.c[column] + bindparam(f'd_{column}') for column in _COUNTERS})
+    rows = [
+        {'b_session_id': session.id, 'b_section_id': section_id,
+         **{f'd_{column}': delta for column, delta in section_totals.items()}}
+        for section_id, section_totals in totals.items()
+        if any(section_totals.values())
+    ]
+    if rows:
+        db.session.execute(statement, rows)
+
+
+def _deltas(weight, old_status, new_status):
+    deltas = {}
+    for status, sign in ((old_status, -1), (new_status, 1)):
+        if not status or status == 'not_checked':
+            continue
+        deltas['checked'] = deltas.get('checked', 0) + sign
+        deltas['weight_checked'] = deltas.get('weight_checked', 0) + sign * weight
+        column = _STATUS_COUNTERS.get(status)
+        if column:
+            deltas[column] = deltas.get(column, 0) + sign
+        if status == 'pass':
+            deltas['weight_passed'] = deltas.get('weight_passed', 0) + sign * weight
+    return {column: delta for column, delta in deltas.items() if delta}
+
+
+def session_sections(session, max_depth=None):
+    """The session's rollup rows in benchmark order, rebuilding them if missing.
+
+    ``max_depth=0`` returns only the top-level sections. Rows of archived
+    sessions are computed from the archive and not stored.
+    """
+    if session.status == 'archived':
+        from .archive import archived_statuses  # the archive module builds on this one
+        return [
+            SectionRollup(**row) for row in rollup_rows(session, archived_statuses(session.id))
+            if max_depth is None or row['depth'] <= max_depth
+        ]
+
+    query = SectionRollup.query.filter_by(session_id=session.id)
+    if max_depth is not None:
+        query = query.filter(SectionRollup.depth <= max_depth)
+    rows = query.order_by(SectionRollup.position).all()
+    if not rows and benchmark_layout(session.benchmark_id).sections:
+        _rebuild_session(session)
+        db.session.commit()
+        rows = query.order_by(SectionRollup.position).all()
+    return rows
+
+
+def _rebuild_session(session):
+    SectionRollup.query.filter_by(session_id=session.id).delete()
+    statuses = dict(db.session.query(AuditResult.check_id, AuditResult.status).filter(
+        AuditResult.session_id == session.id
+    ))
+    record_session(session, statuses)
+
+
+def rebuild_section_rollups():
+    """Recompute the rollups of every session from audit_results.
+
+    Only needed to backfill sessions created before the rollups existed.
+    Archived sessions have no rollup rows; they are computed when viewed.
+    """
+    for session in AuditSession.query.filter(AuditSession.status != 'archived'):
+        _rebuild_session(session)
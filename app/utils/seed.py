@@ -1,14 +1,12 @@
 import os
-import yaml
+import time
 from datetime import date
 from ..extensions import db
 from ..models import User, Platform, Benchmark, BenchmarkSection, Check
-
-
-def load_yaml(filepath):
-    """Load and parse a YAML file."""
-    with open(filepath, 'r') as f:
-        return yaml.safe_load(f)
+from .benchmark_files import benchmark_files, load_yaml, parse_benchmark_files
+from .catalog import writable_catalog
+from .related import rebuild_related_checks
+from .stats import rebuild_catalog_stats, rebuild_audit_stats
 
 
 def seed_users(data_dir):
@@ -39,9 +37,13 @@ def seed_users(data_dir):
 
 def seed_benchmark_file(filepath):
     """Load a single benchmark YAML file into the database."""
-    data = load_yaml(filepath)
+    [(_path, data)] = parse_benchmark_files([filepath], workers=1)
+    seed_benchmark(data, os.path.basename(filepath))
+
+
+def seed_benchmark(data, filename):
+    """Load a parsed, validated benchmark file into the database."""
     bench_data = data['benchmark']
-    filename = os.path.basename(filepath)
 
     # Find or create platform
     platform = Platform.query.filter_by(slug=bench_data['platform']).first()
@@ -194,23 +196,47 @@ def seed_platforms():
     db.session.commit()
 
 
-def seed_all(data_dir):
-    """Run all seed operations."""
-    print('Seeding platforms...')
-    seed_platforms()
+def seed_all(data_dir, workers=None):
+    """Run all seed operations.
+
+    Benchmark files are parsed and validated (in ``workers`` processes)
+    before anything is written; ``BenchmarkFileError`` lists every problem.
+    Catalog changes are written to a copy of the catalog database that
+    replaces the live file only once every benchmark has loaded.
+    """
+    benchmarks_dir = os.path.join(data_dir, 'benchmarks')
+    parsed = []
+    if os.path.exists(benchmarks_dir):
+        print('Parsing benchmark files...')
+        started = time.perf_counter()
+        paths = benchmark_files(benchmarks_dir)
+        parsed = parse_benchmark_files(paths, workers)
+        print(f'  Parsed {len(paths)} files in {time.perf_counter() - started:.2f}s')
 
     print('Seeding users...')
     seed_users(data_dir)
 
-    print('Seeding benchmarks...')
-    benchmarks_dir = os.path.join(data_dir, 'benchmarks')
-    if os.path.exists(benchmarks_dir):
-        for filename in sorted(os.listdir(benchmarks_dir)):
-            if filename.endswith('.yaml') or filename.endswith('.yml'):
-                filepath = os.path.join(benchmarks_dir, filename)
-                seed_benchmark_file(filepath)
-    else:
-        print('  No benchmarks directory found')
+    with writable_catalog():
+        print('Seeding platforms...')
+        seed_platforms()
+
+        print('Seeding benchmarks...')
+        if os.path.exists(benchmarks_dir):
+            for filepath, data in parsed:
+                seed_benchmark(data, os.path.basename(filepath))
+        else:
+            print('  No benchmarks directory found')
+
+        print('Rebuilding catalog statistics...')
+        rebuild_catalog_stats()
+
+        print('Indexing related checks...')
+        started = time.perf_counter()
+        pairs, groups = rebuild_related_checks()
+        print(f'  {pairs} related pairs in {groups} groups ({time.perf_counter() - started:.2f}s)')
+
+    print('Rebuilding audit statistics...')
+    rebuild_audit_stats()
 
     # Print summary
     print('\n--- Seed Summary ---')
@@ -0,0 +1,243 @@
+"""Maintenance of the precomputed statistics rollup tables.
+
+The dashboard reads only from these tables. Catalog rollups are rebuilt on
+seed; audit rollups (including the per-section ones of ``section_rollups``)
+are adjusted in the caller's transaction whenever a session is created, a
+result changes or a session is completed.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import case, func, update
+from ..extensions import db
+from . import analytics, section_rollups
+from .events import queue_result_events
+from .history import queue_result_history
+from ..models import (
+    Platform, Benchmark, BenchmarkSection, Check, AuditSession, AuditResult,
+    PlatformStats, BenchmarkStats, UserStats, SessionStats,
+)
+
+# Number of most recent sessions that feed a user's compliance rate
+RECENT_SESSIONS = 5
+
+# AuditResult.status -> SessionStats counter column
+_STATUS_COUNTERS = {
+    'pass': 'passed',
+    'fail': 'failed',
+    'not_applicable': 'not_applicable',
+}
+
+
+def rebuild_catalog_stats():
+    """Recompute per-platform and per-benchmark rollups from the catalog."""
+    BenchmarkStats.query.delete()
+    PlatformStats.query.delete()
+
+    section_counts = dict(
+        db.session.query(BenchmarkSection.benchmark_id, func.count(BenchmarkSection.id))
+        .group_by(BenchmarkSection.benchmark_id)
+    )
+    check_counts = {
+        row.benchmark_id: row
+        for row in db.session.query(
+            BenchmarkSection.benchmark_id,
+            func.count(Check.id).label('checks'),
+            func.sum(case((Check.scored.is_(True), 1), else_=0)).label('scored'),
+            func.sum(case((Check.level == 2, 1), else_=0)).label('level2'),
+        ).join(Check, Check.section_id == BenchmarkSection.id)
+        .group_by(BenchmarkSection.benchmark_id)
+    }
+
+    per_platform = {}
+    for benchmark in Benchmark.query.all():
+        counts = check_counts.get(benchmark.id)
+        stats = BenchmarkStats(
+            benchmark_id=benchmark.id,
+            platform_id=benchmark.platform_id,
+            section_count=section_counts.get(benchmark.id, 0),
+            check_count=counts.checks if counts else 0,
+            scored_count=(counts.scored or 0) if counts else 0,
+            level2_count=(counts.level2 or 0) if counts else 0,
+        )
+        db.session.add(stats)
+        totals = per_platform.setdefault(benchmark.platform_id, [0, 0])
+        totals[0] += 1
+        totals[1] += stats.check_count
+
+    for platform in Platform.query.all():
+        benchmark_count, check_count = per_platform.get(platform.id, (0, 0))
+        db.session.add(PlatformStats(
+            platform_id=platform.id,
+            name=platform.name,
+            slug=platform.slug,
+            os_family=platform.os_family,
+            benchmark_count=benchmark_count,
+            check_count=check_count,
+        ))
+
+    db.session.commit()
+
+
+def rebuild_audit_stats():
+    """Recompute every session and user rollup from audit_results.
+
+    Used on seed to backfill databases created before the rollup tables
+    existed; normal operation keeps them current incrementally. Archived
+    sessions have no results left to count and keep their rollup rows.
+    """
+    SessionStats.query.filter(SessionStats.status != 'archived').delete()
+    UserStats.query.delete()
+
+    for session in AuditSession.query.filter(AuditSession.status != 'archived'):
+        db.session.add(_new_session_stats(session))
+    db.session.flush()
+
+    user_ids = [row[0] for row in db.session.query(AuditSession.user_id).distinct()]
+    for user_id in user_ids:
+        _refresh_user_stats(user_id)
+
+    analytics.rebuild_analytics()
+    section_rollups.rebuild_section_rollups()
+    db.session.commit()
+
+
+def record_session_created(session, total):
+    """Add rollup rows for a freshly created session with ``total`` results."""
+    db.session.add(SessionStats(
+        session_id=session.id,
+        user_id=session.user_id,
+        benchmark_id=session.benchmark_id,
+        benchmark_name=session.benchmark.name,
+        target_name=session.target_name,
+        target_ip=session.target_ip,
+        status=session.status or 'in_progress',
+        started_at=session.started_at or datetime.now(timezone.utc),
+        total=total, checked=0, passed=0, failed=0, not_applicable=0,
+    ))
+    db.session.flush()
+    analytics.record_session(session)
+    section_rollups.record_session(session)
+    _refresh_user_stats(session.user_id)
+
+
+def record_result_changes(session, changes, source, actor_id=None):
+    """Apply result status transitions to the session and user rollups.
+
+    ``changes`` is an iterable of ``(check_id, old_status, new_status,
+    finding)``; ``source`` says where they came from (web, api, import,
+    collector, bundle) and ``actor_id`` defaults to the session's owner.
+    Once the caller commits, each change is added to the result history and
+    open live views of the session are notified.
+    """
+    changes = list(changes)
+    queue_result_events(db.session, session.id, [c[0] for c in changes])
+    queue_result_history(db.session, session, changes,
+                         actor_id if actor_id is not None else session.user_id, source)
+    changes = [c[:3] for c in changes if c[1] != c[2]]
+    _add_to_counters(_session_stats(session), changes)
+    analytics.record_outcome_changes(session, changes)
+    section_rollups.record_outcome_changes(session, changes)
+    db.session.flush()
+    _refresh_user_stats(session.user_id)
+
+
+def record_session_completed(session):
+    """Move a session from the open to the completed counters."""
+    stats = _session_stats(session)
+    stats.status = session.status
+    queue_result_events(db.session, session.id)
+    db.session.flush()
+    _refresh_user_stats(session.user_id)
+
+
+def record_session_archived(session):
+    """Follow a session into or out of the archive; archived sessions count as completed."""
+    stats = _session_stats(session)
+    stats.status = session.status
+    db.session.flush()
+    _refresh_user_stats(session.user_id)
+
+
+def _adjust(stats, status, delta):
+    if status and status != 'not_checked':
+        stats.checked += delta
+    column = _STATUS_COUNTERS.get(status)
+    if column:
+        setattr(stats, column, getattr(stats, column) + delta)
+
+
+def _add_to_counters(stats, changes):
+    """Add the deltas of ``(check_id, old_status, new_status)`` transitions to a rollup row.
+
+    The increment is done in SQL so concurrent changes to the same session
+    are not lost.
+    """
+    deltas = dict.fromkeys(('checked', *_STATUS_COUNTERS.values()), 0)
+    for _check_id, old_status, new_status in changes:
+        for status, delta in ((old_status, -1), (new_status, 1)):
+            if status and status != 'not_checked':
+                deltas['checked'] += delta
+            column = _STATUS_COUNTERS.get(status)
+            if column:
+                deltas[column] += delta
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = SessionStats.__table__
+    db.session.execute(update(table).where(table.c.session_id == stats.session_id).values(
+        {column: table.c[column] + delta for column, delta in deltas.items()}
+    ))
+    db.session.expire(stats, list(deltas))
+
+
+def _session_stats(session):
+    """Return the session's rollup row, rebuilding it if it is missing."""
+    stats = db.session.get(SessionStats, session.id)
+    if stats is None:
+        stats = _new_session_stats(session)
+        db.session.add(stats)
+        db.session.flush()
+    return stats
+
+
+def _new_session_stats(session):
+    stats = SessionStats(
+        session_id=session.id,
+        user_id=session.user_id,
+        benchmark_id=session.benchmark_id,
+        benchmark_name=session.benchmark.name,
+        target_name=session.target_name,
+        target_ip=session.target_ip,
+        status=session.status,
+        started_at=session.started_at,
+        total=0, checked=0, passed=0, failed=0, not_applicable=0,
+    )
+    rows = db.session.query(AuditResult.status, func.count(AuditResult.id)).filter(
+        AuditResult.session_id == session.id
+    ).group_by(AuditResult.status)
+    for status, count in rows:
+        stats.total += count
+        _adjust(stats, status, count)
+    return stats
+
+
+def _refresh_user_stats(user_id):
+    """Recompute one user's rollup from their session rollup rows."""
+    user_stats = db.session.get(UserStats, user_id)
+    if user_stats is None:
+        user_stats = UserStats(user_id=user_id)
+        db.session.add(user_stats)
+
+    counts = dict(
+        db.session.query(SessionStats.status, func.count(SessionStats.session_id))
+        .filter(SessionStats.user_id == user_id)
+        .group_by(SessionStats.status)
+    )
+    recent = SessionStats.query.filter_by(user_id=user_id).order_by(
+        SessionStats.started_at.desc()
+    ).limit(RECENT_SESSIONS).all()
+
+    user_stats.completed_sessions = counts.get('completed', 0) + counts.get('archived', 0)
+    user_stats.open_sessions = sum(counts.values()) - user_stats.completed_sessions
+    user_stats.recent_passed = sum(s.passed for s in recent)
+    user_stats.recent_checked = sum(s.checked for s in recent)
+    user_stats.updated_at = datetime.now(timezone.utc)
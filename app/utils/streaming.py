@@ -0,0 +1,61 @@
+"""Batched keyset cursors and NDJSON/CSV encoders for streamed responses.
+
+Each batch is a separate ``LIMIT`` query continuing after the last key of
+the previous one, so a dump of any size holds at most one batch in memory
+and never keeps a long-running read open against SQLite.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import tuple_
+
+# Rows fetched per keyset query
+STREAM_BATCH_SIZE = 1000
+
+
+def keyset_rows(query, keys, after=None, batch_size=STREAM_BATCH_SIZE):
+    """Yield rows of ``query`` ordered by ``keys``, starting after ``after``.
+
+    ``keys`` are the ordering columns (unique together, e.g. ``(id,)`` or
+    ``(checked_at, id)``); ``after`` is a tuple of their values.
+    """
+    names = [key.key for key in keys]
+    while True:
+        batch = query
+        if after is not None:
+            batch = batch.filter(tuple_(*keys) > tuple_(*after))
+        rows = batch.order_by(*keys).limit(batch_size).all()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        after = tuple(getattr(rows[-1], name) for name in names)
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def ndjson_lines(records):
+    """Encode dicts as newline-delimited JSON."""
+    for record in records:
+        yield json.dumps(record, default=_default, ensure_ascii=False) + '\n'
+
+
+def csv_lines(records, fields, flush_every=500):
+    """Encode dicts as CSV with a header row, flushing every ``flush_every`` rows."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for i, record in enumerate(records, 1):
+        writer.writerow({
+            key: value.isoformat() if isinstance(value, (datetime, date)) else value
+            for key, value in record.items()
+        })
+        if i % flush_every == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,94 @@
+"""Jinja set-up: persistent bytecode cache, render timing and streamed pages.
+
+Compiled templates are cached on disk in ``JINJA_BYTECODE_CACHE_DIR`` so
+workers (and restarts) load bytecode instead of recompiling the source.
+Large pages are sent with ``stream_page``, which flushes the rendered HTML
+in chunks as it is produced, so the browser starts receiving the page
+before the last row is rendered.
+"""
+import os
+import time
+from flask import Response, get_flashed_messages, stream_template
+from jinja2 import FileSystemBytecodeCache, Template, TemplateError
+from .instrumentation import record_template
+
+# Bytes of rendered HTML collected before a chunk is flushed to the client
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+class TimedTemplate(Template):
+    """Template that reports render times to the instrumentation counters."""
+
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            record_template(self.name, (time.perf_counter() - started) * 1000)
+
+    def generate(self, *args, **kwargs):
+        # Only time spent rendering counts, not time waiting on the client
+        elapsed, first_chunk = 0.0, None
+        chunks = super().generate(*args, **kwargs)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    elapsed += time.perf_counter() - started
+                    break
+                elapsed += time.perf_counter() - started
+                if first_chunk is None:
+                    first_chunk = elapsed
+                yield chunk
+        finally:
+            if first_chunk is None:
+                first_chunk = elapsed
+            record_template(self.name, elapsed * 1000, first_chunk_ms=first_chunk * 1000)
+
+
+def init_templates(app):
+    """Install the timed template class and the on-disk bytecode cache."""
+    cache_dir = app.config.get('JINJA_BYTECODE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_env.template_class = TimedTemplate
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+
+def precompile_templates(app):
+    """Load every template once, e.g. in the gunicorn master before forking."""
+    for name in app.jinja_env.list_templates():
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateError:
+            app.logger.exception('Template %s failed to compile', name)
+
+
+def stream_page(template_name, chunk_size=STREAM_CHUNK_SIZE, **context):
+    """Render a page as a streamed response, flushed every ``chunk_size`` bytes.
+
+    Queries made while rendering run as the page is sent, so load what the
+    page iterates over before calling this. Flashed messages are taken from
+    the session now, while the session cookie can still be updated.
+    """
+    get_flashed_messages()
+    return Response(_chunked(stream_template(template_name, **context), chunk_size),
+                    mimetype='text/html')
+
+
+def _chunked(pieces, chunk_size):
+    """Send the first piece at once, then batch pieces into ``chunk_size`` chunks."""
+    pieces = iter(pieces)
+    for piece in pieces:
+        yield piece
+        break
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,519 @@
+"""Import official XCCDF benchmark content (CIS, DISA STIG, SCAP data streams).
+
+Files are read with ``xml.etree.ElementTree.iterparse`` and every element is
+dropped from the tree as soon as it has been used, so memory stays flat
+however large the file is. Data stream collections (``*-ds.xml``) are
+handled too; their OVAL and CPE components are skipped as they stream by.
+Zip bundles are searched for XCCDF members, including zips nested inside.
+
+Mapping onto the catalog:
+
+- ``Benchmark`` -> ``Benchmark`` (title, version, status date, description)
+- ``Group`` -> ``BenchmarkSection``, nested as in the file. A top-level
+  group holding a single rule, which is how STIG content wraps each
+  vulnerability, is not a section: its rule goes into a section per
+  severity (CAT I/II/III) and is numbered by the group id (``V-230221``).
+  This only applies when the group id is a vulnerability id or the rule
+  has no CIS number, so a CIS section with one rule stays a section.
+- ``Rule`` -> ``Check``: description, rationale, ``fixtext`` as remediation,
+  ``check-content`` as audit steps, idents and references as references.
+  CIS profile selections decide the level; ``role="unscored"`` rules and
+  ``(Manual)`` titles are not scored.
+
+Rows get their ids up front and are inserted with executemany batches of
+``XCCDF_BATCH_SIZE`` rows, in the session of ``writable_catalog``.
+"""
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import date
+from xml.etree.ElementTree import iterparse
+from sqlalchemy import func, insert
+from ..extensions import db
+from ..models import Benchmark, BenchmarkSection, Check, Platform
+
+# Rows per executemany insert
+XCCDF_BATCH_SIZE = 1000
+
+# (vendor, product, version prefix) of a CPE name -> platform slug
+CPE_PLATFORMS = [
+    ('debian', 'debian_linux', '12', 'debian-12'),
+    ('canonical', 'ubuntu_linux', '24.04', 'ubuntu-2404'),
+    ('microsoft', 'windows_server_2022', '', 'windows-2022'),
+    ('redhat', 'enterprise_linux', '9', 'rhel-9'),
+    ('centos', 'centos', '7', 'centos-7'),
+    ('amazon', 'amazon_linux', '2023', 'amazon-linux-2023'),
+    ('apple', 'macos', '14', 'macos-sonoma'),
+    ('apple', 'mac_os_x', '14', 'macos-sonoma'),
+    ('cisco', 'ios', '17', 'cisco-ios-17'),
+    ('cisco', 'ios_xe', '17', 'cisco-ios-17'),
+]
+
+_SEVERITY_SECTIONS = {
+    'high': ('CAT I', 'CAT I - High Severity', 0),
+    'medium': ('CAT II', 'CAT II - Medium Severity', 1),
+    'low': ('CAT III', 'CAT III - Low Severity', 2),
+}
+_OTHER_SECTION = ('Other', 'Unrated Severity', 3)
+
+_NUMBER = re.compile(r'(?:^|_)(?:group|rule)_((?:\d+\.)*\d+)(?:_|$)')
+_LEVEL = re.compile(r'level[\s_-]*([12])', re.IGNORECASE)
+_VULNERABILITY_ID = re.compile(r'^V-\d+$')
+_PREFIX = re.compile(r'^xccdf_[^_]+_(?:benchmark|group|rule|profile|value)_')
+_VULN_DISCUSSION = re.compile(r'<VulnDiscussion>(.*?)</VulnDiscussion>', re.DOTALL)
+
+# Benchmark children read for the header; everything else is dropped as it ends
+_HEADER = ('title', 'description', 'version', 'status', 'reference', 'platform')
+_ITEMS = ('Group', 'Rule')
+
+
+class XCCDFError(ValueError):
+    """Raised when a file holds no importable XCCDF benchmark."""
+
+
+# --- Parsing -----------------------------------------------------------------------
+
+def iter_xccdf(source):
+    """Stream the benchmarks of an XCCDF document as ``(kind, record)`` pairs.
+
+    ``source`` is a path or binary file. Kinds, in document order:
+    ``benchmark`` (header fields), ``section`` (``key``, ``parent_key``,
+    ``number``, ``title``, ``description``, ``sort_order``) and ``check``
+    (``section_key`` plus the ``Check`` columns). A section always comes
+    before its subsections and checks.
+    """
+    stack = []  # open elements, outermost first
+    parser = None
+    for event, elem in iterparse(source, events=('start', 'end')):
+        tag = _local(elem.tag)
+        if event == 'start':
+            if tag == 'Benchmark' and _is_xccdf(elem.tag):
+                parser = _BenchmarkParser(elem)
+            elif parser is not None and tag in _ITEMS and parser.is_container(stack[-1]):
+                yield from parser.start_item(elem, stack[-1])
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if parser is not None:
+            if elem is parser.benchmark:
+                yield from parser.finish()
+                parser = None
+            elif parser.is_container(parent):
+                yield from parser.end_child(elem, tag, parent)
+                if parser.keeps(tag, parent):
+                    continue
+            else:
+                continue  # inside an item or profile; read when that ends
+        if parent is not None:
+            parent.remove(elem)
+        elem.clear()
+
+
+class _Section:
+    """A Group being read; its section is emitted once its title is known and it is needed."""
+
+    def __init__(self, key, parent):
+        self.key = key
+        self.parent = parent  # _Section, or None at the top level
+        self.number = None
+        self.opened = False
+        self.pending = []  # rules read before the section was emitted
+        self.subgroups = 0
+        self.children = 0  # subsections emitted
+        self.checks = 0
+
+
+class _BenchmarkParser:
+    def __init__(self, benchmark):
+        self.benchmark = benchmark
+        self.started = False
+        self.levels = {}  # rule id -> lowest CIS level of a profile selecting it
+        self.sections = {}  # Group element -> _Section
+        self.top_sections = 0
+        self.severity_sections = {}  # severity section number -> checks so far
+
+    def is_container(self, elem):
+        return elem is self.benchmark or elem in self.sections
+
+    def keeps(self, tag, parent):
+        """Whether a finished child must stay in the tree until its parent is read."""
+        if parent is self.benchmark:
+            return tag in _HEADER and not self.started
+        return tag in ('title', 'description') and not self.sections[parent].opened
+
+    def start_item(self, elem, parent):
+        yield from self.start()
+        if _local(elem.tag) != 'Group':
+            return  # rules are read when they end
+        section = self.sections.get(parent)
+        if section is not None:
+            yield from self.open(section, parent)  # a subsection needs its parent's id
+            section.subgroups += 1
+        self.sections[elem] = _Section(elem.get('id'), section)
+
+    def start(self):
+        if not self.started:
+            self.started = True
+            yield 'benchmark', self.header()
+
+    def header(self):
+        fields = {'name': None, 'version': '', 'release_date': None, 'description': '', 'url': '', 'cpes': []}
+        for child in list(self.benchmark):
+            tag = _local(child.tag)
+            if tag == 'title' and fields['name'] is None:
+                fields['name'] = _text(child)
+            elif tag == 'description' and not fields['description']:
+                fields['description'] = _text(child)
+            elif tag == 'version':
+                fields['version'] = _text(child)
+            elif tag == 'status' and child.get('date'):
+                try:
+                    fields['release_date'] = date.fromisoformat(child.get('date')[:10])
+                except ValueError:
+                    pass
+            elif tag == 'reference' and not fields['url']:
+                fields['url'] = child.get('href') or ''
+            elif tag == 'platform' and child.get('idref'):
+                fields['cpes'].append(child.get('idref'))
+            if tag in _HEADER:
+                self.benchmark.remove(child)
+        fields['name'] = fields['name'] or _short_id(self.benchmark.get('id')) or 'XCCDF benchmark'
+        return fields
+
+    def open(self, section, elem):
+        """Emit ``section`` if it has not been emitted yet; its parent already has been."""
+        if section.opened:
+            return
+        section.opened = True
+        title = description = ''
+        for child in list(elem):
+            tag = _local(child.tag)
+            if tag == 'title' and not title:
+                title = _text(child)
+            elif tag == 'description' and not description:
+                description = _text(child)
+            if tag not in _ITEMS:
+                elem.remove(child)
+
+        if section.parent is None:
+            sort_order = self.top_sections
+            self.top_sections += 1
+        else:
+            sort_order = section.parent.children
+            section.parent.children += 1
+        section.number = _number(section.key) or (
+            f'{section.parent.number}.{sort_order + 1}' if section.parent else str(sort_order + 1)
+        )
+        yield 'section', {
+            'key': section.key,
+            'parent_key': section.parent.key if section.parent else None,
+            'number': section.number[:20],
+            'title': (title or _short_id(section.key) or section.number)[:200],
+            'description': description,
+            'sort_order': sort_order,
+        }
+        pending, section.pending = section.pending, []
+        for rule in pending:
+            yield self.check(section.key, rule, _number(rule['id']) or self._next_number(section))
+
+    def end_child(self, elem, tag, parent):
+        if tag == 'Profile':
+            self.read_profile(elem)
+        elif tag == 'Rule':
+            yield from self.start()
+            rule = _rule(elem)
+            section = self.sections.get(parent)
+            if section is None:  # a rule directly under the benchmark
+                yield from self.severity_check(rule, _short_id(rule['id']))
+            elif section.opened:
+                yield self.check(section.key, rule, _number(rule['id']) or self._next_number(section))
+            else:
+                section.pending.append(rule)
+        elif tag == 'Group':
+            section = self.sections.pop(elem)
+            if section.opened:
+                return
+            if self.is_vulnerability(section):
+                yield from self.severity_check(section.pending[0], _short_id(section.key))
+            else:
+                yield from self.open(section, elem)
+
+    @staticmethod
+    def is_vulnerability(section):
+        """Whether a group is a STIG wrapper around one vulnerability's rule."""
+        if section.parent is not None or section.subgroups or len(section.pending) != 1:
+            return False
+        return bool(_VULNERABILITY_ID.match(_short_id(section.key))) or _number(section.pending[0]['id']) is None
+
+    def severity_check(self, rule, number):
+        """Emit a STIG-style rule into the section of its severity."""
+        section_number, title, sort_order = _SEVERITY_SECTIONS.get(rule['severity'], _OTHER_SECTION)
+        key = f'severity:{section_number}'
+        if section_number not in self.severity_sections:
+            self.severity_sections[section_number] = 0
+            yield 'section', {
+                'key': key, 'parent_key': None, 'number': section_number, 'title': title,
+                'description': '', 'sort_order': self.top_sections + sort_order,
+            }
+        self.severity_sections[section_number] += 1
+        yield self.check(key, rule, number)
+
+    def check(self, section_key, rule, number):
+        return 'check', {
+            'section_key': section_key,
+            'check_number': number[:20],
+            'title': rule['title'][:300],
+            'description': rule['description'],
+            'rationale': rule['rationale'],
+            'level': self.levels.get(rule['id'], 1),
+            'scored': rule['scored'],
+            'audit_command': '',
+            'audit_steps': rule['check'],
+            'expected_output': '',
+            'remediation': rule['fixtext'],
+            'references': '\n'.join(rule['references']),
+        }
+
+    def read_profile(self, profile):
+        title = ''.join(_text(child) for child in profile if _local(child.tag) == 'title')
+        match = _LEVEL.search(title) or _LEVEL.search(profile.get('id', ''))
+        if not match:
+            return
+        level = int(match.group(1))
+        for child in profile:
+            if _local(child.tag) == 'select' and child.get('selected') == 'true':
+                rule_id = child.get('idref')
+                self.levels[rule_id] = min(level, self.levels.get(rule_id, level))
+
+    def finish(self):
+        yield from self.start()
+
+    @staticmethod
+    def _next_number(section):
+        section.checks += 1
+        return f'{section.number}.{section.checks}'
+
+
+def _rule(elem):
+    rule = {
+        'id': elem.get('id', ''), 'severity': elem.get('severity', ''),
+        'title': '', 'description': '', 'rationale': '', 'fixtext': '', 'check': '',
+    }
+    version, idents, references = '', [], []
+    for child in elem:
+        tag = _local(child.tag)
+        if tag == 'title' and not rule['title']:
+            rule['title'] = _text(child)
+        elif tag == 'description' and not rule['description']:
+            rule['description'] = _description(_text(child))
+        elif tag == 'rationale' and not rule['rationale']:
+            rule['rationale'] = _text(child)
+        elif tag == 'fixtext' and not rule['fixtext']:
+            rule['fixtext'] = _text(child)
+        elif tag == 'version':
+            version = _text(child)
+        elif tag == 'ident' and _text(child):
+            idents.append(_text(child))
+        elif tag == 'reference' and (child.get('href') or _text(child)):
+            references.append(child.get('href') or _text(child))
+        elif tag == 'check' and not rule['check']:
+            rule['check'] = '\n'.join(
+                _text(content) for content in child if _local(content.tag) == 'check-content'
+            )
+    rule['references'] = ([f'STIG ID: {version}'] if version else []) + idents + references
+    rule['scored'] = (
+        elem.get('role', 'full') not in ('unscored', 'unchecked')
+        and not rule['title'].endswith('(Manual)')
+    )
+    rule['title'] = rule['title'] or _short_id(rule['id'])
+    return rule
+
+
+def _description(text):
+    """The vulnerability discussion of STIG descriptions, which embed pseudo-XML."""
+    match = _VULN_DISCUSSION.search(text)
+    return match.group(1).strip() if match else text
+
+
+def _text(elem):
+    """Text content of an element, including XHTML markup, with whitespace tidied."""
+    lines = ''.join(elem.itertext()).strip().splitlines()
+    return '\n'.join(line.strip() for line in lines)
+
+
+def _number(identifier):
+    """The CIS number in an id such as ``xccdf_org.cisecurity.benchmarks_rule_1.1.2``."""
+    match = _NUMBER.search(identifier or '')
+    return match.group(1) if match else None
+
+
+def _short_id(identifier):
+    """An id without its XCCDF 1.2 ``xccdf_<owner>_<type>_`` prefix."""
+    return _PREFIX.sub('', identifier or '')
+
+
+def _local(tag):
+    return tag.rpartition('}')[2] if isinstance(tag, str) else ''
+
+
+def _is_xccdf(tag):
+    return '/xccdf' in tag or tag == 'Benchmark'
+
+
+def platform_for_cpes(cpes):
+    """The slug of the first known platform among CPE names, or None."""
+    for cpe in cpes:
+        parts = cpe.split(':')
+        # cpe:/o:vendor:product:version or cpe:2.3:o:vendor:product:version
+        fields = parts[3:6] if len(parts) > 1 and parts[1] == '2.3' else parts[2:5]
+        vendor, product, version = (fields + ['', '', ''])[:3]
+        for known_vendor, known_product, known_version, slug in CPE_PLATFORMS:
+            if (vendor, product) == (known_vendor, known_product) and version.startswith(known_version):
+                return slug
+    return None
+
+
+# --- Sources -------------------------------------------------------------------------
+
+def xccdf_sources(path):
+    """Yield ``(name, binary file)`` for each XCCDF document in a file or zip bundle."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            yield from _zip_sources(archive, os.path.basename(path))
+    else:
+        with open(path, 'rb') as f:
+            yield os.path.basename(path), f
+
+
+def _zip_sources(archive, name):
+    for info in archive.infolist():
+        member = info.filename.lower()
+        if member.endswith('.zip'):
+            with archive.open(info) as inner, tempfile.TemporaryFile() as spool:
+                shutil.copyfileobj(inner, spool)
+                spool.seek(0)
+                with zipfile.ZipFile(spool) as nested:
+                    yield from _zip_sources(nested, f'{name}/{info.filename}')
+        elif member.endswith('.xml') and ('xccdf' in member or member.endswith('-ds.xml')):
+            with archive.open(info) as f:
+                yield f'{name}/{info.filename}', f
+
+
+# --- Importing -----------------------------------------------------------------------
+
+def import_xccdf(path, platform_slug=None, batch_size=XCCDF_BATCH_SIZE):
+    """Import every benchmark in an XCCDF file or zip bundle.
+
+    Call inside ``writable_catalog()``. Benchmarks that already exist (same
+    name and version) are skipped. Returns a list of per-benchmark reports.
+    """
+    reports = []
+    for name, source in xccdf_sources(path):
+        reports.extend(_import_source(name, source, platform_slug, batch_size))
+    if not reports:
+        raise XCCDFError(f'No XCCDF benchmark found in {os.path.basename(path)}.')
+    return reports
+
+
+def _import_source(name, source, platform_slug, batch_size):
+    reports = []
+    writer = None
+    try:
+        for kind, record in iter_xccdf(source):
+            if kind == 'benchmark':
+                if writer is not None:
+                    reports.append(writer.finish())
+                writer = _BenchmarkWriter(name, record, platform_slug, batch_size)
+            elif writer is not None:
+                writer.add(kind, record)
+    except SyntaxError as exc:  # ElementTree's ParseError
+        raise XCCDFError(f'{name}: {exc}') from None
+    if writer is not None:
+        reports.append(writer.finish())
+    return reports
+
+
+class _BenchmarkWriter:
+    """Buffers the rows of one benchmark and inserts them in batches."""
+
+    def __init__(self, source, header, platform_slug, batch_size):
+        self.started = time.perf_counter()
+        self.batch_size = batch_size
+        self.report = {
+            'source': source, 'name': header['name'], 'version': header['version'][:20],
+            'sections': 0, 'checks': 0, 'skipped': None,
+        }
+        slug = platform_slug or platform_for_cpes(header['cpes'])
+        platform = Platform.query.filter_by(slug=slug).first() if slug else None
+        if platform is None:
+            self.benchmark_id = None
+            self.report['skipped'] = (
+                f'platform {slug} not found' if slug else 'no known platform; pass --platform'
+            )
+            return
+        if Benchmark.query.filter_by(name=header['name'], version=self.report['version']).first():
+            self.benchmark_id = None
+            self.report['skipped'] = 'already imported'
+            return
+
+        benchmark = Benchmark(
+            name=header['name'][:200],
+            version=self.report['version'],
+            platform_id=platform.id,
+            release_date=header['release_date'],
+            description=header['description'],
+            url=header['url'][:500],
+        )
+        db.session.add(benchmark)
+        db.session.flush()
+        self.benchmark_id = benchmark.id
+        self.next_section_id = (db.session.query(func.max(BenchmarkSection.id)).scalar() or 0) + 1
+        self.next_check_id = (db.session.query(func.max(Check.id)).scalar() or 0) + 1
+        self.section_ids = {}
+        self.sections = []
+        self.checks = []
+
+    def add(self, kind, record):
+        if self.benchmark_id is None:
+            return
+        if kind == 'section':
+            section_id = self.section_ids[record['key']] = self.next_section_id
+            self.next_section_id += 1
+            self.sections.append({
+                'id': section_id,
+                'benchmark_id': self.benchmark_id,
+                'parent_id': self.section_ids.get(record['parent_key']),
+                'number': record['number'],
+                'title': record['title'],
+                'description': record['description'],
+                'sort_order': record['sort_order'],
+            })
+            self.report['sections'] += 1
+        else:
+            row = dict(record, id=self.next_check_id, section_id=self.section_ids[record['section_key']])
+            del row['section_key']
+            self.next_check_id += 1
+            self.checks.append(row)
+            self.report['checks'] += 1
+        if len(self.sections) + len(self.checks) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Sections first: checks reference them
+        if self.sections:
+            db.session.execute(insert(BenchmarkSection), self.sections)
+            self.sections = []
+        if self.checks:
+            db.session.execute(insert(Check), self.checks)
+            self.checks = []
+
+    def finish(self):
+        if self.benchmark_id is not None:
+            self.flush()
+        self.report['seconds'] = time.perf_counter() - self.started
+        return self.report
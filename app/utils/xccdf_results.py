@@ -0,0 +1,212 @@
+"""Audit results as XCCDF 1.2 TestResult and ARF 1.1 documents.
+
+GRC tools ingest assessment results as an XCCDF ``TestResult`` or as an
+Asset Reporting Format collection (one ``TestResult`` report per session,
+each linked to an asset for its target). Both are written with
+``XMLGenerator`` and returned as generators of text chunks, so a route can
+stream them into the response. Sessions and their results are read with
+batched keyset cursors (``keyset_rows``), so the export holds one batch of
+rows and one chunk of XML at a time whatever the number of sessions.
+
+Rule ids are ``xccdf_<XCCDF_OWNER>_rule_<check number>``. The score is
+the flat model over scored checks: one point per pass, out of the checks
+that passed or failed.
+"""
+import io
+import re
+from datetime import datetime, timezone
+from xml.sax.saxutils import XMLGenerator
+from ..extensions import db
+from ..models import AuditResult, AuditSession, Check
+from .archive import load_archive
+from .offline import format_timestamp
+from .streaming import keyset_rows
+
+XCCDF_NS = 'http://checklists.nist.gov/xccdf/1.2'
+ARF_NS = 'http://scap.nist.gov/schema/asset-reporting-format/1.1'
+CORE_NS = 'http://scap.nist.gov/schema/reporting-core/1.1'
+AI_NS = 'http://scap.nist.gov/schema/asset-identification/1.1'
+ARF_RELATIONSHIPS = 'http://scap.nist.gov/specifications/arf/vocabulary/relationships/1.0#'
+
+# Reverse-DNS owner part of the XCCDF 1.2 ids written here
+XCCDF_OWNER = 'org.kenbu'
+TEST_SYSTEM = 'cpe:/a:kenbu:kenbu'
+
+# Kenbu status -> XCCDF rule-result value
+RESULT_VALUES = {
+    'pass': 'pass',
+    'fail': 'fail',
+    'not_applicable': 'notapplicable',
+    'not_checked': 'notchecked',
+}
+
+# Characters XML 1.0 does not allow (control characters such as the ESC of
+# ANSI colour codes copied from collector output), removed from text and attributes
+_INVALID_XML = re.compile('[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+
+# Characters of XML gathered before a chunk is handed to the response
+FLUSH_SIZE = 64 * 1024
+
+
+class _XMLStream:
+    """An ``XMLGenerator`` writing into a buffer that is drained in chunks."""
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.xml = XMLGenerator(self.buffer, encoding='utf-8', short_empty_elements=True)
+
+    def start(self, name, attrs=None):
+        self.xml.startElement(name, {k: xml_text(v) for k, v in (attrs or {}).items() if v is not None})
+
+    def end(self, name):
+        self.xml.endElement(name)
+
+    def element(self, name, text=None, attrs=None):
+        self.start(name, attrs)
+        if text:
+            self.xml.characters(xml_text(text))
+        self.end(name)
+
+    def drain(self, force=False):
+        """The XML written since the last drain, once there is enough of it (or ``force``)."""
+        if not force and self.buffer.tell() < FLUSH_SIZE:
+            return None
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+def xml_text(value):
+    """``value`` without the characters XML 1.0 cannot hold."""
+    return _INVALID_XML.sub('', str(value))
+
+
+def rule_id(check_number):
+    return f"xccdf_{XCCDF_OWNER}_rule_{check_number.replace(' ', '_')}"
+
+
+def test_result_document(session):
+    """Stream one session as an XCCDF 1.2 document with a ``TestResult`` root."""
+    out = _XMLStream()
+    out.xml.startDocument()
+    yield from _test_result(out, session, {'xmlns': XCCDF_NS})
+    out.xml.endDocument()
+    yield out.drain(force=True)
+
+
+def arf_document(sessions):
+    """Stream the sessions of a ``AuditSession`` query as an ARF report collection.
+
+    The query is read three times in id order (relationships, assets,
+    reports), each time in keyset batches.
+    """
+    targets = sessions.with_entities(AuditSession.id, AuditSession.target_name, AuditSession.target_ip)
+    out = _XMLStream()
+    out.xml.startDocument()
+    out.start('arf:asset-report-collection', {
+        'xmlns:arf': ARF_NS, 'xmlns:core': CORE_NS, 'xmlns:ai': AI_NS,
+        'xmlns:arfrel': ARF_RELATIONSHIPS,
+    })
+
+    out.start('core:relationships')
+    for row in keyset_rows(targets, (AuditSession.id,)):
+        out.start('core:relationship', {'type': 'arfrel:isAbout', 'subject': f'xccdf{row.id}'})
+        out.element('core:ref', f'asset{row.id}')
+        out.end('core:relationship')
+        yield from _chunk(out)
+    out.end('core:relationships')
+
+    out.start('arf:assets')
+    for row in keyset_rows(targets, (AuditSession.id,)):
+        out.start('arf:asset', {'id': f'asset{row.id}'})
+        out.start('ai:computing-device')
+        if row.target_ip:
+            out.start('ai:connections')
+            out.start('ai:connection')
+            out.start('ai:ip-address')
+            out.element('ai:ip-v6' if ':' in row.target_ip else 'ai:ip-v4', row.target_ip)
+            out.end('ai:ip-address')
+            out.end('ai:connection')
+            out.end('ai:connections')
+        out.element('ai:hostname', row.target_name)
+        out.end('ai:computing-device')
+        out.end('arf:asset')
+        yield from _chunk(out)
+    out.end('arf:assets')
+
+    out.start('arf:reports')
+    for session in keyset_rows(sessions, (AuditSession.id,)):
+        out.start('arf:report', {'id': f'xccdf{session.id}'})
+        out.start('arf:content')
+        yield from _test_result(out, session, {'xmlns': XCCDF_NS})
+        out.end('arf:content')
+        out.end('arf:report')
+    out.end('arf:reports')
+
+    out.end('arf:asset-report-collection')
+    out.xml.endDocument()
+    yield out.drain(force=True)
+
+
+def _test_result(out, session, attrs):
+    benchmark = session.benchmark
+    benchmark_id = f'xccdf_{XCCDF_OWNER}_benchmark_{benchmark.id}'
+    out.start('TestResult', dict(
+        attrs,
+        id=f'xccdf_{XCCDF_OWNER}_testresult_{session.id}',
+        **{
+            'start-time': format_timestamp(session.started_at),
+            'end-time': format_timestamp(session.completed_at or datetime.now(timezone.utc)),
+            'version': benchmark.version,
+            'test-system': TEST_SYSTEM,
+        },
+    ))
+    out.element('benchmark', attrs={'href': f'#{benchmark_id}', 'id': benchmark_id})
+    out.element('title', f'{benchmark.name} v{benchmark.version}: {session.target_name}')
+    if session.notes:
+        out.element('remark', session.notes)
+    out.element('identity', session.auditor.username, {'authenticated': 'true', 'privileged': 'false'})
+    out.element('target', session.target_name)
+    if session.target_ip:
+        out.element('target-address', session.target_ip)
+
+    passed = possible = 0
+    for check_number, scored, status, finding, checked_at in _session_results(session):
+        out.start('rule-result', {
+            'idref': rule_id(check_number),
+            'role': None if scored else 'unscored',
+            'time': format_timestamp(checked_at),
+        })
+        out.element('result', RESULT_VALUES.get(status, 'unknown'))
+        if finding:
+            out.element('message', finding, {'severity': 'info'})
+        out.end('rule-result')
+        if scored and status in ('pass', 'fail'):
+            possible += 1
+            passed += status == 'pass'
+        yield from _chunk(out)
+
+    out.element('score', str(passed), {'system': 'urn:xccdf:scoring:flat', 'maximum': str(possible)})
+    out.end('TestResult')
+
+
+def _session_results(session):
+    """``(check_number, scored, status, finding, checked_at)`` of a session's results."""
+    if session.status == 'archived':
+        for result in load_archive(session).results:
+            yield result.check.check_number, result.check.scored, result.status, result.finding, result.checked_at
+        return
+
+    query = db.session.query(
+        AuditResult.id, Check.check_number, Check.scored,
+        AuditResult.status, AuditResult.finding, AuditResult.checked_at,
+    ).join(Check, AuditResult.check_id == Check.id).filter(AuditResult.session_id == session.id)
+    for row in keyset_rows(query, (AuditResult.id,)):
+        yield row[1:]
+
+
+def _chunk(out):
+    data = out.drain()
+    if data:
+        yield data
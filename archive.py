@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Move old completed audit sessions into the archive database, or restore one.
+
+Usage:
+    python archive.py                      # sessions completed over ARCHIVE_AFTER_DAYS ago
+    python archive.py --older-than 730 --dry-run
+    python archive.py --vacuum             # also shrink the audit database file afterwards
+    python archive.py --restore 12
+"""
+import argparse
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.extensions import db
+from app.models import AuditSession
+from app.utils.archive import (
+    ArchiveError, archive_candidates, archive_session, restore_session, vacuum_audit_database,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--older-than', type=int, metavar='DAYS',
+                        help='archive sessions completed more than DAYS ago (default: ARCHIVE_AFTER_DAYS)')
+    parser.add_argument('--limit', type=int, help='archive at most this many sessions')
+    parser.add_argument('--dry-run', action='store_true', help='list the sessions without archiving them')
+    parser.add_argument('--vacuum', action='store_true',
+                        help='rebuild the audit database afterwards to return the freed space')
+    parser.add_argument('--restore', type=int, metavar='SESSION_ID',
+                        help='move an archived session back into the audit database')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app(os.getenv('FLASK_CONFIG', 'development'))
+
+    with app.app_context():
+        if args.restore is not None:
+            session = db.session.get(AuditSession, args.restore)
+            if session is None:
+                sys.exit(f'Session {args.restore} not found.')
+            try:
+                restore_session(session)
+            except ArchiveError as exc:
+                sys.exit(str(exc))
+            print(f'Restored session {session.id} ({session.target_name}).')
+            return
+
+        days = args.older_than if args.older_than is not None else app.config['ARCHIVE_AFTER_DAYS']
+        sessions = archive_candidates(days, args.limit)
+        print(f'{len(sessions)} completed sessions older than {days} days.')
+        raw = stored = 0
+        for session in sessions:
+            label = f'  {session.id}: {session.target_name} (completed {session.completed_at:%Y-%m-%d})'
+            if args.dry_run:
+                print(label)
+                continue
+            archived = archive_session(session)
+            raw += archived.raw_size
+            stored += archived.stored_size
+            print(f'{label}: {archived.result_count} results, {archived.stored_size // 1024} KiB')
+
+        if sessions and not args.dry_run:
+            print(f'Archived {len(sessions)} sessions: {raw // 1024} KiB compressed to {stored // 1024} KiB.')
+        if args.vacuum and not args.dry_run:
+            vacuum_audit_database()
+            print('Audit database vacuumed.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Collect audit evidence by running a benchmark's audit commands on this host.
+
+Usage:
+    python collect.py --session 12
+    python collect.py --benchmark 1 --target-name web01 --target-ip 10.0.0.5 --user admin
+"""
+import argparse
+import os
+import platform
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.extensions import db
+from app.models import Benchmark, AuditSession, User
+from app.utils.audit_sessions import create_session
+from app.utils.collector import collect_session
+
+SUPPORTED_FAMILIES = {'Linux': 'Linux', 'Darwin': 'macOS'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--session', type=int, help='existing in-progress audit session id')
+    target.add_argument('--benchmark', type=int, help='benchmark id for a new audit session')
+    parser.add_argument('--target-name', default=platform.node(), help='target name for a new session')
+    parser.add_argument('--target-ip', default='', help='target IP for a new session')
+    parser.add_argument('--user', default='admin', help='owner of a new session')
+    parser.add_argument('--concurrency', type=int, help='commands run in parallel')
+    parser.add_argument('--timeout', type=int, help='seconds before a command is killed')
+    parser.add_argument('--max-output', type=int, help='bytes of stdout/stderr kept per command')
+    parser.add_argument('--no-prefill', action='store_true',
+                        help='store evidence only, leave result statuses untouched')
+    parser.add_argument('--force', action='store_true',
+                        help='run even if the benchmark targets a different OS family')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app(os.getenv('FLASK_CONFIG', 'development'))
+
+    with app.app_context():
+        if args.session:
+            session = db.session.get(AuditSession, args.session)
+            if session is None:
+                sys.exit(f'Audit session {args.session} not found.')
+            if session.status != 'in_progress':
+                sys.exit(f'Audit session {args.session} is already completed.')
+            benchmark = session.benchmark
+        else:
+            benchmark = db.session.get(Benchmark, args.benchmark)
+            if benchmark is None:
+                sys.exit(f'Benchmark {args.benchmark} not found.')
+            user = User.query.filter_by(username=args.user).first()
+            if user is None:
+                sys.exit(f'User {args.user!r} not found.')
+            session = None
+
+        local_family = SUPPORTED_FAMILIES.get(platform.system())
+        if benchmark.platform.os_family != local_family and not args.force:
+            sys.exit(f'{benchmark.name} targets {benchmark.platform.os_family}, '
+                     f'this host is {platform.system()}. Use --force to run anyway.')
+
+        if session is None:
+            session, count = create_session(user.id, benchmark, args.target_name, args.target_ip,
+                                            'Created by collect.py')
+            db.session.commit()
+            print(f'Created audit session {session.id} with {count} checks.')
+
+        print(f'Running audit commands for {benchmark.name} on {session.target_name}...')
+        summary = collect_session(
+            session,
+            concurrency=args.concurrency or app.config['COLLECTOR_CONCURRENCY'],
+            timeout=args.timeout or app.config['COLLECTOR_TIMEOUT'],
+            max_output=args.max_output or app.config['COLLECTOR_MAX_OUTPUT'],
+            prefill=not args.no_prefill,
+        )
+        db.session.commit()
+
+        print(f"  {summary['commands']} commands in {summary['seconds']:.1f}s: "
+              f"{summary['passed']} pass, {summary['failed']} fail, "
+              f"{summary['undecided']} undecided ({summary['timed_out']} timed out)")
+        print(f"  {summary['prefilled']} results pre-filled in session {session.id}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Gunicorn settings for running Kenbu in production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is imported once in the master and its templates are compiled there
+before workers fork, so workers share them copy-on-write. The master also
+reads the catalog file into the OS page cache. Workers memory-map that file,
+so they all map the same cached pages; the page cache, not the master's
+memory, is the shared copy. Workers open their own database connections and
+pick up a reseeded catalog on their next checkout. Send SIGHUP to the master
+(``python seed.py`` does this when the pid file exists) to replace workers
+gracefully; the new catalog is read into the page cache first.
+"""
+import multiprocessing
+import os
+
+basedir = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+preload_app = True
+pidfile = os.environ.get('GUNICORN_PIDFILE', os.path.join(basedir, 'instance', 'gunicorn.pid'))
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None  # e.g. '-' for stdout
+errorlog = '-'
+
+
+def when_ready(server):
+    _warm(server)
+
+
+def on_reload(server):
+    _warm(server)
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must never be used by a worker
+    from app.extensions import db
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def _warm(server):
+    from app.utils.catalog import warm_catalog
+    from app.utils.templating import precompile_templates
+    app = server.app.wsgi()
+    precompile_templates(app)
+    size = warm_catalog(app)
+    server.log.info('Templates compiled and %.1f MB of catalog read into the page cache', size / 1e6)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Import benchmarks published as XCCDF (CIS, DISA STIG, SCAP data streams).
+
+Usage:
+    python import_xccdf.py CIS_Debian_Linux_12_Benchmark_v1.0.0-xccdf.xml
+    python import_xccdf.py U_RHEL_9_V1R2_STIG.zip --platform rhel-9
+    python import_xccdf.py ssg-ubuntu2404-ds.xml other-benchmark-xccdf.xml --batch-size 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.utils.catalog import legacy_catalog_tables, writable_catalog
+from app.utils.related import rebuild_related_checks
+from app.utils.stats import rebuild_catalog_stats
+from app.utils.xccdf import XCCDF_BATCH_SIZE, XCCDFError, import_xccdf
+from seed import reload_server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='+', help='XCCDF or data stream XML files, or zip bundles of them')
+    parser.add_argument('--platform', help='platform slug (default: from the benchmark CPE names)')
+    parser.add_argument('--batch-size', type=int, default=XCCDF_BATCH_SIZE,
+                        help='sections and checks per insert batch')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app(os.getenv('FLASK_CONFIG', 'development'))
+
+    with app.app_context():
+        if legacy_catalog_tables():
+            sys.exit('The audit database still holds catalog tables. Run `python split_catalog.py` first.')
+        imported = 0
+        # Nothing is published unless every file imports
+        with writable_catalog():
+            for path in args.files:
+                try:
+                    reports = import_xccdf(path, args.platform, args.batch_size)
+                except (OSError, XCCDFError) as exc:
+                    sys.exit(f'Nothing was imported. {exc}')
+                for report in reports:
+                    label = f"{report['name']} v{report['version']}"
+                    if report['skipped']:
+                        print(f"  Skipped {label}: {report['skipped']}")
+                        continue
+                    imported += 1
+                    print(f"  Imported {label}: {report['sections']} sections, "
+                          f"{report['checks']} checks in {report['seconds']:.1f}s")
+
+            if imported:
+                print('Rebuilding catalog statistics...')
+                rebuild_catalog_stats()
+                print('Indexing related checks...')
+                started = time.perf_counter()
+                pairs, groups = rebuild_related_checks()
+                print(f'  {pairs} related pairs in {groups} groups ({time.perf_counter() - started:.2f}s)')
+
+    if imported:
+        reload_server()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Ingest an offline evidence bundle (tarball of per-host command outputs).
+
+Usage:
+    python ingest.py bundle.tar.gz --benchmark 1
+    python ingest.py - --benchmark 1 --workers 8 < bundle.tar
+"""
+import argparse
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.extensions import db
+from app.models import Benchmark, User
+from app.utils.ingest import ingest_bundle, BundleError, INGEST_BATCH_SIZE
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('bundle', help="bundle path, or '-' to read from stdin")
+    parser.add_argument('--benchmark', type=int, required=True, help='benchmark the outputs were collected for')
+    parser.add_argument('--user', default='admin', help='owner of the per-host sessions')
+    parser.add_argument('--workers', type=int, help='evaluation processes (default: all cores)')
+    parser.add_argument('--batch-size', type=int, default=INGEST_BATCH_SIZE,
+                        help='outputs per evaluation chunk and write batch')
+    parser.add_argument('--max-output', type=int, help='bytes kept per output file')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='replace results already set instead of filling only unchecked ones')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app(os.getenv('FLASK_CONFIG', 'development'))
+
+    with app.app_context():
+        benchmark = db.session.get(Benchmark, args.benchmark)
+        if benchmark is None:
+            sys.exit(f'Benchmark {args.benchmark} not found.')
+        user = User.query.filter_by(username=args.user).first()
+        if user is None:
+            sys.exit(f'User {args.user!r} not found.')
+
+        fileobj = sys.stdin.buffer if args.bundle == '-' else open(args.bundle, 'rb')
+        try:
+            report = ingest_bundle(
+                fileobj, benchmark, user.id,
+                workers=args.workers,
+                batch_size=args.batch_size,
+                max_output=args.max_output or app.config['COLLECTOR_MAX_OUTPUT'],
+                overwrite=args.overwrite,
+            )
+        except BundleError as exc:
+            sys.exit(str(exc))
+        finally:
+            if fileobj is not sys.stdin.buffer:
+                fileobj.close()
+
+        print(f"Ingested {report['outputs']} outputs from {report['hosts']} hosts "
+              f"in {report['seconds']:.1f}s ({report['outputs_per_second']} outputs/s)")
+        print(f"  {report['passed']} pass, {report['failed']} fail, {report['undecided']} undecided, "
+              f"{report['unknown']} unknown check numbers")
+        print(f"  {report['updated']} results updated, {report['sessions_created']} sessions created")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Measure requests per second as the number of gunicorn workers grows.
+
+Starts ``gunicorn -c gunicorn.conf.py wsgi:app`` on a local port once per
+worker count, logs in, and drives it from client processes with keep-alive
+connections for a fixed duration. Uses the configured (seeded) database.
+
+On Linux the server and the clients are pinned to separate CPUs (by default
+the first half for the server), so the clients do not compete with the
+workers being measured. Server CPU time per request is read from /proc for
+the gunicorn processes; unlike req/s it does not depend on where the clients
+run.
+
+Usage:
+    python loadtest.py
+    python loadtest.py --workers 1 2 4 8 --clients 16 --duration 15 --path /checks/1
+    python loadtest.py --server-cpus 0-3 --client-cpus 4-7
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PATHS = ['/', '/benchmarks/1', '/checks/1', '/api/v1/platforms']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4],
+                        help='worker counts to measure')
+    parser.add_argument('--threads', type=int, default=1, help='threads per worker')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per worker count')
+    parser.add_argument('--path', action='append', dest='paths',
+                        help=f'URL path to request, repeatable (default: {" ".join(DEFAULT_PATHS)})')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='changeme')
+    parser.add_argument('--server-cpus', type=cpu_list, help='CPUs for gunicorn, e.g. 0-3 (Linux)')
+    parser.add_argument('--client-cpus', type=cpu_list, help='CPUs for the clients, e.g. 4-7 (Linux)')
+    return parser.parse_args()
+
+
+def cpu_list(text):
+    """Parse ``0-3,6`` into a set of CPU numbers."""
+    cpus = set()
+    for part in text.split(','):
+        first, _sep, last = part.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def split_cpus(args):
+    """Server and client CPU sets, or ``(None, None)`` where CPUs cannot be separated."""
+    if not hasattr(os, 'sched_getaffinity'):
+        return None, None
+    available = sorted(os.sched_getaffinity(0))
+    if args.server_cpus or args.client_cpus:
+        return args.server_cpus or set(available), args.client_cpus or set(available)
+    if len(available) < 2:
+        return None, None
+    half = len(available) // 2
+    return set(available[:half]), set(available[half:])
+
+
+def server_cpu_seconds(pid):
+    """User plus system CPU time of the gunicorn master and its workers (Linux)."""
+    ticks = os.sysconf('SC_CLK_TCK')
+    total = 0
+    for proc_pid in [pid] + _children(pid):
+        try:
+            with open(f'/proc/{proc_pid}/stat') as f:
+                fields = f.read().rpartition(')')[2].split()
+        except OSError:
+            continue  # a worker that exited
+        total += int(fields[11]) + int(fields[12])  # utime, stime
+    return total / ticks
+
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def start_server(workers, threads, port, pidfile, cpus=None):
+    env = {key: value for key, value in os.environ.items() if key != 'GUNICORN_ACCESS_LOG'}
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--workers', str(workers), '--threads', str(threads),
+         '--bind', f'127.0.0.1:{port}', '--pid', pidfile, '--log-level', 'warning', 'wsgi:app'],
+        cwd=ROOT, env=env,
+        preexec_fn=(lambda: os.sched_setaffinity(0, cpus)) if cpus else None,  # workers inherit it
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                time.sleep(0.5)  # let the remaining workers boot
+                return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise SystemExit('gunicorn exited during start-up')
+            time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit('gunicorn did not start within 30 seconds')
+
+
+def login(port, username, password):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.request('POST', '/auth/login', body=urlencode({'username': username, 'password': password}),
+                 headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    cookie = response.getheader('Set-Cookie', '').split(';', 1)[0]
+    if response.status != 302 or not cookie:
+        raise SystemExit(f'Login failed ({response.status}); is the database seeded?')
+    return cookie
+
+
+def client(port, cookie, paths, duration):
+    """Request ``paths`` round-robin until ``duration`` elapses; returns latencies and errors."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request('GET', paths[i % len(paths)], headers={'Cookie': cookie})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        latencies.append(time.perf_counter() - started)
+        i += 1
+    conn.close()
+    return latencies, errors
+
+
+def measure(args, workers, server_cpus=None, client_cpus=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = start_server(workers, args.threads, args.port, os.path.join(tmp, 'gunicorn.pid'), server_cpus)
+        try:
+            cookie = login(args.port, args.username, args.password)
+            paths = args.paths or DEFAULT_PATHS
+            client(args.port, cookie, paths, 1)  # warm-up
+            pin = (os.sched_setaffinity, (0, client_cpus)) if client_cpus else (None, ())
+            with multiprocessing.Pool(args.clients, *pin) as pool:
+                cpu_before = server_cpu_seconds(proc.pid)
+                results = pool.starmap(
+                    client, [(args.port, cookie, paths, args.duration)] * args.clients
+                )
+                cpu_used = server_cpu_seconds(proc.pid) - cpu_before
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+
+    latencies = sorted(latency for batch, _errors in results for latency in batch)
+    errors = sum(errors for _batch, errors in results)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / args.duration,
+        'p50': statistics.median(latencies) * 1000 if latencies else 0,
+        'p95': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        'cpu_ms': cpu_used * 1000 / len(latencies) if latencies else 0,
+    }
+
+
+def main():
+    args = parse_args()
+    server_cpus, client_cpus = split_cpus(args)
+    print(f'{os.cpu_count()} CPU(s), {args.clients} clients, {args.threads} thread(s)/worker, '
+          f'{args.duration:g}s per run')
+    if server_cpus is None:
+        print('Clients share the server\'s CPUs: req/s understates what the server can do.\n')
+    else:
+        print(f'Server on CPUs {sorted(server_cpus)}, clients on CPUs {sorted(client_cpus)}\n')
+    print(f'{"workers":>7}  {"req/s":>8}  {"p50 ms":>7}  {"p95 ms":>7}  {"cpu ms/req":>10}  {"errors":>6}')
+    for workers in args.workers:
+        result = measure(args, workers, server_cpus, client_cpus)
+        print(f'{workers:>7}  {result["rps"]:>8.0f}  {result["p50"]:>7.1f}  '
+              f'{result["p95"]:>7.1f}  {result["cpu_ms"]:>10.1f}  {result["errors"]:>6}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """Seed the database with platforms, benchmarks, and checks."""
 import os
+import signal
+import subprocess
 import sys
 
 # Add project root to path
@@ -8,23 +10,69 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from app import create_app
 from app.extensions import db
+from app.utils.benchmark_files import BenchmarkFileError
+from app.utils.catalog import CatalogSplitError
 from app.utils.seed import seed_all
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+PIDFILE = os.environ.get(
+    'GUNICORN_PIDFILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'gunicorn.pid')
+)
+
+
+def reload_server():
+    """Ask a running gunicorn master to reload the new catalog (SIGHUP)."""
+    try:
+        with open(PIDFILE) as f:
+            pid = int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return
+    except OSError as exc:
+        print(f'Warning: server not reloaded, cannot read {PIDFILE}: {exc}', file=sys.stderr)
+        return
+    # A stale pid file may name a process that has reused the pid; SIGHUP would end it
+    if not _is_gunicorn_master(pid):
+        print(f'Warning: server not reloaded, pid {pid} in {PIDFILE} is not a gunicorn master.',
+              file=sys.stderr)
+        return
+    try:
+        os.kill(pid, signal.SIGHUP)
+    except OSError as exc:
+        print(f'Warning: server not reloaded (pid {pid}): {exc}', file=sys.stderr)
+        return
+    print(f'Reloaded server (pid {pid}).')
+
+
+def _is_gunicorn_master(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            command = f.read().replace(b'\0', b' ').decode(errors='replace')
+    except OSError:
+        try:
+            command = subprocess.run(['ps', '-o', 'command=', '-p', str(pid)],
+                                     capture_output=True, text=True).stdout
+        except OSError:
+            return False
+    return 'gunicorn' in command and 'gunicorn: worker' not in command
 
 
 def main():
     app = create_app(os.getenv('FLASK_CONFIG', 'development'))
 
     with app.app_context():
-        # Create tables if they don't exist
-        db.create_all()
+        # Create audit tables if they don't exist; the catalog is built by seed_all
+        db.create_all(bind_key=None)
         print('Database tables created.\n')
 
         # Run seed
-        seed_all(DATA_DIR)
+        try:
+            seed_all(DATA_DIR, workers=int(os.environ.get('SEED_WORKERS', 0)) or None)
+        except (BenchmarkFileError, CatalogSplitError) as exc:
+            sys.exit(f'Nothing was seeded. {exc}')
         print('\nSeeding complete!')
 
+    reload_server()
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Move the catalog tables out of an audit database created before the catalog split.
+
+Usage:
+    python split_catalog.py --dry-run   # copy and compare the tables, drop nothing
+    python split_catalog.py
+"""
+import argparse
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.utils.catalog import CatalogSplitError, split_legacy_catalog
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true',
+                        help='copy the tables and compare them without dropping them')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app(os.getenv('FLASK_CONFIG', 'development'))
+
+    with app.app_context():
+        path = app.config['CATALOG_DATABASE_PATH']
+        if path is None:
+            sys.exit('The audit database is in memory; there is nothing to split.')
+        try:
+            counts = split_legacy_catalog(path, drop=not args.dry_run)
+        except CatalogSplitError as exc:
+            sys.exit(str(exc))
+
+    if not counts:
+        print('The audit database holds no catalog tables.')
+        return
+    for name, rows in counts.items():
+        print(f'  {name}: {rows} rows')
+    if args.dry_run:
+        print(f'All tables match {path}; run without --dry-run to drop them.')
+    else:
+        print(f'Moved {len(counts)} catalog tables to {path}.')
+
+
+if __name__ == '__main__':
+    main()
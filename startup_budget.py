@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Check that create_app('production') starts within a time budget.
+
+Runs the app factory in fresh interpreters, reports the median start-up
+time and a ``-X importtime`` breakdown, and fails if the median exceeds the
+budget or a dependency that should load lazily is imported at start-up.
+
+Usage:
+    python startup_budget.py
+    python startup_budget.py --budget-ms 600 --runs 7 --top 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Only needed by exports, imports, seeding and `flask db`; must not load at start-up
+LAZY_MODULES = ('xlsxwriter', 'openpyxl', 'yaml', 'alembic', 'flask_migrate')
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app('production')
+elapsed = time.perf_counter() - started
+print(json.dumps({'ms': elapsed * 1000, 'modules': sorted(sys.modules)}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.environ.get('STARTUP_BUDGET_MS', 1000)),
+                        help='maximum median start-up time (default: 1000, or $STARTUP_BUDGET_MS)')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=15, help='import-time entries to show')
+    return parser.parse_args()
+
+
+def probe(*flags):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run([sys.executable, *flags, '-c', _PROBE], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def import_breakdown(stderr, depth=1):
+    """Parse ``-X importtime`` output into ``(cumulative_us, module)`` down to ``depth``."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self, cumulative, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip())) // 2
+        if level <= depth:
+            entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)
+
+
+def main():
+    args = parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        result, _stderr = probe()
+        timings.append(result['ms'])
+    median = statistics.median(timings)
+
+    result, stderr = probe('-X', 'importtime')
+    print(f'Import time breakdown (cumulative, top {args.top}):')
+    for cumulative, name in import_breakdown(stderr)[:args.top]:
+        print(f'  {cumulative / 1000:8.1f} ms  {name}')
+
+    print(f"\ncreate_app('production'): median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(timings):.0f}, max {max(timings):.0f}), budget {args.budget_ms:.0f} ms")
+
+    failures = []
+    eager = [name for name in LAZY_MODULES if name in result['modules']]
+    if eager:
+        failures.append(f"imported at start-up but should load lazily: {', '.join(eager)}")
+    if median > args.budget_ms:
+        failures.append(f'median start-up {median:.0f} ms exceeds budget {args.budget_ms:.0f} ms')
+
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    if failures:
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()